@@ -0,0 +1,54 @@
+"""
+Measures rate-limiter memory with many distinct clients, for each algorithm.
+
+`sliding_log` grows with requests per client; `sliding_window` and `token_bucket`
+keep fixed state per key, and idle keys are evicted back to an empty table.
+
+Usage:
+    python benchmarks/bench_rate_limiter_memory.py [--clients 1000000] [--requests-per-client 1 10]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_mock_server.core.rate_limiter import ALGORITHMS, LocalRateLimitBackend
+
+
+def _measure(algorithm, clients, requests_per_client, limit, window):
+    gc.collect()
+    tracemalloc.start()
+    backend = LocalRateLimitBackend(eviction_interval=0)
+    now = 1_000_000.0
+    for request_index in range(requests_per_client):
+        for client in range(clients):
+            backend.hit(f"GET_/api/users_{client}", limit, window, now + request_index * 0.001, algorithm)
+    loaded, _ = tracemalloc.get_traced_memory()
+    evicted = backend.evict_idle(now + 10 * window)
+    gc.collect()
+    after_eviction, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return loaded, after_eviction, evicted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1_000_000)
+    parser.add_argument("--requests-per-client", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--window", type=int, default=60)
+    args = parser.parse_args()
+
+    print(f"{args.clients} distinct clients, limit {args.limit}/{args.window}s")
+    for algorithm in ALGORITHMS:
+        for requests_per_client in args.requests_per_client:
+            loaded, after, evicted = _measure(algorithm, args.clients, requests_per_client, args.limit, args.window)
+            print(f"{algorithm:15} {requests_per_client:3} req/client: {loaded / 2**20:8.1f} MiB "
+                  f"({loaded / args.clients:6.1f} B/client), {after / 2**20:6.1f} MiB after evicting {evicted} keys")
+
+
+if __name__ == "__main__":
+    main()
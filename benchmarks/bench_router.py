@@ -0,0 +1,73 @@
+"""
+Measures route match latency of the radix router against Werkzeug's rule map at
+increasing route counts. Half the routes are static, half are templated.
+
+Usage:
+    python benchmarks/bench_router.py [--sizes 100,10000,100000] [--lookups 20000] [--werkzeug-max 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from werkzeug.routing import Map, Rule
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_mock_server.core.router import Router
+
+
+def _templates(count):
+    templates = []
+    for i in range(count):
+        if i % 2:
+            templates.append(f"/api/v1/resource{i}/<item_id>/details")
+        else:
+            templates.append(f"/api/v1/static{i}/list")
+    return templates
+
+
+def _paths(templates, lookups, rng):
+    return [template.replace("<item_id>", str(rng.randrange(10000))) for template in rng.choices(templates, k=lookups)]
+
+
+def _per_lookup(match, paths):
+    start = time.perf_counter()
+    for path in paths:
+        match(path)
+    return (time.perf_counter() - start) / len(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,10000,100000")
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--werkzeug-max", type=int, default=10000,
+                        help="Skip Werkzeug above this many routes; building its map is very slow.")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        templates = _templates(size)
+        paths = _paths(templates, args.lookups, rng)
+
+        start = time.perf_counter()
+        router = Router()
+        for template in templates:
+            router.add(template, template)
+        build = time.perf_counter() - start
+        radix = _per_lookup(router.match, paths)
+        line = f"{size:>7} routes  radix: {radix * 1e6:7.2f} us/match (build {build:6.2f}s)"
+
+        if size <= args.werkzeug_max:
+            start = time.perf_counter()
+            adapter = Map([Rule(t, endpoint=t) for t in templates]).bind("localhost")
+            build = time.perf_counter() - start
+            werkzeug = _per_lookup(adapter.match, paths)
+            line += f"   werkzeug: {werkzeug * 1e6:9.2f} us/match (build {build:6.2f}s)  ({werkzeug / radix:.0f}x)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares throughput of static routes served from a prebuilt response against the
+full request pipeline (rate limiting, auth, validation, templating, serialization).
+
+Usage:
+    python benchmarks/bench_static_routes.py [--requests 20000] [--items 100]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+from werkzeug.test import EnvironBuilder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+from simple_mock_server import server
+
+
+def _write_config(directory, items):
+    config = [
+        {"path": "/small", "methods": ["GET"], "response": {"data": {"message": "Hello"}}},
+        {"path": "/list", "methods": ["GET"], "response": {
+            "data": [{"id": i, "name": f"User {i}", "tags": ["a", "b"], "active": True} for i in range(items)],
+            "headers": {"X-Source": "mock"}
+        }},
+    ]
+    path = os.path.join(directory, "api.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+def _start_response(status, headers, exc_info=None):
+    return None
+
+
+def _throughput(app, path, requests):
+    """Drives the WSGI app directly so the test client's overhead does not dominate."""
+    environ = EnvironBuilder(path=path, method="GET").get_environ()
+    for _ in range(200):
+        b"".join(app(dict(environ), _start_response))
+    start = time.perf_counter()
+    for _ in range(requests):
+        b"".join(app(dict(environ), _start_response))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=100, help="Number of items in the /list response.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = _write_config(directory, args.items)
+        fast_app = server.create_mock_server(config_path=config_path)
+        with patch.object(server, "build_static_response", return_value=None):
+            full_app = server.create_mock_server(config_path=config_path)
+
+        for path in ("/small", "/list"):
+            full = _throughput(full_app, path, args.requests)
+            fast = _throughput(fast_app, path, args.requests)
+            print(f"{path:8} full pipeline: {full:9.0f} req/s   static fast path: {fast:9.0f} req/s   ({fast / full:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
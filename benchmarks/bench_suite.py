@@ -0,0 +1,292 @@
+"""
+Microbenchmarks for each stage of the request pipeline, with stored baselines.
+
+Every case reports the best per-operation time over several repeats. `--save` writes the
+results as a baseline; `--compare` checks a run against one and exits with status 1 if
+any case is slower than the baseline by more than `--threshold` (a fraction, default
+0.25). Baselines are only comparable on the same machine and Python version.
+
+Usage:
+    python benchmarks/bench_suite.py [--filter auth] [--repeat 5] [--save baseline.json]
+    python benchmarks/bench_suite.py --compare baseline.json [--threshold 0.25]
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.WARNING)
+
+from flask import Flask, request
+
+from simple_mock_server.config_parser import load_and_validate_config
+from simple_mock_server.core import metrics
+from simple_mock_server.core.auth import check_authentication, compile_auth
+from simple_mock_server.core.context import RequestContext
+from simple_mock_server.core.rate_limiter import handle_rate_limiting, reset_rate_limits
+from simple_mock_server.core.response import apply_templating, compile_request_validator, validate_request_body
+from simple_mock_server.core.templating import compile_json_template
+from simple_mock_server.core.variants import compile_variants
+from simple_mock_server.server import create_mock_server
+
+CASES = {}
+
+
+def case(name):
+    """Registers a context manager yielding `(func, ops)`: one call of `func` performs `ops` operations."""
+    def register(factory):
+        CASES[name] = contextmanager(factory)
+        return factory
+    return register
+
+
+_app = Flask(__name__)
+
+
+def _deep_payload(depth):
+    node = {"id": "{user_id}", "name": "User {user_id} ({query_param:lang})"}
+    for level in range(depth):
+        node = {"level": level, "label": "level-{user_id}", "child": node, "siblings": ["a", "{query_param:lang}"]}
+    return node
+
+
+def _wide_payload(width):
+    return {f"field{i}": "value {user_id}" if i % 4 == 0 else f"static {i}" for i in range(width)}
+
+
+@case("templating.apply.deep")
+def _templating_deep():
+    data = _deep_payload(12)
+    yield (lambda: apply_templating(data, {"user_id": "42"}, {"lang": "en"})), 1
+
+
+@case("templating.apply.wide")
+def _templating_wide():
+    data = _wide_payload(500)
+    yield (lambda: apply_templating(data, {"user_id": "42"}, {"lang": "en"})), 1
+
+
+@case("templating.compiled.deep")
+def _compiled_deep():
+    template = compile_json_template(_deep_payload(12), ["user_id"])
+    yield (lambda: template.render({"user_id": "42"}, {"lang": "en"}, {})), 1
+
+
+@case("templating.compiled.wide")
+def _compiled_wide():
+    template = compile_json_template(_wide_payload(500), ["user_id"])
+    yield (lambda: template.render({"user_id": "42"}, {"lang": "en"}, {})), 1
+
+
+@case("rate_limit.many_keys")
+def _rate_limit_many_keys():
+    reset_rate_limits()
+    config = {"rate_limit": {"requests": 1000000, "window": 60}}
+    keys = [f"10.0.{i // 256}.{i % 256}" for i in range(50000)]
+    with _app.test_request_context("/bench"):
+        ctx = RequestContext(request, {}, None)
+        position = [0]
+
+        def hit():
+            ctx.client_id = keys[position[0] % len(keys)]
+            position[0] += 1
+            handle_rate_limiting(config, ctx, "/bench")
+        yield hit, 1
+
+
+@case("rate_limit.contention")
+def _rate_limit_contention():
+    reset_rate_limits()
+    config = {"rate_limit": {"requests": 1000000000, "window": 60}}
+    threads, per_thread = 8, 500
+
+    def worker(barrier):
+        with _app.test_request_context("/bench"):
+            ctx = RequestContext(request, {}, None)
+            barrier.wait()
+            for _ in range(per_thread):
+                handle_rate_limiting(config, ctx, "/bench")
+
+    def contend():
+        barrier = threading.Barrier(threads)
+        pool = [threading.Thread(target=worker, args=(barrier,)) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+    yield contend, threads * per_thread
+
+
+def _auth_case(auth, headers):
+    response_config = {"auth": auth, "authenticator": compile_auth(auth)}
+    with _app.test_request_context("/bench", headers=headers):
+        ctx = RequestContext(request, {}, auth)
+
+        def check():
+            assert check_authentication(response_config, ctx, "/bench") is None
+        yield check, 1
+
+
+@case("auth.api_key")
+def _auth_api_key():
+    yield from _auth_case({"api_key": "k" * 32}, {"X-API-Key": "k" * 32})
+
+
+@case("auth.basic")
+def _auth_basic():
+    token = base64.b64encode(b"user:secret-password").decode("ascii")
+    yield from _auth_case({"basic_auth": {"username": "user", "password": "secret-password"}}, {"Authorization": f"Basic {token}"})
+
+
+@case("auth.bearer")
+def _auth_bearer():
+    yield from _auth_case({"bearer_token": "t" * 40}, {"Authorization": "Bearer " + "t" * 40})
+
+
+@case("auth.api_keys_file")
+def _auth_api_keys_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "keys.txt")
+        with open(path, "w") as f:
+            f.write("".join(f"key-{i:08d}\n" for i in range(100000)))
+        yield from _auth_case({"api_keys_file": path}, {"X-API-Key": "key-00054321"})
+
+
+@case("validation.request_schema")
+def _validation():
+    schema = {
+        "type": "object",
+        "properties": {"name": {"type": "string"}, "age": {"type": "integer", "minimum": 0},
+                       "tags": {"type": "array", "items": {"type": "string"}}},
+        "required": ["name"],
+    }
+    response_config = {"request_schema": schema, "request_validator": compile_request_validator(schema)}
+    body = json.dumps({"name": "Ada", "age": 36, "tags": ["a", "b", "c"]})
+    with _app.test_request_context("/bench", method="POST", data=body, content_type="application/json"):
+        def validate():
+            # A fresh context per call, so the body is parsed as it would be per request.
+            assert validate_request_body(response_config, RequestContext(request, {}, None))[1] is None
+        yield validate, 1
+
+
+@case("variants.dispatch_500")
+def _variants():
+    variants = [{"match": {"path": {"user_id": str(i)}, "query": {"lang": "en"}}} for i in range(500)]
+    variants += [{"match": {"headers": {"X-Tenant": {"pattern": f"tenant-{i}-.*"}}}} for i in range(5)]
+    index = compile_variants(variants, [{} for _ in variants])
+    with _app.test_request_context("/bench?lang=en", headers={"X-Tenant": "other"}):
+        ctx = RequestContext(request, {"user_id": "499"}, None)
+        yield (lambda: index.position(ctx)), 1
+
+
+@case("metrics.generate_large")
+def _metrics_large():
+    metrics.reset_metrics()
+    for i in range(2000):
+        path = f"/api/resource{i}/<item_id>"
+        for method in ("GET", "POST"):
+            metrics.track_request(path, method)
+            metrics.observe_response(path, method, 200, 0.001 * (i % 50))
+    yield metrics.generate_metrics, 1
+    metrics.reset_metrics()
+
+
+@case("config.load_large")
+def _config_load():
+    routes = [{"path": f"/api/v1/resource{i}/{{item_id}}", "methods": ["GET", "POST"],
+               "response": {"data": {"id": "{item_id}", "name": f"resource {i}", "tags": ["a", "b"]}, "code": 200},
+               "description": f"Resource {i}"} for i in range(2000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "api.json")
+        with open(path, "w") as f:
+            json.dump(routes, f)
+        yield (lambda: load_and_validate_config(path)), 1
+
+
+@case("e2e.test_client")
+def _end_to_end():
+    routes = [
+        {"path": "/static", "methods": ["GET"], "response": {"data": {"message": "hello"}}},
+        {"path": "/users/{user_id}", "methods": ["GET"], "response": {"data": {"id": "{user_id}", "lang": "{query_param:lang}"}}},
+        {"path": "/orders", "methods": ["POST"], "response": {"data": {"ok": True}, "code": 201},
+         "request_schema": {"type": "object", "required": ["item"]}},
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "api.json")
+        with open(path, "w") as f:
+            json.dump(routes, f)
+        client = create_mock_server(config_path=path).test_client()
+
+        def roundtrip():
+            client.get("/static")
+            client.get("/users/7?lang=en")
+            client.post("/orders", json={"item": 1})
+        yield roundtrip, 3
+
+
+def measure(factory, repeat):
+    """Returns the best time per operation, in seconds, over `repeat` timed runs."""
+    with factory() as (func, ops):
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return best / ops
+
+
+def compare(results, baseline, threshold):
+    """Returns (name, baseline, current) for every case slower than `baseline` by more than `threshold`."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous and current > previous * (1 + threshold):
+            regressions.append((name, previous, current))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this string.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="Write the results to this baseline file.")
+    parser.add_argument("--compare", help="Compare against this baseline file; exit 1 on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown as a fraction of the baseline (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    results = {}
+    for name, factory in CASES.items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(factory, args.repeat)
+        print(f"{name:<28} {results[name] * 1e6:12.2f} us/op", flush=True)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, previous, current in regressions:
+            print(f"REGRESSION {name}: {previous * 1e6:.2f} -> {current * 1e6:.2f} us/op "
+                  f"(+{(current / previous - 1) * 100:.0f}%)")
+        if regressions:
+            sys.exit(1)
+        print(f"No case is more than {args.threshold:.0%} slower than {args.compare}.")
+
+
+if __name__ == "__main__":
+    main()
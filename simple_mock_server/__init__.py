@@ -1 +1,3 @@
+__version__ = "0.3.2"
+
 from .server import main
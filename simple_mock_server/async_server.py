@@ -0,0 +1,461 @@
+"""
+An asyncio HTTP/1.1 front end for the mock server.
+
+Requests are dispatched to the same Flask app, and therefore the same route table, as
+the threaded server. Response delays are not slept in the request thread; the view
+records them in the WSGI environ and the connection coroutine waits on a shared timer
+wheel, so thousands of delayed requests can be in flight in a single process without a
+thread or a heap-ordered loop timer each.
+"""
+import asyncio
+import io
+import json
+import logging
+import math
+import signal
+import socket
+import sys
+import time
+from email.utils import formatdate
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+logger = logging.getLogger(__name__)
+
+# Set by the async front end; `_handle_delay` stores the delay here instead of sleeping.
+DEFERRED_DELAY_ENVIRON_KEY = 'simple_mock_server.deferred_delay'
+
+MAX_HEADER_COUNT = 100
+STREAM_LIMIT = 64 * 1024
+LISTEN_BACKLOG = 2048
+
+_HOP_BY_HOP_HEADERS = frozenset(['connection', 'keep-alive', 'transfer-encoding'])
+
+
+# Resolution and size of the delay timer wheel: 1 ms ticks, one revolution per 1.024 s.
+TIMER_TICK = 0.001
+TIMER_SLOTS = 1024
+
+
+class TimerWheel:
+    """
+    A hashed timer wheel driving every response delay on one event loop.
+
+    Scheduling a delay appends a future to a slot, in O(1) however many are pending;
+    delays longer than one revolution carry a round count. A single loop callback
+    advances the wheel while timers are pending. Delays are rounded up to the next tick,
+    so they fire at most one tick late and never early.
+    """
+
+    def __init__(self, tick: float = TIMER_TICK, slots: int = TIMER_SLOTS):
+        self.tick = tick
+        self.slots: List[List[Any]] = [[] for _ in range(slots)]
+        self.position = 0
+        self.pending = 0
+        self._next_at = 0.0
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def sleep(self, delay: float) -> "asyncio.Future[None]":
+        """Returns a future that completes once `delay` seconds have passed."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        now = loop.time()
+        if self._handle is None:
+            self._next_at = now + self.tick
+            self._handle = loop.call_at(self._next_at, self._advance, loop)
+        # Slot j ahead of the current position is processed at _next_at + (j - 1) * tick.
+        ticks = max(1, math.ceil((now + delay - self._next_at) / self.tick - 1e-9) + 1)
+        rounds, offset = divmod(ticks - 1, len(self.slots))
+        self.slots[(self.position + offset + 1) % len(self.slots)].append([rounds, future])
+        self.pending += 1
+        return future
+
+    def _advance(self, loop: asyncio.AbstractEventLoop) -> None:
+        now = loop.time()
+        while self._next_at <= now and self.pending:
+            self.position = (self.position + 1) % len(self.slots)
+            slot = self.slots[self.position]
+            if slot:
+                remaining = []
+                for entry in slot:
+                    if entry[0]:
+                        entry[0] -= 1
+                        remaining.append(entry)
+                    else:
+                        self.pending -= 1
+                        if not entry[1].done():
+                            entry[1].set_result(None)
+                self.slots[self.position] = remaining
+            self._next_at += self.tick
+        if self.pending:
+            self._handle = loop.call_at(self._next_at, self._advance, loop)
+        else:
+            self._handle = None
+
+
+class _BadRequest(Exception):
+    """Raised when a request cannot be parsed."""
+
+
+class _PayloadTooLarge(Exception):
+    """Raised, before the rest of the body is read, when a request body exceeds the limit."""
+
+
+class ConnectionTracker:
+    """Tracks open connections so a shutdown can finish in-flight requests first."""
+
+    def __init__(self):
+        self.idle = set()
+        self.busy = 0
+        self.closing = False
+
+    async def drain(self, timeout: float) -> None:
+        """Drops idle keep-alive connections and waits for busy ones to finish."""
+        self.closing = True
+        for task in list(self.idle):
+            task.cancel()
+        deadline = time.monotonic() + timeout
+        while self.busy and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+
+_date_cache: List[Any] = [0, b'']
+
+
+def _http_date() -> bytes:
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache[0] = now
+        _date_cache[1] = formatdate(now, usegmt=True).encode('latin-1')
+    return _date_cache[1]
+
+
+def _payload_too_large(max_body_size: int) -> bytes:
+    body = json.dumps({"error": "Payload Too Large",
+                       "message": f"Request body exceeds the maximum size of {max_body_size} bytes."}).encode('utf-8')
+    return (b'HTTP/1.1 413 Payload Too Large\r\nContent-Type: application/json\r\nContent-Length: %d\r\n'
+            b'Connection: close\r\n\r\n' % len(body)) + body
+
+
+async def _read_chunked_body(reader: asyncio.StreamReader, max_body_size: Optional[int] = None) -> bytes:
+    chunks = []
+    total = 0
+    while True:
+        size_line = await reader.readline()
+        try:
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+        except ValueError:
+            raise _BadRequest("Invalid chunk size")
+        total += size
+        if max_body_size is not None and total > max_body_size:
+            raise _PayloadTooLarge()
+        if size == 0:
+            # Discard any trailers up to the terminating blank line.
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            return b''.join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+async def _read_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        max_body_size: Optional[int] = None) -> Optional[Tuple[str, str, str, List[Tuple[str, str]], bytes]]:
+    """
+    Reads one request; returns None on a clean end of stream.
+
+    Bodies over `max_body_size` bytes raise _PayloadTooLarge: a declared Content-Length
+    before any of the body is read, a chunked body as soon as its chunks pass the limit.
+    """
+    request_line = await reader.readline()
+    while request_line in (b'\r\n', b'\n'):
+        request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    try:
+        method, target, version = request_line.decode('latin-1').rstrip('\r\n').split(' ')
+    except ValueError:
+        raise _BadRequest("Malformed request line")
+    if not version.startswith('HTTP/1.'):
+        raise _BadRequest(f"Unsupported protocol {version}")
+
+    headers = []
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n'):
+            break
+        if not line:
+            raise _BadRequest("Connection closed while reading headers")
+        if len(headers) >= MAX_HEADER_COUNT:
+            raise _BadRequest("Too many headers")
+        name, sep, value = line.decode('latin-1').partition(':')
+        if not sep:
+            raise _BadRequest("Malformed header line")
+        headers.append((name.strip(), value.strip()))
+
+    lowered = {name.lower(): value for name, value in headers}
+    chunked = 'chunked' in lowered.get('transfer-encoding', '').lower()
+    length = 0
+    if not chunked and 'content-length' in lowered:
+        try:
+            length = int(lowered['content-length'])
+        except ValueError:
+            raise _BadRequest("Invalid Content-Length")
+        if max_body_size is not None and length > max_body_size:
+            raise _PayloadTooLarge()
+    if lowered.get('expect', '').lower() == '100-continue':
+        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+    if chunked:
+        body = await _read_chunked_body(reader, max_body_size)
+    else:
+        body = await reader.readexactly(length) if length > 0 else b''
+    return method, target, version, headers, body
+
+
+class SendfileWrapper:
+    """`wsgi.file_wrapper` whose file is written with `loop.sendfile` instead of being read into Python."""
+
+    def __init__(self, filelike: Any, block_size: int = 8192):
+        self.filelike = filelike
+        self.block_size = block_size
+
+    def __iter__(self):
+        # Plain iteration, for middleware that consumes the body itself.
+        while True:
+            data = self.filelike.read(self.block_size)
+            if not data:
+                return
+            yield data
+
+    def close(self) -> None:
+        self.filelike.close()
+
+
+def _build_environ(method: str, target: str, version: str, headers: List[Tuple[str, str]], body: bytes,
+                   server_name: str, server_port: int, peer: Any) -> Dict[str, Any]:
+    path, _, query = target.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': unquote_to_bytes(path).decode('latin-1'),
+        'QUERY_STRING': query,
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': version,
+        'REMOTE_ADDR': peer[0] if peer else '',
+        'REMOTE_PORT': str(peer[1]) if peer else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'wsgi.file_wrapper': SendfileWrapper,
+        DEFERRED_DELAY_ENVIRON_KEY: 0,
+    }
+    for name, value in headers:
+        key = name.upper().replace('-', '_')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif key == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        elif key != 'TRANSFER_ENCODING':
+            key = 'HTTP_' + key
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    if body and 'CONTENT_LENGTH' not in environ:
+        environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+def _unsupported_write(data: bytes) -> None:
+    raise NotImplementedError("The WSGI write() callable is not supported by the async server.")
+
+
+def _call_app(app: Callable, environ: Dict[str, Any]) -> Tuple[str, List[Tuple[str, str]], Any]:
+    started: Dict[str, Any] = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        if exc_info and started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        started['status'] = status
+        started['headers'] = response_headers
+        return _unsupported_write
+
+    body_iter = app(environ, start_response)
+    return started['status'], started['headers'], body_iter
+
+
+async def _write_response(writer: asyncio.StreamWriter, status: str, headers: List[Tuple[str, str]], body_iter: Any,
+                          keep_alive: bool, chunked_allowed: bool, head_request: bool) -> bool:
+    """Writes a WSGI response; returns whether the connection can be kept open."""
+    content_length = next((value for name, value in headers if name.lower() == 'content-length'), None)
+    has_length = content_length is not None
+    no_body = head_request or status[:3] in ('204', '304') or status[0] == '1'
+    chunked = not has_length and not no_body and chunked_allowed
+    if not has_length and not no_body and not chunked:
+        keep_alive = False
+
+    lines = [f"HTTP/1.1 {status}\r\n".encode('latin-1')]
+    for name, value in headers:
+        if name.lower() not in _HOP_BY_HOP_HEADERS:
+            lines.append(f"{name}: {value}\r\n".encode('latin-1'))
+    lines.append(b'Date: ' + _http_date() + b'\r\n')
+    if chunked:
+        lines.append(b'Transfer-Encoding: chunked\r\n')
+    lines.append(b'Connection: keep-alive\r\n\r\n' if keep_alive else b'Connection: close\r\n\r\n')
+    writer.write(b''.join(lines))
+
+    if isinstance(body_iter, SendfileWrapper) and has_length:
+        try:
+            if not no_body:
+                await writer.drain()
+                sent = await asyncio.get_running_loop().sendfile(
+                    writer.transport, body_iter.filelike, body_iter.filelike.tell(), int(content_length)
+                )
+                if sent < int(content_length):
+                    # The file shrank while being sent; closing tells the client the body is short.
+                    keep_alive = False
+        finally:
+            body_iter.close()
+        return keep_alive
+
+    try:
+        for chunk in body_iter:
+            if not chunk or no_body:
+                continue
+            if chunked:
+                writer.write(b'%x\r\n' % len(chunk))
+                writer.write(chunk)
+                writer.write(b'\r\n')
+            else:
+                writer.write(chunk)
+            await writer.drain()
+    finally:
+        if hasattr(body_iter, 'close'):
+            body_iter.close()
+    if chunked:
+        writer.write(b'0\r\n\r\n')
+    await writer.drain()
+    return keep_alive
+
+
+async def _handle_connection(app: Callable, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                             server_name: str, server_port: int, tracker: ConnectionTracker,
+                             timers: TimerWheel, max_body_size: Optional[int] = None) -> None:
+    peer = writer.get_extra_info('peername')
+    task = asyncio.current_task()
+    try:
+        while not tracker.closing:
+            tracker.idle.add(task)
+            try:
+                parsed = await _read_request(reader, writer, max_body_size)
+            except _BadRequest as e:
+                logger.warning(f"Bad request from {peer}: {e}")
+                writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                await writer.drain()
+                return
+            except _PayloadTooLarge:
+                logger.warning(f"Request body too large from {peer}")
+                writer.write(_payload_too_large(max_body_size))
+                await writer.drain()
+                return
+            finally:
+                tracker.idle.discard(task)
+            if parsed is None:
+                return
+
+            tracker.busy += 1
+            try:
+                method, target, version, headers, body = parsed
+                connection = ','.join(value for name, value in headers if name.lower() == 'connection').lower()
+                if version == 'HTTP/1.0':
+                    keep_alive = 'keep-alive' in connection
+                else:
+                    keep_alive = 'close' not in connection
+
+                environ = _build_environ(method, target, version, headers, body, server_name, server_port, peer)
+                status, response_headers, body_iter = _call_app(app, environ)
+
+                delay = environ.get(DEFERRED_DELAY_ENVIRON_KEY) or 0
+                if delay > 0:
+                    await timers.sleep(delay)
+
+                keep_alive = await _write_response(
+                    writer, status, response_headers, body_iter,
+                    keep_alive=keep_alive and not tracker.closing,
+                    chunked_allowed=version != 'HTTP/1.0', head_request=method == 'HEAD'
+                )
+            finally:
+                tracker.busy -= 1
+            if not keep_alive:
+                return
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+        # Clients hanging up mid-request, or lines longer than STREAM_LIMIT.
+        pass
+    finally:
+        writer.close()
+
+
+async def start_async_server(app: Callable, host: str = '127.0.0.1', port: int = 5001,
+                             sock: Optional[socket.socket] = None,
+                             tracker: Optional[ConnectionTracker] = None,
+                             max_body_size: Optional[int] = None) -> asyncio.AbstractServer:
+    """
+    Starts serving `app` on the running event loop.
+
+    Args:
+        app: A WSGI application, normally the Flask app from `create_mock_server`.
+        host: Host to bind to. Ignored when `sock` is given.
+        port: Port to bind to. Ignored when `sock` is given.
+        sock: An already bound and listening socket to serve on.
+        tracker: Collects open connections for a graceful shutdown.
+        max_body_size: Largest accepted request body in bytes, normally the app's
+            MAX_CONTENT_LENGTH; larger bodies get a 413 without being read. None for no limit.
+
+    Returns:
+        The asyncio server object.
+    """
+    if tracker is None:
+        tracker = ConnectionTracker()
+    if sock is not None:
+        server_name, server_port = sock.getsockname()[:2]
+    else:
+        server_name, server_port = host, port
+
+    timers = TimerWheel()
+
+    def on_connection(reader, writer):
+        return _handle_connection(app, reader, writer, server_name, server_port, tracker, timers, max_body_size)
+
+    if sock is not None:
+        return await asyncio.start_server(on_connection, sock=sock, limit=STREAM_LIMIT, backlog=LISTEN_BACKLOG)
+    return await asyncio.start_server(on_connection, host, port, limit=STREAM_LIMIT, backlog=LISTEN_BACKLOG)
+
+
+def serve_async(app: Callable, host: str = '127.0.0.1', port: int = 5001, sock: Optional[socket.socket] = None,
+                graceful_sigterm: bool = False, shutdown_timeout: float = 30, max_body_size: Optional[int] = None) -> None:
+    """
+    Serves `app` on an asyncio event loop until interrupted.
+
+    Request bodies over `max_body_size` bytes are rejected with 413 before they are read.
+
+    With `graceful_sigterm`, SIGTERM stops accepting connections and waits up to
+    `shutdown_timeout` seconds for in-flight requests before returning.
+    """
+    async def run():
+        tracker = ConnectionTracker()
+        server = await start_async_server(app, host, port, sock=sock, tracker=tracker, max_body_size=max_body_size)
+        addresses = ', '.join(str(s.getsockname()) for s in server.sockets)
+        logger.info(f"Async server listening on {addresses}")
+
+        stopped = asyncio.Event()
+        if graceful_sigterm:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+        async with server:
+            await stopped.wait()
+            server.close()
+            await tracker.drain(shutdown_timeout)
+
+    asyncio.run(run())
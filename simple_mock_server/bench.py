@@ -0,0 +1,278 @@
+"""
+Load generator for a running mock server: `simple-mock-server bench`.
+
+Requests come from a JSONL journal, one request per line in the `--access-log` format
+(`method`, `path`, optional `query`, `route`, `headers` and `body`), or are synthesized
+from the routes of an `api.json`/`api.yaml`. They are replayed round-robin over pooled
+keep-alive connections, either closed-loop at a fixed concurrency or open-loop at a
+target rate. The report is JSON: overall and per-route throughput, p50/p90/p99 latency,
+status codes and errors.
+
+Usage:
+    simple-mock-server bench --url http://127.0.0.1:5001 --journal access.jsonl --concurrency 32 --duration 30
+    simple-mock-server bench --url http://127.0.0.1:5001 --config api.json --rate 2000 --requests 50000
+"""
+import argparse
+import base64
+import http.client
+import json
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from .config_parser import load_and_validate_config, ConfigError
+from .core.resources import expand_resource_routes
+from .core.templating import path_params_of
+
+# Value substituted for path parameters when synthesizing requests from a config.
+SYNTHETIC_PARAM_VALUE = '1'
+_BODY_METHODS = ('POST', 'PUT', 'PATCH')
+
+def _bench_request(method: str, path: str, route: str, headers: Optional[Dict[str, str]] = None,
+                   body: Any = None) -> Dict[str, Any]:
+    headers = dict(headers or {})
+    if body is not None and not isinstance(body, (bytes, str)):
+        body = json.dumps(body)
+        headers.setdefault('Content-Type', 'application/json')
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return {'method': method.upper(), 'path': path, 'route': f"{method.upper()} {route}", 'headers': headers, 'body': body}
+
+def load_journal(path: str) -> List[Dict[str, Any]]:
+    """
+    Reads a JSONL request journal.
+
+    Raises:
+        ValueError: If a line is not a JSON object with `method` and `path`.
+    """
+    requests = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                method, request_path = entry['method'], entry['path']
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{path}:{line_number}: expected a JSON object with 'method' and 'path' ({e})") from e
+            target = f"{request_path}?{entry['query']}" if entry.get('query') else request_path
+            requests.append(_bench_request(method, target, entry.get('route') or request_path,
+                                           entry.get('headers'), entry.get('body')))
+    if not requests:
+        raise ValueError(f"{path} contains no requests")
+    return requests
+
+def _auth_headers(auth_config: Dict[str, Any]) -> Dict[str, str]:
+    if auth_config.get('skip_auth'):
+        return {}
+    if 'api_key' in auth_config:
+        return {'X-API-Key': auth_config['api_key']}
+    if 'basic_auth' in auth_config:
+        credentials = f"{auth_config['basic_auth']['username']}:{auth_config['basic_auth']['password']}"
+        return {'Authorization': 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('ascii')}
+    if 'bearer_token' in auth_config:
+        return {'Authorization': f"Bearer {auth_config['bearer_token']}"}
+    return {}
+
+def synthesize_requests(routes_config: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Builds one request per configured route and method, with credentials if the route needs them."""
+    requests = []
+    for route in expand_resource_routes(routes_config):
+        path = route.get('path')
+        if not path:
+            continue
+        concrete = path
+        for param in path_params_of(path):
+            concrete = concrete.replace(f'{{{param}}}', SYNTHETIC_PARAM_VALUE)
+        headers = _auth_headers(route.get('auth', {}))
+        for method in route.get('methods', ['GET']):
+            body = {} if method.upper() in _BODY_METHODS else None
+            requests.append(_bench_request(method, concrete, path, headers, body))
+    if not requests:
+        raise ValueError("The configuration defines no routes")
+    return requests
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list; 0.0 for an empty list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+def _summarize(latencies: List[float], statuses: Dict[int, int], errors: int, elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    count = len(latencies) + errors
+    return {
+        'requests': count,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p90': round(percentile(latencies, 90) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        'status': dict(sorted(statuses.items())),
+        'errors': errors + sum(n for status, n in statuses.items() if status >= 500),
+    }
+
+class _Worker:
+    """One keep-alive connection and the results it collected."""
+
+    def __init__(self, host: str, port: int, https: bool, timeout: float):
+        self.host, self.port, self.https, self.timeout = host, port, https, timeout
+        self.connection: Optional[http.client.HTTPConnection] = None
+        # route -> (latencies, {status: count}, transport errors)
+        self.results: Dict[str, List[Any]] = {}
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.connection is None:
+            connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.connection = connection_class(self.host, self.port, timeout=self.timeout)
+        return self.connection
+
+    def send(self, request: Dict[str, Any], started: float) -> None:
+        result = self.results.get(request['route'])
+        if result is None:
+            result = self.results[request['route']] = [[], {}, 0]
+        try:
+            connection = self._connect()
+            connection.request(request['method'], request['path'], body=request['body'], headers=request['headers'])
+            response = connection.getresponse()
+            response.read()
+            if response.will_close:
+                self.close()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            result[2] += 1
+            return
+        result[0].append(time.perf_counter() - started)
+        result[1][response.status] = result[1].get(response.status, 0) + 1
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+def run_bench(url: str, requests: List[Dict[str, Any]], concurrency: int = 16, rate: Optional[float] = None,
+              duration: Optional[float] = None, total: Optional[int] = None, timeout: float = 5.0) -> Dict[str, Any]:
+    """
+    Replays `requests` round-robin against `url` and returns the report.
+
+    Closed-loop by default: `concurrency` connections each send their next request as
+    soon as the previous one completes. With `rate`, requests are scheduled at fixed
+    intervals and latency is measured from the scheduled time, so a stalled server is
+    not hidden by the generator slowing down. Stops after `total` requests or
+    `duration` seconds, whichever comes first; with neither, each request is sent once.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f"Invalid --url {url!r}; expected http://host:port")
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    prefix = parts.path.rstrip('/')
+    if prefix:
+        requests = [{**request, 'path': prefix + request['path']} for request in requests]
+    if total is None and duration is None:
+        total = len(requests)
+
+    workers = [_Worker(parts.hostname, port, parts.scheme == 'https', timeout) for _ in range(concurrency)]
+    lock = threading.Lock()
+    next_index = [0]
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    def take() -> Optional[int]:
+        with lock:
+            index = next_index[0]
+            if total is not None and index >= total:
+                return None
+            next_index[0] = index + 1
+            return index
+
+    def run(worker: _Worker) -> None:
+        try:
+            while True:
+                index = take()
+                if index is None:
+                    return
+                scheduled = start + index / rate if rate else time.perf_counter()
+                if deadline is not None and scheduled >= deadline:
+                    return
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                worker.send(requests[index % len(requests)], scheduled)
+        finally:
+            worker.close()
+
+    threads = [threading.Thread(target=run, args=(worker,), daemon=True) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    merged: Dict[str, List[Any]] = {}
+    for worker in workers:
+        for route, (latencies, statuses, errors) in worker.results.items():
+            into = merged.setdefault(route, [[], {}, 0])
+            into[0].extend(latencies)
+            for status, count in statuses.items():
+                into[1][status] = into[1].get(status, 0) + count
+            into[2] += errors
+    all_latencies = [latency for latencies, _, _ in merged.values() for latency in latencies]
+    all_statuses: Dict[int, int] = {}
+    for _, statuses, _ in merged.values():
+        for status, count in statuses.items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'rate': rate,
+        'elapsed_seconds': round(elapsed, 3),
+        'summary': _summarize(all_latencies, all_statuses, sum(errors for _, _, errors in merged.values()), elapsed),
+        'routes': {route: _summarize(*merged[route], elapsed) for route in sorted(merged)},
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of `simple-mock-server bench`."""
+    parser = argparse.ArgumentParser(prog="simple-mock-server bench",
+                                     description="Replay requests against a running mock server and report latency as JSON.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--journal", type=str, help="JSONL request journal, e.g. a file written by --access-log.")
+    source.add_argument("--config", type=str, help="Synthesize one request per route and method from this configuration.")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:5001", help="Base URL of the running server.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of keep-alive connections.")
+    parser.add_argument("--rate", type=float, help="Target requests per second (open loop). Default: as fast as possible.")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds.")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests (default: each request once).")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file instead of stdout.")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+
+    try:
+        if args.journal:
+            requests = load_journal(args.journal)
+        else:
+            requests = synthesize_requests(load_and_validate_config(args.config))
+        report = run_bench(args.url, requests, concurrency=args.concurrency, rate=args.rate,
+                           duration=args.duration, total=args.requests, timeout=args.timeout)
+    except ConfigError as e:
+        print(f"bench: invalid configuration: {e.message}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"bench: {e}", file=sys.stderr)
+        return 1
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
@@ -22,11 +22,109 @@ API_SCHEMA = {
                 "type": "object",
                 "properties": {
                     "data": {},
+                    "body_file": {"type": "string", "minLength": 1},
+                    "compress": {
+                        "anyOf": [
+                            {"type": "boolean"},
+                            {
+                                "type": "object",
+                                "properties": {
+                                    "level": {"type": "integer", "minimum": 1, "maximum": 9},
+                                    "min_size": {"type": "integer", "minimum": 0}
+                                },
+                                "additionalProperties": False
+                            }
+                        ]
+                    },
+                    "generate": {
+                        "type": "object",
+                        "properties": {
+                            "item": {},
+                            "count": {"type": "integer", "minimum": 0},
+                            "seed": {"type": "integer"}
+                        },
+                        "required": ["item", "count"],
+                        "additionalProperties": False
+                    },
                     "code": {"type": "integer"},
-                    "delay": {"type": "number"},
+                    "variants": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                                "match": {
+                                    "type": "object",
+                                    "properties": {
+                                        source: {
+                                            "type": "object",
+                                            "additionalProperties": {
+                                                "anyOf": [
+                                                    {"type": ["string", "number", "boolean", "null"]},
+                                                    {
+                                                        "type": "object",
+                                                        "properties": {"pattern": {"type": "string"}},
+                                                        "required": ["pattern"],
+                                                        "additionalProperties": False
+                                                    }
+                                                ]
+                                            }
+                                        }
+                                        for source in ("path", "query", "headers", "body")
+                                    },
+                                    "additionalProperties": False
+                                },
+                                # Everything else overrides the route's response for matching requests.
+                                "data": {},
+                                "body_file": {"$ref": "#/items/properties/response/properties/body_file"},
+                                "generate": {"$ref": "#/items/properties/response/properties/generate"},
+                                "code": {"type": "integer"},
+                                "delay": {"$ref": "#/items/properties/response/properties/delay"},
+                                "fault": {"$ref": "#/items/properties/response/properties/fault"},
+                                "headers": {"$ref": "#/items/properties/response/properties/headers"}
+                            },
+                            "required": ["match"],
+                            "additionalProperties": False
+                        }
+                    },
+                    "delay": {
+                        "anyOf": [
+                            {"type": "number"},
+                            {
+                                "type": "object",
+                                "properties": {
+                                    "distribution": {"type": "string", "enum": ["uniform", "normal", "lognormal", "percentiles"]},
+                                    "min": {"type": "number", "minimum": 0},
+                                    "max": {"type": "number", "minimum": 0},
+                                    "mean": {"type": "number"},
+                                    "stddev": {"type": "number", "minimum": 0},
+                                    "median": {"type": "number", "exclusiveMinimum": 0},
+                                    "sigma": {"type": "number", "minimum": 0},
+                                    "seed": {"type": "integer"}
+                                },
+                                "patternProperties": {"^p[0-9]+(\\.[0-9]+)?$": {"type": "number", "minimum": 0}},
+                                "required": ["distribution"],
+                                "additionalProperties": False
+                            }
+                        ]
+                    },
+                    "fault": {
+                        "type": "object",
+                        "properties": {
+                            "probability": {"type": "number", "minimum": 0, "maximum": 1},
+                            "code": {"type": "integer", "minimum": 100, "maximum": 599},
+                            "data": {},
+                            "headers": {"type": "object", "patternProperties": {".*": {"type": "string"}}},
+                            "seed": {"type": "integer"}
+                        },
+                        "required": ["probability"],
+                        "additionalProperties": False
+                    },
                     "headers": {"type": "object", "patternProperties": {".*": {"type": "string"}}}
                 },
-                "required": ["data"],
+                # A response without a `body_file` or `generate` needs `data`.
+                "if": {"not": {"anyOf": [{"required": ["body_file"]}, {"required": ["generate"]}]}},
+                "then": {"required": ["data"]},
                 "additionalProperties": False
             },
             "auth": {
@@ -42,7 +140,9 @@ API_SCHEMA = {
                         "required": ["username", "password"],
                         "additionalProperties": False
                     },
-                    "bearer_token": {"type": "string"}
+                    "bearer_token": {"type": "string"},
+                    "api_keys_file": {"type": "string"},
+                    "bearer_tokens_file": {"type": "string"}
                 },
                 "minProperties": 1,
                 "additionalProperties": False
@@ -51,12 +151,27 @@ API_SCHEMA = {
                 "type": "object",
                 "properties": {
                     "requests": {"type": "integer", "minimum": 1},
-                    "window": {"type": "integer", "minimum": 1}
+                    "window": {"type": "integer", "minimum": 1},
+                    "algorithm": {"type": "string", "enum": ["sliding_log", "sliding_window", "token_bucket"]}
                 },
                 "required": ["requests", "window"],
                 "additionalProperties": False
             },
+            "resource": {
+                "type": "object",
+                "properties": {
+                    "id_param": {"type": "string", "pattern": "^\\w+$"},
+                    "id_field": {"type": "string"},
+                    "indexes": {"type": "array", "items": {"type": "string"}},
+                    "max_records": {"type": "integer", "minimum": 1},
+                    "max_bytes": {"type": "integer", "minimum": 1},
+                    "snapshot": {"type": "string"},
+                    "data": {"type": "array", "items": {"type": "object"}}
+                },
+                "additionalProperties": False
+            },
             "request_body": {"type": "object"},
+            "request_schema": {"type": "object"},
             "query_params": {
                 "type": "array",
                 "items": {
@@ -71,26 +186,45 @@ API_SCHEMA = {
                 }
             }
         },
-        "required": ["path", "methods", "response"],
+        "required": ["path"],
+        # A route either answers with a canned `response` or is a stateful `resource`.
+        "if": {"required": ["resource"]},
+        "then": {"not": {"required": ["response"]}},
+        "else": {"required": ["methods", "response"]},
         "additionalProperties": False
     }
 }
 
-def load_and_validate_config(config_path):
-    with open(config_path, 'r') as f:
-        try:
-            if config_path.lower().endswith(('.yml', '.yaml')):
-                routes_config = yaml.safe_load(f)
-            else:
-                routes_config = json.load(f)
-        except (json.JSONDecodeError, yaml.YAMLError) as e:
-            raise ValueError(f"Failed to parse {config_path}: {e}") from e
+# API_SCHEMA is checked and compiled once rather than on every load.
+_API_VALIDATOR_CLASS = jsonschema.validators.validator_for(API_SCHEMA)
+_API_VALIDATOR_CLASS.check_schema(API_SCHEMA)
+_API_VALIDATOR = _API_VALIDATOR_CLASS(API_SCHEMA)
+
+class ConfigError(Exception):
+    """Raised when a configuration does not match API_SCHEMA; `message` is the schema error."""
+    def __init__(self, message):
+        super().__init__(f"Invalid api.json: {message}")
+        self.message = message
 
+def parse_and_validate_config(content, config_path):
+    """Parses raw config bytes (JSON, or YAML if `config_path` says so) and validates them."""
     try:
-        jsonschema.validate(instance=routes_config, schema=API_SCHEMA)
-    except ValidationError as e:
-        raise Exception(f"Invalid api.json: {e.message}") from e
+        if config_path.lower().endswith(('.yml', '.yaml')):
+            routes_config = yaml.safe_load(content)
+        else:
+            routes_config = json.loads(content)
+    except (json.JSONDecodeError, UnicodeDecodeError, yaml.YAMLError) as e:
+        raise ValueError(f"Failed to parse {config_path}: {e}") from e
+
+    error = jsonschema.exceptions.best_match(_API_VALIDATOR.iter_errors(routes_config))
+    if error is not None:
+        raise ConfigError(error.message) from error
 
     return routes_config
 
-__all__ = ["load_and_validate_config", "ValidationError", "API_SCHEMA"]
+def load_and_validate_config(config_path):
+    with open(config_path, 'rb') as f:
+        content = f.read()
+    return parse_and_validate_config(content, config_path)
+
+__all__ = ["load_and_validate_config", "parse_and_validate_config", "ConfigError", "ValidationError", "API_SCHEMA"]
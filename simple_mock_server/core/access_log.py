@@ -0,0 +1,151 @@
+"""
+Structured access log written as JSON Lines by a background thread.
+
+Request threads only build a small dict and put it on a bounded queue; formatting and
+file writes happen on the writer thread, in batches. When the queue is full the record
+is dropped and counted rather than blocking the request. Each line looks like:
+
+    {"ts": 1700000000.123, "method": "GET", "path": "/users/7", "query": "a=1",
+     "route": "/users/<user_id>", "status": 200, "duration_ms": 0.41, "client": "127.0.0.1"}
+"""
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+from .metrics import observe_access_log
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 512
+# Longest time, in seconds, a record waits on the queue before it is written.
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+_STOP = object()
+
+class AccessLog:
+    """
+    A queue-backed JSONL access log.
+
+    `sample_rate` is the fraction of requests that are logged. The writer thread is
+    started on first use in each process, so an AccessLog created before forking
+    workers gives every worker its own writer appending to the same file.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> queue.Queue:
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child inherits the queue object but not the writer thread.
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name='access-log-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def log(self, record: Dict[str, Any]) -> None:
+        """Queues `record` without blocking; sampled-out and dropped records are only counted."""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            observe_access_log('sampled_out')
+            return
+        records = self._queue
+        if records is None or self._pid != os.getpid():
+            records = self._start()
+        try:
+            records.put_nowait(record)
+        except queue.Full:
+            observe_access_log('dropped')
+
+    def _run(self, records: queue.Queue) -> None:
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                try:
+                    record = records.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch: List[Dict[str, Any]] = []
+                while record is not _STOP:
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        record = records.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._write(f, batch)
+                if record is _STOP:
+                    return
+
+    def _write(self, f: Any, batch: List[Dict[str, Any]]) -> None:
+        try:
+            # One write per batch; with O_APPEND, workers sharing the file do not interleave lines.
+            f.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in batch))
+            f.flush()
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Could not write {len(batch)} access log records to {self.path}: {e}")
+            observe_access_log('dropped', len(batch))
+            return
+        observe_access_log('written', len(batch))
+
+    def close(self, timeout: float = 5) -> None:
+        """Writes out the queued records and stops this process's writer thread."""
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                return
+            records, thread = self._queue, self._thread
+            self._pid = self._thread = self._queue = None
+        try:
+            records.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+_access_log: Optional[AccessLog] = None
+
+def get_access_log() -> Optional[AccessLog]:
+    """Returns the active access log, or None if access logging is off."""
+    return _access_log
+
+def set_access_log(access_log: Optional[AccessLog]) -> None:
+    """Replaces the active access log; None turns access logging off."""
+    global _access_log
+    _access_log = access_log
+
+def close_access_log() -> None:
+    """Flushes and stops the active access log, if any."""
+    if _access_log is not None:
+        _access_log.close()
+
+def log_access(request: Any, route: str, status: int, duration: float, timestamp: float) -> None:
+    """Records one request in the active access log. Does nothing when access logging is off."""
+    access_log = _access_log
+    if access_log is None:
+        return
+    access_log.log({
+        'ts': round(timestamp, 6),
+        'method': request.method,
+        'path': request.path,
+        'query': request.query_string.decode('latin-1'),
+        'route': route,
+        'status': status,
+        'duration_ms': round(duration * 1000, 3),
+        'client': request.remote_addr,
+    })
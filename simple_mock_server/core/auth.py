@@ -1,10 +1,29 @@
+"""
+Route authentication, compiled once per route when the configuration is loaded.
+
+Secrets are compared with `hmac.compare_digest`, and the expected Basic credentials are
+pre-encoded, so the accepted path never decodes the `Authorization` header. Large sets
+of API keys or bearer tokens (`api_keys_file`, `bearer_tokens_file`) are held as SHA-256
+digests with O(1) lookups; routes naming the same file share one set. Credential files
+are re-read when they change, checked at most every CREDENTIAL_RECHECK_INTERVAL seconds.
+"""
 import base64
-from flask import jsonify, request, Response, Request
+import hashlib
+import hmac
+import os
+import threading
+import time
+import weakref
+from flask import jsonify, Response
 import logging
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, FrozenSet
+from .context import RequestContext
 
 logger = logging.getLogger(__name__)
 
+# Seconds between checks of a credential file for changes.
+CREDENTIAL_RECHECK_INTERVAL = 1.0
+
 def _unauthorized_response(message: str, headers: Optional[Dict[str, str]] = None) -> Tuple[Response, int]:
     """Creates a 401 Unauthorized response."""
     response = jsonify({"error": "Unauthorized", "message": message})
@@ -14,70 +33,196 @@ def _unauthorized_response(message: str, headers: Optional[Dict[str, str]] = Non
             response.headers[key] = value
     return response, 401
 
-def _check_api_key(auth_config: Dict[str, Any], request: "Request") -> Optional[Tuple[Response, int]]:
-    """Checks for a valid API key."""
-    api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
-    if not api_key or api_key != auth_config['api_key']:
-        logger.warning(f"Unauthorized API Key access to {request.path}")
-        return _unauthorized_response("Invalid or missing API key")
-    return None
-
-def _check_basic_auth(auth_config: Dict[str, Any], auth_header: str, request: "Request") -> Optional[Tuple[Response, int]]:
-    """Checks for valid Basic authentication credentials."""
-    if not auth_header or not auth_header.lower().startswith('basic '):
-        logger.warning(f"Missing Basic Auth header for {request.path}")
-        return _unauthorized_response("Missing Basic authentication header", {'WWW-Authenticate': 'Basic realm="Authentication Required"'})
-
-    try:
-        encoded_credentials = auth_header.split(' ', 1)[1]
-        decoded_credentials = base64.b64decode(encoded_credentials).decode('utf-8')
-        username, password = decoded_credentials.split(':', 1)
-        if username != auth_config['basic_auth']['username'] or password != auth_config['basic_auth']['password']:
-            logger.warning(f"Invalid Basic Auth credentials for {request.path}")
-            return _unauthorized_response("Invalid Basic authentication credentials")
-    except Exception:
-        logger.exception(f"Invalid Basic Auth header format for {request.path}")
-        return _unauthorized_response("Invalid Basic authentication header format")
-    return None
-
-def _check_bearer_token(auth_config: Dict[str, Any], auth_header: str, request: "Request") -> Optional[Tuple[Response, int]]:
-    """Checks for a valid Bearer token."""
-    if not auth_header or not auth_header.lower().startswith('bearer '):
-        logger.warning(f"Missing Bearer Token header for {request.path}")
-        return _unauthorized_response("Missing Bearer authentication header", {'WWW-Authenticate': 'Bearer realm="Authentication Required"'})
-
-    token = auth_header.split(' ', 1)[1]
-    if token != auth_config['bearer_token']:
-        logger.warning(f"Invalid Bearer Token for {request.path}")
-        return _unauthorized_response("Invalid Bearer token")
-    return None
-
-def check_authentication(response_config: Dict[str, Any], request: "Request", route_template_path: str) -> Optional[Tuple[Response, int]]:
+def _digest(credential: str) -> bytes:
+    return hashlib.sha256(credential.encode('utf-8')).digest()
+
+def _read_credentials(path: str) -> FrozenSet[bytes]:
+    """Reads one credential per line; blank lines and lines starting with `#` are ignored."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return frozenset(_digest(line) for line in (raw.strip() for raw in f) if line and not line.startswith('#'))
+
+def _file_key(path: str) -> Tuple[int, int, int, int]:
+    stat = os.stat(path)
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+class CredentialSet:
+    """
+    The API keys or bearer tokens listed in a file, stored as SHA-256 digests.
+
+    Hashing the presented credential before the set lookup keeps the lookup time
+    independent of how much of a valid credential the caller guessed.
+    """
+    __slots__ = ('path', 'digests', '_key', '_checked_at', '_lock', '__weakref__')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._key = _file_key(path)
+        self.digests = _read_credentials(path)
+        self._checked_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+    def __contains__(self, credential: str) -> bool:
+        if time.monotonic() - self._checked_at >= CREDENTIAL_RECHECK_INTERVAL:
+            self._refresh()
+        return _digest(credential) in self.digests
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._checked_at < CREDENTIAL_RECHECK_INTERVAL:
+                return
+            try:
+                key = _file_key(self.path)
+                if key != self._key:
+                    self.digests = _read_credentials(self.path)
+                    self._key = key
+                    logger.info(f"Reloaded {len(self.digests)} credentials from {self.path}")
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning(f"Keeping previous credentials; could not reload {self.path}: {e}")
+            self._checked_at = time.monotonic()
+
+_credential_sets: "weakref.WeakValueDictionary[str, CredentialSet]" = weakref.WeakValueDictionary()
+_credential_sets_lock = threading.Lock()
+
+def credential_set(path: str) -> CredentialSet:
+    """
+    Returns the shared CredentialSet for the file at `path`, loading it on first use.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    path = os.path.realpath(path)
+    with _credential_sets_lock:
+        credentials = _credential_sets.get(path)
+        if credentials is None:
+            credentials = _credential_sets[path] = CredentialSet(path)
+            logger.info(f"Loaded {len(credentials)} credentials from {path}")
+        return credentials
+
+def _matches(presented: str, expected: Optional[bytes], credentials: Optional[CredentialSet]) -> bool:
+    if expected is not None and hmac.compare_digest(presented.encode('utf-8'), expected):
+        return True
+    return credentials is not None and presented in credentials
+
+class Authenticator:
+    """
+    A route's `auth` configuration compiled for per-request checks.
+
+    Relative credential file paths are resolved against `base_dir`. Snapshots keep only
+    the configuration; credential sets are looked up again when a snapshot is loaded.
+    """
+    __slots__ = ('config', 'base_dir', 'scheme', 'secret', 'credentials')
+
+    def __init__(self, auth_config: Dict[str, Any], base_dir: str = '.'):
+        self.config = auth_config
+        self.base_dir = base_dir
+        self.secret: Optional[bytes] = None
+        self.credentials: Optional[CredentialSet] = None
+        if auth_config.get('api_key') or auth_config.get('api_keys_file'):
+            self.scheme = 'api_key'
+            secret, credentials_file = auth_config.get('api_key'), auth_config.get('api_keys_file')
+        elif auth_config.get('basic_auth'):
+            self.scheme = 'basic'
+            basic = auth_config['basic_auth']
+            secret, credentials_file = base64.b64encode(f"{basic['username']}:{basic['password']}".encode('utf-8')).decode('ascii'), None
+        elif auth_config.get('bearer_token') or auth_config.get('bearer_tokens_file'):
+            self.scheme = 'bearer'
+            secret, credentials_file = auth_config.get('bearer_token'), auth_config.get('bearer_tokens_file')
+        else:
+            self.scheme = None
+            secret, credentials_file = None, None
+        if secret:
+            self.secret = secret.encode('utf-8')
+        if credentials_file:
+            self.credentials = credential_set(os.path.join(base_dir, credentials_file))
+
+    def __reduce__(self):
+        return (Authenticator, (self.config, self.base_dir))
+
+    def check(self, ctx: "RequestContext") -> Optional[Tuple[Response, int]]:
+        """Returns a 401 response tuple if the request is not authenticated, otherwise None."""
+        if self.scheme == 'api_key':
+            return self._check_api_key(ctx)
+        if self.scheme == 'basic':
+            return self._check_basic_auth(ctx)
+        if self.scheme == 'bearer':
+            return self._check_bearer_token(ctx)
+        return None
+
+    def _check_api_key(self, ctx: "RequestContext") -> Optional[Tuple[Response, int]]:
+        """Checks for a valid API key."""
+        request = ctx.request
+        api_key = request.headers.get('X-API-Key') or ctx.query_args.get('api_key')
+        if not api_key or not _matches(api_key, self.secret, self.credentials):
+            logger.debug(f"Unauthorized API Key access to {request.path}")
+            return _unauthorized_response("Invalid or missing API key")
+        return None
+
+    def _check_basic_auth(self, ctx: "RequestContext") -> Optional[Tuple[Response, int]]:
+        """Checks for valid Basic authentication credentials."""
+        request = ctx.request
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header[:6].lower() == 'basic ':
+            logger.debug(f"Missing Basic Auth header for {request.path}")
+            return _unauthorized_response("Missing Basic authentication header", {'WWW-Authenticate': 'Basic realm="Authentication Required"'})
+
+        if hmac.compare_digest(auth_header[6:].encode('utf-8'), self.secret):
+            return None
+        # Only rejected requests are decoded, to tell malformed headers from wrong credentials.
+        try:
+            base64.b64decode(auth_header[6:]).decode('utf-8').split(':', 1)[1]
+        except (ValueError, IndexError):
+            logger.debug(f"Invalid Basic Auth header format for {request.path}")
+            return _unauthorized_response("Invalid Basic authentication header format")
+        logger.debug(f"Invalid Basic Auth credentials for {request.path}")
+        return _unauthorized_response("Invalid Basic authentication credentials")
+
+    def _check_bearer_token(self, ctx: "RequestContext") -> Optional[Tuple[Response, int]]:
+        """Checks for a valid Bearer token."""
+        request = ctx.request
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header[:7].lower() == 'bearer ':
+            logger.debug(f"Missing Bearer Token header for {request.path}")
+            return _unauthorized_response("Missing Bearer authentication header", {'WWW-Authenticate': 'Bearer realm="Authentication Required"'})
+
+        if not _matches(auth_header[7:], self.secret, self.credentials):
+            logger.debug(f"Invalid Bearer Token for {request.path}")
+            return _unauthorized_response("Invalid Bearer token")
+        return None
+
+def compile_auth(auth_config: Optional[Dict[str, Any]], base_dir: str = '.') -> Optional[Authenticator]:
+    """
+    Compiles a route's `auth` configuration; None if the route is not protected.
+
+    Raises:
+        OSError: If a credential file cannot be read.
+    """
+    if not auth_config or auth_config.get('skip_auth'):
+        return None
+    return Authenticator(auth_config, base_dir)
+
+def check_authentication(response_config: Dict[str, Any], ctx: "RequestContext", route_template_path: str) -> Optional[Tuple[Response, int]]:
     """
     Handles authentication logic for a given request based on the route's configuration.
 
+    Uses the route's precompiled `authenticator`; a response config without one (built
+    outside `compile_routes`) is compiled on the fly.
+
     Args:
         response_config: The response configuration for the current route.
-        request: The incoming Flask request object.
+        ctx: The context of the incoming request.
         route_template_path: The template path of the route being accessed.
 
     Returns:
         An optional tuple containing a Flask Response object and a status code if authentication fails,
         otherwise None.
     """
-    auth_config = response_config.get('auth')
-    if not auth_config or auth_config.get('skip_auth'):
+    if 'authenticator' in response_config:
+        authenticator = response_config['authenticator']
+    else:
+        authenticator = compile_auth(response_config.get('auth'))
+    if authenticator is None:
         return None
-
-    auth_header = request.headers.get('Authorization')
-
-    if auth_config.get('api_key'):
-        return _check_api_key(auth_config, request)
-    
-    if auth_config.get('basic_auth'):
-        return _check_basic_auth(auth_config, auth_header, request)
-
-    if auth_config.get('bearer_token'):
-        return _check_bearer_token(auth_config, auth_header, request)
-
-    return None
+    return authenticator.check(ctx)
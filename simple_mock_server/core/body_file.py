@@ -0,0 +1,96 @@
+"""
+Response bodies served from files on disk (`response.body_file`).
+
+Under a server that provides `wsgi.file_wrapper` (the `--async` server, gunicorn, ...) the
+file is handed to the server, which sends it with `sendfile`. Otherwise the file is
+memory-mapped once per version and streamed from the mapping. Either way the body never
+becomes a Python object in full. The file is re-stat'ed on each request, so edits are
+picked up without a reload. Replace fixtures atomically (write a new file, then rename it)
+rather than truncating them in place while they are being served.
+"""
+import mimetypes
+import mmap
+import os
+import threading
+from flask import Response
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+CHUNK_SIZE = 64 * 1024
+
+class _MappedFile:
+    """One version of the file, identified by its stat key, and its read-only mapping."""
+    __slots__ = ('key', 'size', 'map')
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.key = _stat_key(stat)
+            self.size = stat.st_size
+            # mmap() rejects empty files; the mapping stays valid after the file is closed.
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def chunks(self) -> Iterator[bytes]:
+        for offset in range(0, self.size, CHUNK_SIZE):
+            yield self.map[offset:offset + CHUNK_SIZE]
+
+def _stat_key(stat: os.stat_result) -> Tuple[int, int, int, int]:
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+class FileBody:
+    """A response body backed by a file."""
+    __slots__ = ('path', 'content_type', '_lock', '_mapped')
+
+    def __init__(self, path: str, content_type: Optional[str] = None):
+        self.path = path
+        if content_type is None:
+            if path.lower().endswith('.json'):
+                content_type = 'application/json'
+            else:
+                content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.content_type = content_type
+        self._lock = threading.Lock()
+        self._mapped: Optional[_MappedFile] = None
+
+    def __reduce__(self):
+        # Snapshots keep only the path; mappings are per process.
+        return (FileBody, (self.path, self.content_type))
+
+    def _current(self) -> _MappedFile:
+        mapped = self._mapped
+        if mapped is None or mapped.key != _stat_key(os.stat(self.path)):
+            with self._lock:
+                mapped = self._mapped
+                if mapped is None or mapped.key != _stat_key(os.stat(self.path)):
+                    # Responses still streaming the old version keep their own reference to it.
+                    mapped = self._mapped = _MappedFile(self.path)
+        return mapped
+
+    def etag(self) -> str:
+        """
+        Returns a strong ETag derived from the file's inode, size and modification time.
+
+        Raises:
+            OSError: If the file cannot be stat'ed.
+        """
+        stat = os.stat(self.path)
+        return f"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+    def to_response(self, environ: Dict[str, Any]) -> Response:
+        """
+        Builds a response streaming the file's current contents with a precomputed Content-Length.
+
+        Raises:
+            OSError: If the file cannot be opened.
+        """
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            f = open(self.path, 'rb')
+            size = os.fstat(f.fileno()).st_size
+            body = file_wrapper(f, CHUNK_SIZE)
+        else:
+            mapped = self._current()
+            size = mapped.size
+            body = mapped.chunks()
+        resp = Response(body, mimetype=self.content_type, direct_passthrough=True)
+        resp.headers['Content-Length'] = str(size)
+        return resp
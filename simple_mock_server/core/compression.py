@@ -0,0 +1,135 @@
+"""
+Negotiated gzip/deflate compression of mock responses.
+
+Compression is opt-in, globally (`--compress`) or per route (`response.compress`).
+Bodies of static routes are compressed once when the routes are compiled; dynamic
+bodies are compressed per request when they reach `min_size`, and streamed bodies
+(generated lists) are compressed chunk by chunk.
+"""
+import zlib
+from flask import Response
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+from .metrics import observe_compression
+
+DEFAULT_LEVEL = 6
+# Bodies smaller than this are sent as-is; the headers would cost more than they save.
+DEFAULT_MIN_SIZE = 1024
+# zlib window bits selecting the container of each encoding ("deflate" is the zlib format).
+_WBITS = {'gzip': 31, 'deflate': 15}
+
+def compression_settings(level: int = DEFAULT_LEVEL, min_size: int = DEFAULT_MIN_SIZE, enabled: bool = True) -> Dict[str, Any]:
+    """
+    Returns compression settings for `create_mock_server(compression=...)`.
+
+    With `enabled=False` only routes that set `response.compress` are compressed, still
+    using `level` and `min_size` as their defaults.
+    """
+    return {'enabled': enabled, 'level': level, 'min_size': min_size}
+
+def route_compression(defaults: Optional[Dict[str, Any]], override: Union[bool, Dict[str, int], None]) -> Optional[Dict[str, Any]]:
+    """
+    Resolves the compression settings of one route.
+
+    `defaults` are the server-wide settings from `compression_settings`, or None, and
+    `override` is the route's `response.compress`: true or false to turn compression
+    on or off, or an object overriding `level` and/or `min_size`.
+
+    Returns:
+        The settings to use, or None if the route's responses are never compressed.
+    """
+    if override is False or (override is None and not (defaults and defaults['enabled'])):
+        return None
+    settings = dict(defaults or compression_settings())
+    if isinstance(override, dict):
+        settings.update(override)
+    return settings
+
+def negotiate(accept_encodings: Any) -> Optional[str]:
+    """Picks gzip or deflate from a parsed Accept-Encoding header, preferring gzip on ties."""
+    gzip_quality = accept_encodings['gzip']
+    deflate_quality = accept_encodings['deflate']
+    if gzip_quality <= 0 and deflate_quality <= 0:
+        return None
+    return 'gzip' if gzip_quality >= deflate_quality else 'deflate'
+
+def compress(data: bytes, encoding: str, level: int = DEFAULT_LEVEL) -> bytes:
+    """Compresses `data` for the given Content-Encoding. gzip output carries no timestamp."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+def precompress(body: bytes, settings: Optional[Dict[str, Any]]) -> Dict[str, bytes]:
+    """Returns the compressed variants of a static body that are worth sending, by encoding."""
+    if settings is None or len(body) < settings['min_size']:
+        return {}
+    variants = {}
+    for encoding in _WBITS:
+        compressed = compress(body, encoding, settings['level'])
+        if len(compressed) < len(body):
+            variants[encoding] = compressed
+    return variants
+
+def _compress_stream(chunks: Iterable[bytes], encoding: str, level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+    original_size = compressed_size = 0
+    try:
+        for chunk in chunks:
+            original_size += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                compressed_size += len(data)
+                yield data
+        data = compressor.flush()
+        compressed_size += len(data)
+        yield data
+        observe_compression(encoding, original_size, compressed_size)
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+def _set_encoding(rv: Response, encoding: str) -> None:
+    rv.headers['Content-Encoding'] = encoding
+    etag, _ = rv.get_etag()
+    if etag is not None:
+        rv.set_etag(f"{etag}-{encoding}")
+
+def compress_response(rv: Any, request: Any, settings: Optional[Dict[str, Any]],
+                      variants: Optional[Dict[str, bytes]] = None) -> Any:
+    """
+    Compresses a view's response for the client's Accept-Encoding.
+
+    `variants` are precomputed bodies of a static response (see `precompress`). File
+    bodies, error tuples, 204/304 responses and bodies that already carry a
+    Content-Encoding are returned unchanged. A compressed response's ETag gets the
+    encoding appended, so each variant has its own strong validator.
+    """
+    if settings is None or not isinstance(rv, Response):
+        return rv
+    if rv.direct_passthrough or rv.status_code == 204 or 'Content-Encoding' in rv.headers:
+        return rv
+    rv.vary.add('Accept-Encoding')
+    if rv.status_code == 304:
+        return rv
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return rv
+
+    if rv.is_streamed:
+        rv.response = _compress_stream(rv.response, encoding, settings['level'])
+        rv.headers.pop('Content-Length', None)
+        _set_encoding(rv, encoding)
+        return rv
+
+    body = rv.get_data()
+    if variants is not None:
+        compressed = variants.get(encoding)
+    elif len(body) >= settings['min_size']:
+        compressed = compress(body, encoding, settings['level'])
+    else:
+        compressed = None
+    if compressed is None or len(compressed) >= len(body):
+        return rv
+    rv.set_data(compressed)
+    _set_encoding(rv, encoding)
+    observe_compression(encoding, len(body), len(compressed))
+    return rv
@@ -0,0 +1,65 @@
+import json
+import logging
+from flask import Request
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Requests whose body is larger than this are rejected with 413 before any parsing.
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+
+_UNPARSED = object()
+
+def client_id_of(request: "Request", auth_config: Optional[Dict[str, Any]]) -> str:
+    """Extracts the client ID from the request based on API key or IP address."""
+    if auth_config and (auth_config.get('api_key') or auth_config.get('api_keys_file')):
+        return request.headers.get('X-API-Key') or request.args.get('api_key') or request.remote_addr
+    return request.remote_addr
+
+class RequestContext:
+    """
+    Per-request state shared by the rate-limit, auth, validation and templating stages.
+
+    The query args and client id are resolved once when the context is built. The JSON
+    body is decoded at most once, on first use, so requests rejected before validation
+    never pay for parsing.
+    """
+    __slots__ = ('request', 'path_params', 'query_args', 'client_id', 'is_json', '_body', '_body_error')
+
+    def __init__(self, request: "Request", path_params: Dict[str, Any], auth_config: Optional[Dict[str, Any]] = None):
+        self.request = request
+        self.path_params = path_params
+        self.query_args = request.args
+        self.client_id = client_id_of(request, auth_config)
+        self.is_json = request.is_json
+        self._body = _UNPARSED
+        self._body_error: Optional[ValueError] = None
+
+    def body(self) -> Any:
+        """
+        Returns the decoded JSON body, or None if the request is not JSON.
+
+        Raises:
+            ValueError: If the body is not valid JSON.
+        """
+        if self._body is _UNPARSED:
+            self._body = None
+            if self.is_json:
+                try:
+                    self._body = json.loads(self.request.get_data(cache=True))
+                except ValueError as e:
+                    self._body_error = e
+        if self._body_error is not None:
+            raise self._body_error
+        return self._body
+
+    def body_params(self) -> Any:
+        """Returns the decoded JSON body, or an empty dict if it is missing or malformed."""
+        try:
+            return self.body() or {}
+        except ValueError:
+            return {}
+
+def body_too_large(request: "Request", max_body_size: Optional[int]) -> bool:
+    """Returns True if the declared Content-Length exceeds `max_body_size`."""
+    return max_body_size is not None and (request.content_length or 0) > max_body_size
@@ -0,0 +1,64 @@
+"""
+Strong ETags and `If-None-Match` handling for mock responses.
+
+A response's ETag identifies its uncompressed body; compressed variants append the
+encoding (`<etag>-gzip`), as `/openapi.json` does. Static routes hash their body once
+at load time, file and generated bodies derive their tag without reading or rendering
+the body, and templated bodies are hashed after rendering.
+"""
+import hashlib
+from flask import Response
+from typing import Any, Optional
+
+# Encodings whose variants share the identity ETag plus a suffix (see core.compression).
+_ENCODINGS = ('gzip', 'deflate')
+# Headers that describe a body and must not be sent with a 304.
+_BODY_HEADERS = frozenset(('Content-Type', 'Content-Length', 'Content-Encoding', 'Transfer-Encoding'))
+
+def body_etag(body: bytes) -> str:
+    """Returns the (unquoted) strong ETag of a response body."""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+def matching_etag(request: Any, etag: str) -> Optional[str]:
+    """
+    Returns the tag in the request's If-None-Match that matches `etag` or one of its
+    encoded variants, or None. Only GET and HEAD requests are answered with 304.
+    """
+    if request.method not in ('GET', 'HEAD') or not request.if_none_match:
+        return None
+    if_none_match = request.if_none_match
+    if if_none_match.contains_weak(etag):
+        return etag
+    for encoding in _ENCODINGS:
+        variant = f"{etag}-{encoding}"
+        if if_none_match.contains_weak(variant):
+            return variant
+    return None
+
+def not_modified(rv: Response, etag: str) -> Response:
+    """Turns `rv` into a bodiless 304 that keeps its non-body headers."""
+    resp = Response(status=304, headers=[(name, value) for name, value in rv.headers.items() if name not in _BODY_HEADERS])
+    resp.headers.pop('Content-Type', None)
+    resp.set_etag(etag)
+    rv.close()
+    return resp
+
+def conditional_response(rv: Any, request: Any) -> Any:
+    """
+    Tags a successful response with its ETag and answers a matching If-None-Match with 304.
+
+    Responses that already carry an ETag keep it. Streamed and file responses without
+    one, error tuples, and non-2xx or 204 responses are returned unchanged.
+    """
+    if not isinstance(rv, Response) or not 200 <= rv.status_code < 300 or rv.status_code == 204:
+        return rv
+    etag, _ = rv.get_etag()
+    if etag is None:
+        if rv.is_streamed or rv.direct_passthrough:
+            return rv
+        etag = body_etag(rv.get_data())
+        rv.set_etag(etag)
+    matched = matching_etag(request, etag)
+    if matched is not None:
+        return not_modified(rv, matched)
+    return rv
@@ -0,0 +1,259 @@
+"""
+Generated list responses (`response.generate`).
+
+An item template is compiled once into literal JSON text and slots. Items are rendered
+lazily, one index at a time, and streamed with chunked transfer encoding, so a
+10M-item list never exists in memory. Random values come from a hash of
+(seed, index, slot), so item N is the same on every request and a page can start at
+any index without generating the items before it.
+
+Generator placeholders, usable anywhere in the item next to the usual `{param}`,
+`{query_param:...}` and `{body_param:...}` ones:
+
+* `{index}`: the item's zero-based index
+* `{random_int:MIN:MAX}`: an integer between MIN and MAX, inclusive
+* `{random_float}` / `{random_float:MIN:MAX}`: a float in [0, 1) or [MIN, MAX)
+* `{random_bool}`: true or false
+* `{random_choice:a|b|c}`: one of the listed strings
+* `{uuid}`: a UUID4-formatted string
+
+A string consisting of exactly one numeric or boolean placeholder is emitted as a JSON
+number or boolean instead of a string.
+"""
+import hashlib
+import json
+import re
+from json.encoder import encode_basestring_ascii
+from flask import Response, jsonify
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from .etag import matching_etag, not_modified
+from .templating import TextTemplate, encode_key, compile_text_template
+
+# Default `limit` when a request asks for a `page` without one.
+DEFAULT_PAGE_LIMIT = 100
+# Rendered items are batched into chunks of roughly this many bytes.
+CHUNK_SIZE = 64 * 1024
+
+_TOKEN_RE = re.compile(r'\{(index|uuid|random_bool|random_int:[^{}]*|random_float(?::[^{}]*)?|random_choice:[^{}]*)\}')
+_MASK = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+def _mix(x: int) -> int:
+    """splitmix64 finalizer: a fast, well-distributed 64-bit hash."""
+    x = (x + _GOLDEN) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+class _GeneratedValue:
+    """One generator placeholder; `render(seed, index)` returns its JSON text."""
+    __slots__ = ('kind', 'salt', 'args', 'whole')
+
+    def __init__(self, token: str, salt: int, whole: bool):
+        self.kind, _, arguments = token.partition(':')
+        self.salt = salt
+        # Literal JSON (numbers, booleans) only when the placeholder is the entire string value.
+        self.whole = whole and self.kind in ('index', 'random_int', 'random_float', 'random_bool')
+        if self.kind == 'random_int':
+            low, high = (int(value) for value in arguments.split(':'))
+            if high < low:
+                raise ValueError(f"random_int range is empty: {token}")
+            self.args = (low, high - low + 1)
+        elif self.kind == 'random_float':
+            low, high = (float(value) for value in arguments.split(':')) if arguments else (0.0, 1.0)
+            self.args = (low, high - low)
+        elif self.kind == 'random_choice':
+            options = arguments.split('|')
+            # Options are embedded inside a JSON string, so escape them once here.
+            self.args = tuple(encode_basestring_ascii(option)[1:-1] for option in options)
+        else:
+            self.args = ()
+
+    def render(self, seed: int, index: int) -> str:
+        kind = self.kind
+        if kind == 'index':
+            return str(index)
+        bits = _mix(seed ^ _mix(index * _GOLDEN + self.salt))
+        if kind == 'random_int':
+            return str(self.args[0] + bits % self.args[1])
+        if kind == 'random_float':
+            return repr(self.args[0] + (bits >> 11) * (1.0 / (1 << 53)) * self.args[1])
+        if kind == 'random_bool':
+            return 'true' if bits & 1 else 'false'
+        if kind == 'random_choice':
+            return self.args[bits % len(self.args)]
+        high = _mix(bits)
+        value = f"{bits:016x}{high:016x}"
+        return f"{value[:8]}-{value[8:12]}-4{value[13:16]}-{'89ab'[high & 3]}{value[17:20]}-{value[20:32]}"
+
+class _Quoted:
+    """A request-dependent string piece, JSON-escaped when bound to a request."""
+    __slots__ = ('template',)
+
+    def __init__(self, template: TextTemplate):
+        self.template = template
+
+class GeneratedList:
+    """A compiled `response.generate` spec."""
+    __slots__ = ('count', 'seed', 'parts', 'digest')
+
+    def __init__(self, count: int, seed: int, parts: List[Union[str, _Quoted, _GeneratedValue]], digest: str = ''):
+        self.count = count
+        self.seed = _mix(seed & _MASK)
+        self.parts = parts
+        # Identifies the spec in ETags; a page's tag is derived from it without rendering.
+        self.digest = digest
+
+    def _bind(self, path_params: Dict[str, Any], query_args: Any, body_params: Any) -> List[Union[str, _GeneratedValue]]:
+        """Resolves request placeholders once, leaving only per-item slots."""
+        bound: List[Union[str, _GeneratedValue]] = []
+        for part in self.parts:
+            if isinstance(part, _Quoted):
+                part = encode_basestring_ascii(part.template.render(path_params, query_args, body_params))[1:-1]
+            if isinstance(part, str) and bound and isinstance(bound[-1], str):
+                bound[-1] += part
+            else:
+                bound.append(part)
+        return bound
+
+    def _items(self, parts: List[Union[str, _GeneratedValue]], start: int, stop: int) -> Iterator[str]:
+        seed = self.seed
+        if len(parts) == 1 and isinstance(parts[0], str):
+            for _ in range(start, stop):
+                yield parts[0]
+            return
+        for index in range(start, stop):
+            yield ''.join([part if part.__class__ is str else part.render(seed, index) for part in parts])
+
+    def _etag(self, parts: List[Union[str, _GeneratedValue]], start: int, stop: int) -> str:
+        digest = hashlib.sha256(f"{self.digest}:{start}:{stop}".encode('ascii'))
+        for part in parts:
+            if isinstance(part, str):
+                digest.update(b'\0' + part.encode('ascii'))
+        return digest.hexdigest()[:32]
+
+    def iter_items(self, start: int, stop: int, path_params: Dict[str, Any] = None, query_args: Any = None,
+                   body_params: Any = None) -> Iterator[str]:
+        """Yields the JSON text of items `start` to `stop - 1`."""
+        return self._items(self._bind(path_params or {}, query_args or {}, body_params or {}), start, stop)
+
+    def iter_json(self, start: int, stop: int, path_params: Dict[str, Any] = None, query_args: Any = None,
+                  body_params: Any = None) -> Iterator[bytes]:
+        """Yields the JSON array of items `start` to `stop - 1` in chunks of about CHUNK_SIZE bytes."""
+        return _json_chunks(self.iter_items(start, stop, path_params, query_args, body_params))
+
+    def to_response(self, ctx: "RequestContext"):
+        """
+        Streams the requested page, honouring `page` and `limit` query parameters.
+
+        The page's ETag is computed before any item is rendered, so a matching
+        If-None-Match is answered with 304 straight away.
+        """
+        query_args = ctx.query_args
+        start, stop = 0, self.count
+        if 'page' in query_args or 'limit' in query_args:
+            try:
+                page = int(query_args.get('page', 1))
+                limit = int(query_args.get('limit', DEFAULT_PAGE_LIMIT))
+                if page < 1 or limit < 0:
+                    raise ValueError
+            except ValueError:
+                return jsonify({"error": "Bad Request", "message": "`page` must be a positive integer and `limit` a non-negative integer."}), 400
+            start = min((page - 1) * limit, self.count)
+            stop = min(start + limit, self.count)
+        parts = self._bind(ctx.path_params, query_args, ctx.body_params())
+        etag = self._etag(parts, start, stop)
+        matched = matching_etag(ctx.request, etag)
+        if matched is not None:
+            resp = not_modified(Response(), matched)
+        else:
+            resp = Response(_json_chunks(self._items(parts, start, stop)), mimetype='application/json')
+            resp.set_etag(etag)
+        resp.headers['X-Total-Count'] = str(self.count)
+        return resp
+
+def _json_chunks(items: Iterable[str]) -> Iterator[bytes]:
+    buffer = ['[']
+    size = 1
+    for position, item in enumerate(items):
+        if position:
+            buffer.append(',')
+        buffer.append(item)
+        size += len(item) + 1
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('ascii')
+            buffer = []
+            size = 0
+    buffer.append(']')
+    yield ''.join(buffer).encode('ascii')
+
+def _compile_string(text: str, path_params: Optional[frozenset], salt: List[int], out: List[Any]) -> None:
+    tokens = [match for match in _TOKEN_RE.finditer(text)
+              if path_params is None or match.group(1) not in path_params]
+    if len(tokens) == 1 and tokens[0].group(0) == text:
+        value = _GeneratedValue(tokens[0].group(1), salt[0], whole=True)
+        salt[0] += 1
+        if value.whole:
+            out.append(value)
+            return
+        out.append('"')
+        out.append(value)
+        out.append('"')
+        return
+
+    out.append('"')
+    position = 0
+    for match in tokens + [None]:
+        end = match.start() if match else len(text)
+        if end > position:
+            template = compile_text_template(text[position:end], path_params)
+            if template.static is not None:
+                out.append(encode_basestring_ascii(template.static)[1:-1])
+            else:
+                out.append(_Quoted(template))
+        if match:
+            out.append(_GeneratedValue(match.group(1), salt[0], whole=False))
+            salt[0] += 1
+            position = match.end()
+    out.append('"')
+
+def _compile_item(node: Any, path_params: Optional[frozenset], salt: List[int], out: List[Any]) -> None:
+    if isinstance(node, str):
+        _compile_string(node, path_params, salt, out)
+    elif isinstance(node, list):
+        out.append('[')
+        for index, item in enumerate(node):
+            if index:
+                out.append(',')
+            _compile_item(item, path_params, salt, out)
+        out.append(']')
+    elif isinstance(node, dict):
+        out.append('{')
+        for index, (key, value) in enumerate(node.items()):
+            if index:
+                out.append(',')
+            out.append(encode_key(key) + ':')
+            _compile_item(value, path_params, salt, out)
+        out.append('}')
+    else:
+        out.append(json.dumps(node, separators=(',', ':')))
+
+def compile_generated_list(spec: Dict[str, Any], path_params: Optional[Iterable[str]] = None) -> GeneratedList:
+    """
+    Compiles a `response.generate` spec (`item`, `count`, optional `seed`).
+
+    Raises:
+        ValueError: If a generator placeholder is malformed.
+    """
+    if path_params is not None:
+        path_params = frozenset(path_params)
+    pieces: List[Any] = []
+    _compile_item(spec['item'], path_params, [0], pieces)
+    parts: List[Union[str, _Quoted, _GeneratedValue]] = []
+    for piece in pieces:
+        if isinstance(piece, str) and parts and isinstance(parts[-1], str):
+            parts[-1] += piece
+        else:
+            parts.append(piece)
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return GeneratedList(spec['count'], spec.get('seed', 0), parts or [''], digest)
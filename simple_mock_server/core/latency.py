@@ -0,0 +1,179 @@
+"""
+Simulated latency (`response.delay`) and fault injection (`response.fault`).
+
+`delay` is either a fixed number of seconds or a distribution object:
+
+    {"distribution": "uniform", "min": 0.01, "max": 0.05}
+    {"distribution": "normal", "mean": 0.1, "stddev": 0.02}
+    {"distribution": "lognormal", "median": 0.05, "sigma": 0.8, "max": 5}
+    {"distribution": "percentiles", "p50": 0.02, "p90": 0.08, "p99": 0.6, "p99.9": 2.5}
+
+`min` and `max` clamp every distribution (and bound `uniform`); delays are never
+negative. A percentile table is interpolated linearly between the listed points, from
+`min` (default 0) at p0 up to the highest listed percentile, which is also the largest
+delay unless `p100` is given. With an integer `seed` the sequence of delays is
+reproducible.
+
+`fault` returns an error instead of the configured response with some probability:
+
+    {"probability": 0.02, "code": 503, "data": {"error": "Service Unavailable"}, "seed": 7}
+"""
+import bisect
+import json
+import math
+import random
+import re
+import threading
+from flask import Response
+from typing import Any, Dict, List, Optional, Tuple
+
+DISTRIBUTIONS = ('uniform', 'normal', 'lognormal', 'percentiles')
+DEFAULT_FAULT_CODE = 503
+_PERCENTILE_KEY = re.compile(r'^p(\d+(?:\.\d+)?)$')
+
+def _number(spec: Dict[str, Any], key: str, minimum: Optional[float] = None) -> float:
+    value = spec.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"'{key}' must be a number")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"'{key}' must be at least {minimum}")
+    return float(value)
+
+class DelayDistribution:
+    """A compiled `delay`; `sample()` returns the delay, in seconds, for one request."""
+    __slots__ = ('kind', 'params', 'low', 'high', 'seed', '_rng', '_lock')
+
+    def __init__(self, kind: str, params: Tuple[Any, ...], low: float = 0.0, high: float = math.inf,
+                 seed: Optional[int] = None):
+        self.kind = kind
+        self.params = params
+        self.low = low
+        self.high = high
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Snapshots restart the sequence from the seed rather than pickling a lock.
+        return (DelayDistribution, (self.kind, self.params, self.low, self.high, self.seed))
+
+    def sample(self) -> float:
+        kind = self.kind
+        if kind == 'fixed':
+            return self.params[0]
+        with self._lock:
+            if kind == 'uniform':
+                value = self._rng.uniform(self.low, self.high)
+            elif kind == 'normal':
+                value = self._rng.gauss(self.params[0], self.params[1])
+            elif kind == 'lognormal':
+                value = self._rng.lognormvariate(self.params[0], self.params[1])
+            else:
+                value = self._percentile(self._rng.random() * 100)
+        return min(max(value, self.low), self.high)
+
+    def _percentile(self, q: float) -> float:
+        ranks, values = self.params
+        index = bisect.bisect_right(ranks, q)
+        if index >= len(ranks):
+            return values[-1]
+        lower_rank, lower_value = ranks[index - 1], values[index - 1]
+        return lower_value + (values[index] - lower_value) * (q - lower_rank) / (ranks[index] - lower_rank)
+
+def compile_delay(spec: Any) -> Optional[DelayDistribution]:
+    """
+    Compiles a `delay` value; None when there is no delay.
+
+    Raises:
+        ValueError: If a distribution is unknown or its parameters are missing or invalid.
+    """
+    if spec is None or isinstance(spec, bool):
+        return None
+    if isinstance(spec, (int, float)):
+        return DelayDistribution('fixed', (float(spec),)) if spec > 0 else None
+    if not isinstance(spec, dict):
+        raise ValueError("delay must be a number or a distribution object")
+
+    kind = spec.get('distribution')
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown delay distribution {kind!r}; expected one of {', '.join(DISTRIBUTIONS)}")
+    seed = spec.get('seed')
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+        raise ValueError("'seed' must be an integer")
+    low = _number(spec, 'min', 0) if 'min' in spec else 0.0
+    high = _number(spec, 'max', 0) if 'max' in spec else math.inf
+    if high < low:
+        raise ValueError("'max' must not be less than 'min'")
+
+    if kind == 'uniform':
+        if 'max' not in spec:
+            raise ValueError("A uniform delay needs 'max'")
+        params: Tuple[Any, ...] = ()
+    elif kind == 'normal':
+        params = (_number(spec, 'mean'), _number(spec, 'stddev', 0))
+    elif kind == 'lognormal':
+        median = _number(spec, 'median')
+        if median <= 0:
+            raise ValueError("'median' must be positive")
+        params = (math.log(median), _number(spec, 'sigma', 0))
+    else:
+        points: List[Tuple[float, float]] = []
+        for key, value in spec.items():
+            match = _PERCENTILE_KEY.match(key)
+            if match:
+                rank = float(match.group(1))
+                if rank > 100:
+                    raise ValueError(f"Percentile {key} is above p100")
+                points.append((rank, _number(spec, key, 0)))
+        if not points:
+            raise ValueError("A percentiles delay needs at least one pNN entry, e.g. 'p50'")
+        points.sort()
+        if points[0][0] > 0:
+            points.insert(0, (0.0, low))
+        if any(b[1] < a[1] for a, b in zip(points, points[1:])):
+            raise ValueError("Percentile delays must not decrease as the percentile increases")
+        params = ([rank for rank, _ in points], [value for _, value in points])
+    return DelayDistribution(kind, params, low, high, seed)
+
+class FaultInjector:
+    """A compiled `fault`; `roll()` decides whether a request gets the fault response."""
+    __slots__ = ('probability', 'code', 'body', 'headers', 'seed', '_rng', '_lock')
+
+    def __init__(self, probability: float, code: int, body: bytes, headers: Dict[str, str], seed: Optional[int] = None):
+        self.probability = probability
+        self.code = code
+        self.body = body
+        self.headers = headers
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        return (FaultInjector, (self.probability, self.code, self.body, self.headers, self.seed))
+
+    def roll(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.probability
+
+    def response(self) -> Response:
+        resp = Response(self.body, status=self.code, mimetype='application/json')
+        for key, value in self.headers.items():
+            resp.headers[key] = value
+        return resp
+
+def compile_fault(spec: Optional[Dict[str, Any]]) -> Optional[FaultInjector]:
+    """
+    Compiles a `fault` object; None when faults are off.
+
+    Raises:
+        ValueError: If the body is not JSON serializable.
+    """
+    if not spec or not spec.get('probability'):
+        return None
+    code = spec.get('code', DEFAULT_FAULT_CODE)
+    data = spec.get('data', {"error": "Injected fault", "code": code})
+    try:
+        body = json.dumps(data).encode('utf-8')
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"fault data is not JSON serializable: {e}") from e
+    return FaultInjector(float(spec['probability']), code, body, dict(spec.get('headers', {})), spec.get('seed'))
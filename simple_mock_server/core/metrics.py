@@ -1,18 +1,121 @@
+from bisect import bisect_left
 from collections import Counter
 import threading
+from typing import Dict, List, Tuple
 
 _lock = threading.Lock()
 http_requests_total = Counter()
 http_requests_by_path_total = Counter()
 http_requests_by_method_total = Counter()
+http_responses_by_status_total = Counter()
+
+# Upper bounds, in seconds, of the request duration histogram buckets.
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Finer buckets for pipeline stages, most of which take microseconds.
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 1.0)
+
+class Histogram:
+    """A fixed-bucket histogram; callers hold the metrics lock."""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...] = DURATION_BUCKETS):
+        self.bounds = bounds
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str = '') -> List[str]:
+        """Returns the Prometheus `_bucket`, `_sum` and `_count` lines for this histogram."""
+        lines = []
+        bucket_prefix = f'{labels},' if labels else ''
+        series_labels = f'{{{labels}}}' if labels else ''
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{bucket_prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{bucket_prefix}le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{series_labels} {self.sum}')
+        lines.append(f'{name}_count{series_labels} {self.count}')
+        return lines
+
+http_request_duration_seconds: Dict[Tuple[str, str], Histogram] = {}
+config_reloads_total = Counter()
+config_reload_duration_seconds = Histogram()
+http_responses_compressed_total = Counter()
+http_compression_bytes_saved_total = Counter()
+access_log_records_total = Counter()
+resource_evictions_total = Counter()
+http_response_variant_hits_total = Counter()
+http_request_stage_duration_seconds: Dict[str, Histogram] = {}
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
 
 def track_request(path: str, method: str) -> None:
-    """Tracks a request and increments the appropriate metrics."""
+    """
+    Tracks a request and increments the appropriate metrics.
+
+    `path` should be the route template (e.g. `/users/<user_id>`), not the concrete
+    request path, so the number of series stays bounded by the number of routes.
+    """
     with _lock:
         http_requests_total['total'] += 1
         http_requests_by_path_total[path] += 1
         http_requests_by_method_total[method] += 1
 
+def observe_response(path: str, method: str, status: int, duration: float) -> None:
+    """Records the status code and pipeline duration of a completed request."""
+    with _lock:
+        http_responses_by_status_total[(method, status)] += 1
+        histogram = http_request_duration_seconds.get((path, method))
+        if histogram is None:
+            histogram = http_request_duration_seconds[(path, method)] = Histogram()
+        histogram.observe(duration)
+
+def observe_reload(outcome: str, duration: float) -> None:
+    """Records a route table reload and whether it succeeded."""
+    with _lock:
+        config_reloads_total[outcome] += 1
+        config_reload_duration_seconds.observe(duration)
+
+def observe_compression(encoding: str, original_size: int, compressed_size: int) -> None:
+    """Records a compressed response body and the bytes compression saved."""
+    with _lock:
+        http_responses_compressed_total[encoding] += 1
+        http_compression_bytes_saved_total[encoding] += original_size - compressed_size
+
+def observe_access_log(outcome: str, count: int = 1) -> None:
+    """Counts access log records that were written, dropped on a full queue or sampled out."""
+    with _lock:
+        access_log_records_total[outcome] += count
+
+def observe_resource_evictions(resource: str, count: int) -> None:
+    """Counts records evicted from a CRUD resource store by its memory cap."""
+    with _lock:
+        resource_evictions_total[resource] += count
+
+def observe_variant(path: str, method: str, variant: str) -> None:
+    """Counts a request answered by a response variant (or the route's default response)."""
+    with _lock:
+        http_response_variant_hits_total[(path, method, variant)] += 1
+
+def observe_stages(stages: List[Tuple[str, float]]) -> None:
+    """Records the duration of each pipeline stage of one request."""
+    with _lock:
+        for stage, duration in stages:
+            histogram = http_request_stage_duration_seconds.get(stage)
+            if histogram is None:
+                histogram = http_request_stage_duration_seconds[stage] = Histogram(STAGE_BUCKETS)
+            histogram.observe(duration)
+
 def generate_metrics() -> str:
     """Generates a string of all metrics in Prometheus format."""
     with _lock:
@@ -21,16 +124,71 @@ def generate_metrics() -> str:
         metrics.append(f'# TYPE http_requests_total counter')
         metrics.append(f'http_requests_total {http_requests_total["total"]}')
 
-        metrics.append(f'\n# HELP http_requests_by_path_total Total number of HTTP requests by path.')
+        metrics.append(f'\n# HELP http_requests_by_path_total Total number of HTTP requests by route template.')
         metrics.append(f'# TYPE http_requests_by_path_total counter')
         for path, count in http_requests_by_path_total.items():
-            metrics.append(f'http_requests_by_path_total{{path="{path}"}} {count}')
+            metrics.append(f'http_requests_by_path_total{{path="{_escape_label(path)}"}} {count}')
 
         metrics.append(f'\n# HELP http_requests_by_method_total Total number of HTTP requests by method.')
         metrics.append(f'# TYPE http_requests_by_method_total counter')
         for method, count in http_requests_by_method_total.items():
             metrics.append(f'http_requests_by_method_total{{method="{method}"}} {count}')
 
+        metrics.append(f'\n# HELP http_responses_by_status_total Total number of HTTP responses by method and status code.')
+        metrics.append(f'# TYPE http_responses_by_status_total counter')
+        for (method, status), count in http_responses_by_status_total.items():
+            metrics.append(f'http_responses_by_status_total{{method="{method}",code="{status}"}} {count}')
+
+        metrics.append(f'\n# HELP http_request_duration_seconds Time spent in the mock endpoint pipeline.')
+        metrics.append(f'# TYPE http_request_duration_seconds histogram')
+        for (path, method), histogram in http_request_duration_seconds.items():
+            metrics.extend(histogram.render('http_request_duration_seconds', f'path="{_escape_label(path)}",method="{method}"'))
+
+        if resource_evictions_total:
+            metrics.append(f'\n# HELP resource_evictions_total Records evicted from CRUD resource stores to stay within their cap.')
+            metrics.append(f'# TYPE resource_evictions_total counter')
+            for resource, count in resource_evictions_total.items():
+                metrics.append(f'resource_evictions_total{{resource="{_escape_label(resource)}"}} {count}')
+
+        if http_response_variant_hits_total:
+            metrics.append(f'\n# HELP http_response_variant_hits_total Requests answered by each response variant; "default" is the route\'s own response.')
+            metrics.append(f'# TYPE http_response_variant_hits_total counter')
+            for (path, method, variant), count in http_response_variant_hits_total.items():
+                metrics.append(f'http_response_variant_hits_total{{path="{_escape_label(path)}",method="{method}",variant="{_escape_label(variant)}"}} {count}')
+
+        if http_request_stage_duration_seconds:
+            metrics.append(f'\n# HELP http_request_stage_duration_seconds Time spent in each stage of the mock endpoint pipeline.')
+            metrics.append(f'# TYPE http_request_stage_duration_seconds histogram')
+            for stage, histogram in http_request_stage_duration_seconds.items():
+                metrics.extend(histogram.render('http_request_stage_duration_seconds', f'stage="{stage}"'))
+
+        if config_reloads_total:
+            metrics.append(f'\n# HELP config_reloads_total Total number of configuration reloads by outcome.')
+            metrics.append(f'# TYPE config_reloads_total counter')
+            for outcome, count in config_reloads_total.items():
+                metrics.append(f'config_reloads_total{{outcome="{outcome}"}} {count}')
+
+            metrics.append(f'\n# HELP config_reload_duration_seconds Time spent loading and swapping in a new route table.')
+            metrics.append(f'# TYPE config_reload_duration_seconds histogram')
+            metrics.extend(config_reload_duration_seconds.render('config_reload_duration_seconds'))
+
+        if http_responses_compressed_total:
+            metrics.append(f'\n# HELP http_responses_compressed_total Total number of compressed responses by encoding.')
+            metrics.append(f'# TYPE http_responses_compressed_total counter')
+            for encoding, count in http_responses_compressed_total.items():
+                metrics.append(f'http_responses_compressed_total{{encoding="{encoding}"}} {count}')
+
+            metrics.append(f'\n# HELP http_compression_bytes_saved_total Response body bytes saved by compression, by encoding.')
+            metrics.append(f'# TYPE http_compression_bytes_saved_total counter')
+            for encoding, saved in http_compression_bytes_saved_total.items():
+                metrics.append(f'http_compression_bytes_saved_total{{encoding="{encoding}"}} {saved}')
+
+        if access_log_records_total:
+            metrics.append(f'\n# HELP access_log_records_total Access log records by outcome (written, dropped, sampled_out).')
+            metrics.append(f'# TYPE access_log_records_total counter')
+            for outcome, count in access_log_records_total.items():
+                metrics.append(f'access_log_records_total{{outcome="{outcome}"}} {count}')
+
         return "\n".join(metrics)
 
 def reset_metrics() -> None:
@@ -38,4 +196,14 @@ def reset_metrics() -> None:
     with _lock:
         http_requests_total.clear()
         http_requests_by_path_total.clear()
-        http_requests_by_method_total.clear()
\ No newline at end of file
+        http_requests_by_method_total.clear()
+        http_responses_by_status_total.clear()
+        http_request_duration_seconds.clear()
+        config_reloads_total.clear()
+        config_reload_duration_seconds.reset()
+        http_responses_compressed_total.clear()
+        http_compression_bytes_saved_total.clear()
+        access_log_records_total.clear()
+        resource_evictions_total.clear()
+        http_response_variant_hits_total.clear()
+        http_request_stage_duration_seconds.clear()
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import threading
+from flask import Response, Request
+from typing import Any, Callable, Dict, Optional
+from .compression import compress
+
+class OpenAPIDocument:
+    """A serialized OpenAPI spec with its ETag and a lazily built gzip variant."""
+    __slots__ = ('body', 'etag', '_gzip_body', '_lock')
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.body = json.dumps(spec, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self._gzip_body: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    @property
+    def gzip_body(self) -> bytes:
+        if self._gzip_body is None:
+            with self._lock:
+                if self._gzip_body is None:
+                    # The zlib gzip header has a zero mtime, so the bytes, and therefore the ETag, are stable.
+                    self._gzip_body = compress(self.body, 'gzip', 6)
+        return self._gzip_body
+
+    def to_response(self, request: "Request") -> Response:
+        """Builds a 200, a gzip-encoded 200 or a 304 for `request`."""
+        use_gzip = request.accept_encodings['gzip'] > 0
+        etag = f"{self.etag}-gzip" if use_gzip else self.etag
+        if request.if_none_match.contains(self.etag) or request.if_none_match.contains(f"{self.etag}-gzip"):
+            resp = Response(status=304)
+            del resp.headers['Content-Type']
+        else:
+            resp = Response(self.gzip_body if use_gzip else self.body, mimetype='application/json')
+            if use_gzip:
+                resp.headers['Content-Encoding'] = 'gzip'
+        resp.set_etag(etag)
+        resp.headers['Vary'] = 'Accept-Encoding'
+        return resp
+
+class OpenAPICache:
+    """
+    Holds the serialized spec for the current route table.
+
+    The spec is built on first use and rebuilt only when `version()` changes, so polling
+    `/openapi.json` costs a dictionary lookup and a header comparison. `build` receives
+    the version it is building for, so the spec and its version always match.
+    """
+
+    def __init__(self, build: Callable[[Any], Dict[str, Any]], version: Callable[[], Any] = lambda: None):
+        self._build = build
+        self._version = version
+        self._document: Optional[OpenAPIDocument] = None
+        self._document_version: Any = None
+        self._lock = threading.Lock()
+
+    def get(self) -> OpenAPIDocument:
+        version = self._version()
+        document = self._document
+        if document is None or self._document_version is not version:
+            with self._lock:
+                if self._document is None or self._document_version is not version:
+                    self._document = OpenAPIDocument(self._build(version))
+                    self._document_version = version
+                document = self._document
+        return document
@@ -1,54 +1,313 @@
 import time
 from collections import deque
+import hashlib
+import math
+import mmap
+import multiprocessing
+import os
+import struct
 import threading
 from flask import jsonify, request, Response, Request
 import logging
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List
+from .context import RequestContext
 
 logger = logging.getLogger(__name__)
 
-rate_limit_history: Dict[str, deque] = {}
-rate_limit_lock = threading.Lock()
+SLIDING_LOG = 'sliding_log'
+SLIDING_WINDOW = 'sliding_window'
+TOKEN_BUCKET = 'token_bucket'
+ALGORITHMS = (SLIDING_LOG, SLIDING_WINDOW, TOKEN_BUCKET)
 
-def _get_client_id(request: "Request", auth_config: Optional[Dict[str, Any]]) -> str:
-    """Extracts the client ID from the request based on API key or IP address."""
-    if auth_config and auth_config.get('api_key'):
-        return request.headers.get('X-API-Key') or request.args.get('api_key') or request.remote_addr
-    return request.remote_addr
+# Fixed-size algorithm state is a triple of floats:
+#   sliding_window: (window start, previous window count, current window count)
+#   token_bucket:   (last refill time, tokens left, unused)
+State = Tuple[float, float, float]
 
-def handle_rate_limiting(response_config: Dict[str, Any], request: "Request", route_template_path: str) -> Tuple[Optional[Response], str]:
+def _sliding_window_roll(state: State, window: int, now: float) -> State:
+    """Rolls a sliding-window counter forward to the window containing `now`."""
+    window_start, previous, current = state
+    aligned = now - (now % window)
+    if aligned != window_start:
+        previous = current if aligned - window_start == window else 0.0
+        return aligned, previous, 0.0
+    return state
+
+def _sliding_window_estimate(state: State, window: int, now: float) -> float:
+    window_start, previous, current = state
+    return previous * (1 - (now - window_start) / window) + current
+
+def _sliding_window_hit(state: Optional[State], limit: int, window: int, now: float) -> Tuple[State, bool, int, float]:
+    state = _sliding_window_roll(state or (now - (now % window), 0.0, 0.0), window, now)
+    window_start, previous, current = state
+    estimate = _sliding_window_estimate(state, window, now)
+    if estimate + 1 <= limit:
+        state = (window_start, previous, current + 1)
+        return state, True, max(0, int(limit - estimate - 1)), 0.0
+
+    # Seconds until the weighted count drops below `limit` again.
+    if current < limit and previous > 0:
+        reset_at = window_start + window * (1 - (limit - current) / previous)
+    else:
+        reset_at = window_start + window + window * max(0.0, 1 - limit / current)
+    return state, False, 0, max(0.0, reset_at - now)
+
+def _sliding_window_remaining(state: State, limit: int, window: int, now: float) -> int:
+    return max(0, int(limit - _sliding_window_estimate(_sliding_window_roll(state, window, now), window, now)))
+
+def _token_bucket_refill(state: Optional[State], limit: int, window: int, now: float) -> float:
+    if state is None:
+        return float(limit)
+    last_refill, tokens, _ = state
+    return min(float(limit), tokens + (now - last_refill) * limit / window)
+
+def _token_bucket_hit(state: Optional[State], limit: int, window: int, now: float) -> Tuple[State, bool, int, float]:
+    tokens = _token_bucket_refill(state, limit, window, now)
+    if tokens >= 1:
+        tokens -= 1
+        return (now, tokens, 0.0), True, int(tokens), 0.0
+    return (now, tokens, 0.0), False, 0, (1 - tokens) * window / limit
+
+def _token_bucket_remaining(state: State, limit: int, window: int, now: float) -> int:
+    return int(_token_bucket_refill(state, limit, window, now))
+
+_FIXED_STATE_ALGORITHMS = {
+    SLIDING_WINDOW: (_sliding_window_hit, _sliding_window_remaining),
+    TOKEN_BUCKET: (_token_bucket_hit, _token_bucket_remaining),
+}
+
+def _idle_after(algorithm: str, state: State, window: int) -> float:
+    """Returns the time after which a fixed-size state is equivalent to a fresh one."""
+    if algorithm == SLIDING_WINDOW:
+        return state[0] + 2 * window
+    # A token bucket is full again one window after its last request.
+    return state[0] + window
+
+class _Entry:
+    __slots__ = ('state', 'idle_after')
+
+    def __init__(self, state: Any, idle_after: float):
+        self.state = state
+        self.idle_after = idle_after
+
+class LocalRateLimitBackend:
+    """
+    Per-process rate-limit state (the default backend).
+
+    Keys are spread over lock stripes by hash so concurrent requests for different
+    clients rarely contend. `sliding_log` keeps one timestamp per request in the window;
+    `sliding_window` and `token_bucket` keep three floats per key. A background thread
+    evicts keys whose state has gone idle.
+    """
+
+    def __init__(self, stripes: int = 64, eviction_interval: float = 30.0):
+        self.stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._tables: List[Dict[str, _Entry]] = [{} for _ in range(stripes)]
+        self.eviction_interval = eviction_interval
+        self._evictor_pid = None
+
+    def _stripe(self, key: str) -> int:
+        return hash(key) % self.stripes
+
+    def _ensure_evictor(self) -> None:
+        # Threads do not survive fork, so track the process that owns the evictor.
+        if self._evictor_pid == os.getpid() or not self.eviction_interval:
+            return
+        self._evictor_pid = os.getpid()
+        thread = threading.Thread(target=self._evict_forever, name="rate-limit-evictor", daemon=True)
+        thread.start()
+
+    def _evict_forever(self) -> None:
+        while True:
+            time.sleep(self.eviction_interval)
+            evicted = self.evict_idle(time.time())
+            if evicted:
+                logger.debug(f"Evicted {evicted} idle rate limit keys.")
+
+    def evict_idle(self, now: float) -> int:
+        """Removes keys whose state has gone idle; returns how many were removed."""
+        evicted = 0
+        for lock, table in zip(self._locks, self._tables):
+            with lock:
+                idle = [key for key, entry in table.items() if entry.idle_after <= now]
+                for key in idle:
+                    del table[key]
+            evicted += len(idle)
+        return evicted
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self._tables)
+
+    def clear(self) -> None:
+        for lock, table in zip(self._locks, self._tables):
+            with lock:
+                table.clear()
+
+    def hit(self, key: str, limit: int, window: int, now: float, algorithm: str = SLIDING_LOG) -> Tuple[bool, int, float]:
+        """
+        Records a request for `key` if it is within the limit.
+
+        Returns:
+            A tuple of (allowed, remaining, retry_after_seconds).
+        """
+        self._ensure_evictor()
+        stripe = self._stripe(key)
+        with self._locks[stripe]:
+            table = self._tables[stripe]
+            entry = table.get(key)
+
+            if algorithm == SLIDING_LOG:
+                if entry is None or not isinstance(entry.state, deque):
+                    entry = table[key] = _Entry(deque(), 0.0)
+                requests_in_window = entry.state
+                while requests_in_window and requests_in_window[0] <= now - window:
+                    requests_in_window.popleft()
+                if len(requests_in_window) >= limit:
+                    return False, 0, window - (now - requests_in_window[0])
+                requests_in_window.append(now)
+                entry.idle_after = now + window
+                return True, limit - len(requests_in_window), 0.0
+
+            step, _ = _FIXED_STATE_ALGORITHMS[algorithm]
+            # A reloaded route may have switched algorithms; start such keys afresh.
+            previous_state = entry.state if entry is not None and isinstance(entry.state, tuple) else None
+            state, allowed, remaining, retry_after = step(previous_state, limit, window, now)
+            if entry is None:
+                table[key] = _Entry(state, _idle_after(algorithm, state, window))
+            else:
+                entry.state = state
+                entry.idle_after = _idle_after(algorithm, state, window)
+            return allowed, remaining, retry_after
+
+    def remaining(self, key: str, limit: int, window: int, algorithm: str = SLIDING_LOG) -> Optional[int]:
+        """Returns the requests left for `key`, or None if it has never been seen."""
+        stripe = self._stripe(key)
+        with self._locks[stripe]:
+            entry = self._tables[stripe].get(key)
+            if entry is None:
+                return None
+            if algorithm == SLIDING_LOG:
+                return limit - len(entry.state)
+            return _FIXED_STATE_ALGORITHMS[algorithm][1](entry.state, limit, window, time.time())
+
+# Slot layout: key hash, three floats of algorithm state, last seen.
+_SLOT = struct.Struct('<Qdddd')
+# Keys are looked up within this many slots of their home position.
+_MAX_PROBES = 32
+
+def _key_hash(key: str) -> int:
+    # 0 marks an empty slot.
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+class SharedMemoryRateLimitBackend:
+    """
+    Rate-limit state in an anonymous shared memory segment, so forked workers enforce
+    one limit together.
+
+    Each key occupies a fixed-size slot holding `sliding_window` or `token_bucket`
+    state; `sliding_log` cannot fit a fixed slot and is served as `sliding_window`.
+    The table is split into segments, each guarded by its own process-shared lock, so
+    unrelated keys rarely contend. When a key's probe range is full the least recently
+    seen slot in it is reused, which also evicts idle keys.
+    Must be created before the workers are forked.
+    """
+
+    def __init__(self, slots: int = 65536, stripes: int = 64):
+        self.stripes = max(1, min(stripes, slots))
+        self.segment_size = max(1, slots // self.stripes)
+        self.slots = self.segment_size * self.stripes
+        self.buffer = mmap.mmap(-1, self.slots * _SLOT.size)
+        self.locks = [multiprocessing.Lock() for _ in range(self.stripes)]
+
+    def _find(self, key_hash: int, create: bool) -> Optional[int]:
+        """Returns the byte offset of the slot for `key_hash`; caller holds the segment lock."""
+        segment = key_hash % self.stripes
+        base = segment * self.segment_size
+        start = (key_hash // self.stripes) % self.segment_size
+        oldest_offset, oldest_seen = None, math.inf
+        for probe in range(min(self.segment_size, _MAX_PROBES)):
+            offset = (base + (start + probe) % self.segment_size) * _SLOT.size
+            slot_hash, _, _, _, last_seen = _SLOT.unpack_from(self.buffer, offset)
+            if slot_hash == key_hash:
+                return offset
+            if slot_hash == 0:
+                return offset if create else None
+            if last_seen < oldest_seen:
+                oldest_offset, oldest_seen = offset, last_seen
+        if create:
+            _SLOT.pack_into(self.buffer, oldest_offset, 0, 0.0, 0.0, 0.0, 0.0)
+        return oldest_offset if create else None
+
+    def hit(self, key: str, limit: int, window: int, now: float, algorithm: str = SLIDING_LOG) -> Tuple[bool, int, float]:
+        """
+        Records a request for `key` if it is within the limit.
+
+        Returns:
+            A tuple of (allowed, remaining, retry_after_seconds).
+        """
+        step, _ = _FIXED_STATE_ALGORITHMS.get(algorithm, _FIXED_STATE_ALGORITHMS[SLIDING_WINDOW])
+        key_hash = _key_hash(key)
+        with self.locks[key_hash % self.stripes]:
+            offset = self._find(key_hash, create=True)
+            slot_hash, a, b, c, _ = _SLOT.unpack_from(self.buffer, offset)
+            state = (a, b, c) if slot_hash == key_hash else None
+            state, allowed, remaining, retry_after = step(state, limit, window, now)
+            _SLOT.pack_into(self.buffer, offset, key_hash, state[0], state[1], state[2], now)
+        return allowed, remaining, retry_after
+
+    def remaining(self, key: str, limit: int, window: int, algorithm: str = SLIDING_LOG) -> Optional[int]:
+        """Returns the requests left for `key`, or None if it has no slot."""
+        _, remaining = _FIXED_STATE_ALGORITHMS.get(algorithm, _FIXED_STATE_ALGORITHMS[SLIDING_WINDOW])
+        key_hash = _key_hash(key)
+        with self.locks[key_hash % self.stripes]:
+            offset = self._find(key_hash, create=False)
+            if offset is None:
+                return None
+            _, a, b, c, _ = _SLOT.unpack_from(self.buffer, offset)
+        return remaining((a, b, c), limit, window, time.time())
+
+_backend = LocalRateLimitBackend()
+
+def get_rate_limit_backend():
+    """Returns the active rate-limit backend."""
+    return _backend
+
+def set_rate_limit_backend(backend) -> None:
+    """Replaces the active rate-limit backend, e.g. with a SharedMemoryRateLimitBackend before forking workers."""
+    global _backend
+    _backend = backend
+
+def reset_rate_limits() -> None:
+    """Resets the default backend to a fresh, empty LocalRateLimitBackend."""
+    set_rate_limit_backend(LocalRateLimitBackend())
+
+def rate_limit_remaining(rate_limit_config: Dict[str, Any], endpoint_key: str) -> Optional[int]:
+    """Returns the requests left in the window for `endpoint_key`, or None if it has not been seen."""
+    return _backend.remaining(endpoint_key, rate_limit_config['requests'], rate_limit_config['window'],
+                              rate_limit_config.get('algorithm', SLIDING_LOG))
+
+def handle_rate_limiting(response_config: Dict[str, Any], ctx: "RequestContext", route_template_path: str) -> Tuple[Optional[Response], str]:
     """Handles rate limiting logic and returns a response if rate limit is exceeded."""
     rate_limit_config = response_config.get('rate_limit')
-    auth_config = response_config.get('auth')
-    client_id = _get_client_id(request, auth_config)
+    request = ctx.request
+    client_id = ctx.client_id
     endpoint_key = f"{request.method}_{route_template_path}_{client_id}"
 
     if not rate_limit_config:
         return None, endpoint_key
 
-    with rate_limit_lock:
-        if endpoint_key not in rate_limit_history:
-            rate_limit_history[endpoint_key] = deque()
-
-        current_time = time.time()
-        window = rate_limit_config['window']
-        requests_in_window = rate_limit_history[endpoint_key]
-
-        while requests_in_window and requests_in_window[0] <= current_time - window:
-            requests_in_window.popleft()
-
-        if len(requests_in_window) >= rate_limit_config['requests']:
-            logger.warning(f"Rate limit exceeded for client '{client_id}' on {request.method} {request.path}")
-            first_request_time = requests_in_window[0]
-            time_to_reset = int(window - (current_time - first_request_time))
-            
-            resp = jsonify({'error': 'Too Many Requests'})
-            resp.status_code = 429
-            resp.headers['X-RateLimit-Limit'] = str(rate_limit_config['requests'])
-            resp.headers['X-RateLimit-Remaining'] = '0'
-            resp.headers['Retry-After'] = str(max(0, time_to_reset))
-            return resp, endpoint_key
-
-        requests_in_window.append(current_time)
+    allowed, _, retry_after = _backend.hit(
+        endpoint_key, rate_limit_config['requests'], rate_limit_config['window'], time.time(),
+        rate_limit_config.get('algorithm', SLIDING_LOG)
+    )
+    if not allowed:
+        logger.debug(f"Rate limit exceeded for client '{client_id}' on {request.method} {request.path}")
+        resp = jsonify({'error': 'Too Many Requests'})
+        resp.status_code = 429
+        resp.headers['X-RateLimit-Limit'] = str(rate_limit_config['requests'])
+        resp.headers['X-RateLimit-Remaining'] = '0'
+        resp.headers['Retry-After'] = str(max(0, int(retry_after)))
+        return resp, endpoint_key
 
     return None, endpoint_key
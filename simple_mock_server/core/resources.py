@@ -0,0 +1,395 @@
+"""
+Stateful CRUD routes backed by an in-memory store (`resource`).
+
+A route such as
+
+    {"path": "/api/users", "resource": {"id_param": "user_id", "indexes": ["email", "role"]}}
+
+serves `POST`/`GET` on `/api/users` and `GET`/`PUT`/`PATCH`/`DELETE` on
+`/api/users/{user_id}`, so clients read back what they wrote. Records are kept as their
+serialized JSON bytes in `__slots__` objects, keyed by a hash index on the id. Secondary
+indexes on the configured fields serve `GET /api/users?role=admin` without a scan. With
+`max_records` or `max_bytes`, the least recently used records are evicted. With
+`snapshot`, the store is loaded from that file at startup and written back on shutdown.
+
+Stores are per process and keyed by the collection path, so they survive config reloads.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from flask import jsonify, Response
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .metrics import observe_resource_evictions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ID_FIELD = 'id'
+DEFAULT_ID_PARAM = 'id'
+# Default `limit` when a listing asks for a `page` without one.
+DEFAULT_PAGE_LIMIT = 100
+
+def _index_key(value: Any) -> str:
+    """Maps a field value to the string a query parameter would carry, e.g. 30 -> "30", True -> "true"."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+def _path_id(value: str) -> Any:
+    """Maps an id taken from a request path to the id value, e.g. "007" -> 7; other strings are kept."""
+    return int(value) if value.isascii() and value.isdigit() else value
+
+def _record_key(value: str) -> str:
+    """Maps an id taken from a request path to its storage key, so "007" and "7" name the same record."""
+    return _index_key(_path_id(value))
+
+def _encode(document: Dict[str, Any]) -> bytes:
+    return json.dumps(document, separators=(',', ':')).encode('utf-8')
+
+def expand_resource_routes(routes_config: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Replaces each `resource` route with the plain route definitions it serves.
+
+    The collection route handles GET and POST, the item route GET, PUT and DELETE, and a
+    separate item definition handles PATCH so a route's `request_schema` is only
+    applied to complete records.
+    """
+    expanded = []
+    for route in routes_config:
+        spec = route.get('resource')
+        if spec is None:
+            expanded.append(route)
+            continue
+        shared = {key: value for key, value in route.items() if key not in ('resource', 'methods', 'response', 'request_schema')}
+        item_path = f"{route['path'].rstrip('/')}/{{{spec.get('id_param', DEFAULT_ID_PARAM)}}}"
+        with_schema = {'request_schema': route['request_schema']} if route.get('request_schema') else {}
+        collection = {**spec, 'collection': route['path'], 'item': False}
+        item = {**spec, 'collection': route['path'], 'item': True}
+        expanded.append({**shared, **with_schema, 'methods': ['GET', 'POST'], 'response': {'resource': collection}})
+        expanded.append({**shared, **with_schema, 'path': item_path, 'methods': ['GET', 'PUT', 'DELETE'], 'response': {'resource': item}})
+        expanded.append({**shared, 'path': item_path, 'methods': ['PATCH'], 'response': {'resource': item}})
+    return expanded
+
+class Record:
+    """One stored document: its id key, serialized body and indexed field values."""
+    __slots__ = ('key', 'body', 'seq', 'index_keys')
+
+    def __init__(self, key: str, body: bytes, seq: int, index_keys: Tuple[Optional[str], ...]):
+        self.key = key
+        self.body = body
+        self.seq = seq
+        self.index_keys = index_keys
+
+class ResourceStore:
+    """
+    The records of one collection.
+
+    `_records` keeps insertion order for listings; `_lru` orders ids by last access for
+    eviction. All operations take the store's lock.
+    """
+
+    def __init__(self, name: str, settings: Dict[str, Any]):
+        self.name = name
+        self.settings: Dict[str, Any] = {}
+        self.id_field = DEFAULT_ID_FIELD
+        self.indexes: Tuple[str, ...] = ()
+        self.max_records: Optional[int] = None
+        self.max_bytes: Optional[int] = None
+        self.snapshot: Optional[str] = None
+        self.bytes = 0
+        self._records: Dict[str, Record] = {}
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._index: Dict[str, Dict[str, Set[str]]] = {}
+        self._next_id = 1
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.configure(settings)
+        if self.snapshot and os.path.isfile(self.snapshot):
+            self.load(self.snapshot)
+        else:
+            for document in settings.get('data', []):
+                self.create(dict(document))
+
+    def __reduce__(self):
+        # Config snapshots refer to the store by name; the records themselves stay in memory.
+        return (resource_store, (self.name, self.settings))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def configure(self, settings: Dict[str, Any]) -> None:
+        """Applies (possibly changed) settings, rebuilding indexes and evicting as needed."""
+        with self._lock:
+            self.settings = settings
+            self.id_field = settings.get('id_field', DEFAULT_ID_FIELD)
+            self.max_records = settings.get('max_records')
+            self.max_bytes = settings.get('max_bytes')
+            self.snapshot = settings.get('snapshot')
+            indexes = tuple(settings.get('indexes', ()))
+            if indexes != self.indexes:
+                self.indexes = indexes
+                self._index = {field: {} for field in indexes}
+                for record in self._records.values():
+                    record.index_keys = self._index_keys(json.loads(record.body))
+                    self._add_to_indexes(record)
+            self._evict()
+
+    def _index_keys(self, document: Dict[str, Any]) -> Tuple[Optional[str], ...]:
+        return tuple(_index_key(document[field]) if field in document else None for field in self.indexes)
+
+    def _add_to_indexes(self, record: Record) -> None:
+        for field, value in zip(self.indexes, record.index_keys):
+            if value is not None:
+                self._index[field].setdefault(value, set()).add(record.key)
+
+    def _remove_from_indexes(self, record: Record) -> None:
+        for field, value in zip(self.indexes, record.index_keys):
+            if value is not None:
+                keys = self._index[field][value]
+                keys.discard(record.key)
+                if not keys:
+                    del self._index[field][value]
+
+    def _remove(self, key: str) -> None:
+        record = self._records.pop(key)
+        del self._lru[key]
+        self.bytes -= len(record.body)
+        self._remove_from_indexes(record)
+
+    def _store(self, key: str, document: Dict[str, Any]) -> bytes:
+        body = _encode(document)
+        old = self._records.get(key)
+        if old is not None:
+            self._remove_from_indexes(old)
+            self.bytes -= len(old.body)
+            self._lru.move_to_end(key)
+            seq = old.seq
+        else:
+            self._seq += 1
+            seq = self._seq
+            self._lru[key] = None
+        record = Record(key, body, seq, self._index_keys(document))
+        # Assigning to an existing key keeps the record's place in listings.
+        self._records[key] = record
+        self.bytes += len(body)
+        self._add_to_indexes(record)
+        self._evict()
+        return body
+
+    def _evict(self) -> None:
+        evicted = 0
+        while len(self._lru) > 1 and ((self.max_records and len(self._lru) > self.max_records) or
+                                      (self.max_bytes and self.bytes > self.max_bytes)):
+            self._remove(next(iter(self._lru)))
+            evicted += 1
+        if evicted:
+            logger.debug(f"Evicted {evicted} least recently used records from {self.name}")
+            observe_resource_evictions(self.name, evicted)
+
+    def _claim_id(self, value: Any) -> None:
+        if isinstance(value, int) and not isinstance(value, bool) and value >= self._next_id:
+            self._next_id = value + 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                return None
+            self._lru.move_to_end(key)
+            return record.body
+
+    def list(self, filters: Dict[str, str]) -> List[bytes]:
+        """Returns the bodies of the records whose indexed fields equal `filters`, in insertion order."""
+        with self._lock:
+            if not filters:
+                return [record.body for record in self._records.values()]
+            candidates = sorted((self._index[field].get(value, set()) for field, value in filters.items()), key=len)
+            keys = set(candidates[0]).intersection(*candidates[1:])
+            return [record.body for record in sorted((self._records[key] for key in keys), key=lambda record: record.seq)]
+
+    def create(self, document: Dict[str, Any]) -> Tuple[Optional[str], bytes]:
+        """Adds a record, assigning the next integer id if it has none. Returns (key, body), or (None, b'') if the id is taken."""
+        with self._lock:
+            if self.id_field not in document:
+                document[self.id_field] = self._next_id
+            key = _index_key(document[self.id_field])
+            if key in self._records:
+                return None, b''
+            self._claim_id(document[self.id_field])
+            return key, self._store(key, document)
+
+    def put(self, key: str, document: Dict[str, Any]) -> Tuple[bytes, bool]:
+        """Replaces or creates the record `key`, a path id such as "7" or "007". Returns (body, created)."""
+        document_id = _path_id(key)
+        key = _index_key(document_id)
+        with self._lock:
+            old = self._records.get(key)
+            if old is not None:
+                document[self.id_field] = json.loads(old.body).get(self.id_field, document_id)
+            else:
+                document[self.id_field] = document_id
+                self._claim_id(document_id)
+            return self._store(key, document), old is None
+
+    def patch(self, key: str, changes: Dict[str, Any]) -> Optional[bytes]:
+        """Merges `changes` into the record `key` (the id is kept). Returns the new body, or None if it does not exist."""
+        with self._lock:
+            old = self._records.get(key)
+            if old is None:
+                return None
+            document = json.loads(old.body)
+            document.update((field, value) for field, value in changes.items() if field != self.id_field)
+            return self._store(key, document)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._records:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._records):
+                self._remove(key)
+            self._next_id = 1
+
+    def save(self, path: str) -> None:
+        """Writes the records to `path` atomically as {"next_id": N, "records": [...]}."""
+        with self._lock:
+            payload = b'{"next_id":%d,"records":[%s]}' % (self._next_id, b','.join(record.body for record in self._records.values()))
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.resource-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self, path: str) -> None:
+        """Replaces the records with those saved in `path`."""
+        with open(path, 'rb') as f:
+            payload = json.load(f)
+        self.clear()
+        for document in payload.get('records', []):
+            self.create(document)
+        with self._lock:
+            self._next_id = max(self._next_id, payload.get('next_id', 1))
+        logger.info(f"Loaded {len(self)} records for {self.name} from {path}")
+
+_stores: Dict[str, ResourceStore] = {}
+_stores_lock = threading.Lock()
+
+def resource_store(name: str, settings: Dict[str, Any]) -> ResourceStore:
+    """Returns the store for collection `name`, creating it or applying changed `settings`."""
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None:
+            store = _stores[name] = ResourceStore(name, settings)
+        elif store.settings != settings:
+            store.configure(settings)
+        return store
+
+def save_resource_stores() -> None:
+    """Writes every store that has a `snapshot` path; called on shutdown."""
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        if store.snapshot:
+            try:
+                store.save(store.snapshot)
+                logger.info(f"Saved {len(store)} records for {store.name} to {store.snapshot}")
+            except OSError as e:
+                logger.error(f"Could not save {store.name} to {store.snapshot}: {e}")
+
+def reset_resource_stores() -> None:
+    """Drops every store. Intended for tests."""
+    with _stores_lock:
+        _stores.clear()
+
+def _error(status: int, error: str, message: str) -> Response:
+    resp = jsonify({"error": error, "message": message})
+    resp.status_code = status
+    return resp
+
+def _json_response(body: bytes, status: int = 200) -> Response:
+    return Response(body, status=status, mimetype='application/json')
+
+class ResourceEndpoint:
+    """The store operations of one compiled resource route: the collection or a single item."""
+    __slots__ = ('store', 'item', 'id_param')
+
+    def __init__(self, store: ResourceStore, item: bool, id_param: str):
+        self.store = store
+        self.item = item
+        self.id_param = id_param
+
+    def respond(self, ctx: Any) -> Response:
+        method = ctx.request.method
+        if method in ('POST', 'PUT', 'PATCH'):
+            try:
+                document = ctx.body()
+            except ValueError:
+                return _error(400, "Bad Request", "Malformed JSON in request body.")
+            if not isinstance(document, dict):
+                return _error(400, "Bad Request", "The request body must be a JSON object.")
+        if not self.item:
+            if method == 'POST':
+                key, body = self.store.create(dict(document))
+                if key is None:
+                    return _error(409, "Conflict", f"A record with this {self.store.id_field} already exists.")
+                resp = _json_response(body, 201)
+                resp.headers['Location'] = f"{ctx.request.path.rstrip('/')}/{key}"
+                return resp
+            return self._list(ctx.query_args)
+
+        key = _record_key(str(ctx.path_params[self.id_param]))
+        if method == 'PUT':
+            body, created = self.store.put(key, dict(document))
+            return _json_response(body, 201 if created else 200)
+        if method == 'PATCH':
+            body = self.store.patch(key, document)
+        elif method == 'DELETE':
+            if self.store.delete(key):
+                return Response(status=204)
+            body = None
+        else:
+            body = self.store.get(key)
+        if body is None:
+            return _error(404, "Not Found", f"No record with {self.store.id_field} {key}.")
+        return _json_response(body)
+
+    def _list(self, query_args: Any) -> Response:
+        filters = {field: query_args[field] for field in self.store.indexes if field in query_args}
+        bodies = self.store.list(filters)
+        total = len(bodies)
+        if 'page' in query_args or 'limit' in query_args:
+            try:
+                page = int(query_args.get('page', 1))
+                limit = int(query_args.get('limit', DEFAULT_PAGE_LIMIT))
+                if page < 1 or limit < 0:
+                    raise ValueError
+            except ValueError:
+                return _error(400, "Bad Request", "`page` must be a positive integer and `limit` a non-negative integer.")
+            bodies = bodies[(page - 1) * limit:page * limit]
+        resp = _json_response(b'[' + b','.join(bodies) + b']')
+        resp.headers['X-Total-Count'] = str(total)
+        return resp
+
+def compile_resource(spec: Dict[str, Any], base_dir: str = '.') -> ResourceEndpoint:
+    """
+    Binds an expanded resource route to its collection's store.
+
+    Raises:
+        OSError, ValueError: If the store's snapshot file exists but cannot be loaded.
+    """
+    settings = {key: value for key, value in spec.items() if key not in ('collection', 'item')}
+    if settings.get('snapshot'):
+        settings['snapshot'] = os.path.join(base_dir, settings['snapshot'])
+    id_param = spec.get('id_param', DEFAULT_ID_PARAM)
+    return ResourceEndpoint(resource_store(spec['collection'], settings), spec['item'], id_param)
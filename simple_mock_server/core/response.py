@@ -1,9 +1,13 @@
 import json
 from flask import jsonify, request, Response, Request
 import jsonschema
+from werkzeug.datastructures import Headers
 import logging
 from typing import Optional, Tuple, Dict, Any
-from .rate_limiter import rate_limit_history, rate_limit_lock
+from .context import RequestContext
+from .etag import body_etag, matching_etag, not_modified
+from .rate_limiter import rate_limit_remaining
+from .templating import compile_json_template, compile_headers_template
 
 logger = logging.getLogger(__name__)
 
@@ -29,57 +33,166 @@ def apply_templating(data: Any, kwargs: Dict[str, Any], request_args: Dict[str,
         return {key: apply_templating(value, kwargs, request_args, request_body_params) for key, value in data.items()}
     return data
 
-def validate_request_body(response_config: Dict[str, Any], request: "Request") -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[Response, int]]]:
+def compile_request_validator(schema: Optional[Dict[str, Any]]) -> Optional[Any]:
+    """
+    Builds a reusable validator for a route's `request_schema`.
+
+    The schema is checked once here instead of on every request. A `request_schema` that
+    is not a valid JSON Schema is skipped with a warning and returns None.
+    """
+    if not schema:
+        return None
+    validator_class = jsonschema.validators.validator_for(schema)
+    try:
+        validator_class.check_schema(schema)
+    except jsonschema.SchemaError as e:
+        logger.warning(f"request_schema is not a valid JSON Schema, skipping validation: {e.message}")
+        return None
+    return validator_class(schema)
+
+def validate_request_body(response_config: Dict[str, Any], ctx: "RequestContext") -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[Response, int]]]:
     """Validates the incoming request body against the defined schema."""
     request_body_params = {}
-    if request.is_json:
+    if ctx.is_json:
         try:
-            request_body_params = request.get_json()
-            request_body_schema = response_config.get('request_body')
-            if request_body_schema:
-                jsonschema.validate(instance=request_body_params, schema=request_body_schema)
+            request_body_params = ctx.body()
+            if 'request_validator' in response_config:
+                validator = response_config['request_validator']
+            else:
+                validator = compile_request_validator(response_config.get('request_schema'))
+            if validator is not None:
+                error = jsonschema.exceptions.best_match(validator.iter_errors(request_body_params))
+                if error is not None:
+                    raise error
             return request_body_params, None # Return params and no error
         except jsonschema.ValidationError as e:
             logger.warning(f"Request body validation failed: {e.message}")
             return None, (jsonify({"error": "Bad Request", "message": f"Request body validation failed: {e.message}"}), 400)
-        except Exception as e:
+        except ValueError as e:
             logger.warning(f"Could not parse JSON request body: {e}")
             return None, (jsonify({"error": "Bad Request", "message": "Malformed JSON in request body."}), 400)
     return request_body_params, None # Not JSON, return empty params and no error
 
-def prepare_response(response_config: Dict[str, Any], kwargs: Dict[str, Any], request: "Request", endpoint_key: Optional[str] = None, request_body_params: Optional[Dict[str, Any]] = None) -> Response:
+def prepare_response(response_config: Dict[str, Any], ctx: "RequestContext", endpoint_key: Optional[str] = None) -> Response:
     """Prepares the Flask response object based on response_config."""
-    if request_body_params is None:
-        request_body_params = {}
-
-    response_data = response_config.get('data', {})
+    body_template = response_config.get('body_template')
+    if body_template is None:
+        body_template = compile_json_template(response_config.get('data', {}))
+    headers_template = response_config.get('headers_template')
+    if headers_template is None:
+        headers_template = compile_headers_template(response_config.get('headers', {}))
     response_code = response_config.get('code', 200)
-    response_headers = response_config.get('headers', {}).copy()
 
-    rate_limit_config = response_config.get('rate_limit')
-    if rate_limit_config and endpoint_key:
-        with rate_limit_lock:
-            if endpoint_key in rate_limit_history:
-                response_headers['X-RateLimit-Limit'] = str(rate_limit_config['requests'])
-                response_headers['X-RateLimit-Remaining'] = str(rate_limit_config['requests'] - len(rate_limit_history[endpoint_key]))
-
-    json_body = request.get_json(silent=True) or {}
+    json_body = ctx.body_params()
 
-    templated_response_data = apply_templating(response_data, kwargs, request.args, json_body)
-    templated_response_headers = apply_templating(response_headers, kwargs, request.args, json_body)
+    response_headers = headers_template.render(ctx.path_params, ctx.query_args, json_body)
 
-    if isinstance(templated_response_data, dict) and templated_response_data.get('echo') and request.is_json:
-        templated_response_data = json_body
+    rate_limit_config = response_config.get('rate_limit')
+    if rate_limit_config and endpoint_key:
+        remaining = rate_limit_remaining(rate_limit_config, endpoint_key)
+        if remaining is not None:
+            response_headers['X-RateLimit-Limit'] = str(rate_limit_config['requests'])
+            response_headers['X-RateLimit-Remaining'] = str(remaining)
 
+    body_file = response_config.get('body_file')
+    generate = response_config.get('generate')
     if response_code == 204:
         resp = Response('', status=204)
         if 'Content-Type' in resp.headers:
             del resp.headers['Content-Type']
+    elif body_file is not None:
+        try:
+            # The file's tag comes from its metadata, so a 304 never opens the file.
+            etag = body_file.etag()
+            matched = matching_etag(ctx.request, etag) if 200 <= response_code < 300 else None
+            if matched is not None:
+                resp = not_modified(Response(), matched)
+            else:
+                resp = body_file.to_response(ctx.request.environ)
+                resp.status_code = response_code
+                resp.set_etag(etag)
+        except OSError as e:
+            logger.error(f"Could not open body_file {body_file.path}: {e}")
+            return jsonify({"error": "Internal Server Error", "message": "The response body file is not available."}), 500
+    elif generate is not None:
+        resp = generate.to_response(ctx)
+        if isinstance(resp, tuple):
+            return resp
+        if resp.status_code != 304:
+            resp.status_code = response_code
     else:
-        resp = Response(json.dumps(templated_response_data), mimetype='application/json')
+        if body_template.echo and ctx.is_json:
+            body = json.dumps(json_body).encode('ascii')
+        else:
+            body = body_template.render(ctx.path_params, ctx.query_args, json_body)
+        resp = Response(body, mimetype='application/json')
         resp.status_code = response_code
 
-    for header, value in templated_response_headers.items():
+    for header, value in response_headers.items():
         resp.headers[header] = value
 
-    return resp
\ No newline at end of file
+    return resp
+
+class StaticResponse:
+    """A fully precomputed response for routes with no per-request work."""
+    __slots__ = ('status', 'headers', 'body', 'etag', '_drop_content_type')
+
+    def __init__(self, status: int, headers: Headers, body: bytes):
+        self.status = status
+        self.headers = list(headers.items())
+        self.body = body
+        # Hashed once here so conditional requests never touch the body.
+        self.etag = body_etag(body) if 200 <= status < 300 and status != 204 else None
+        # Werkzeug adds a default Content-Type that 204 responses must not carry.
+        self._drop_content_type = 'Content-Type' not in headers
+
+    def to_response(self) -> Response:
+        resp = Response(self.body, status=self.status, headers=self.headers)
+        if self._drop_content_type:
+            del resp.headers['Content-Type']
+        if self.etag is not None:
+            resp.set_etag(self.etag)
+        return resp
+
+def build_static_response(response_config: Dict[str, Any]) -> Optional[StaticResponse]:
+    """
+    Precomputes the response for a route that needs no per-request work.
+
+    A route qualifies when its body and headers contain no placeholders and it has no
+    echo, body file, generated list, resource store, response variants, authentication or
+    rate limiting. A `request_schema` does not disqualify a route: the fast path only
+    serves non-JSON requests, which are never validated.
+
+    Returns:
+        A StaticResponse, or None if the route must go through the full pipeline.
+    """
+    auth_config = response_config.get('auth')
+    if auth_config and not auth_config.get('skip_auth'):
+        return None
+    if response_config.get('rate_limit') or response_config.get('body_file') is not None:
+        return None
+    if response_config.get('generate') is not None or response_config.get('resource') is not None:
+        return None
+    if response_config.get('variants') is not None:
+        return None
+
+    body_template = response_config.get('body_template')
+    if body_template is None:
+        body_template = compile_json_template(response_config.get('data', {}))
+    headers_template = response_config.get('headers_template')
+    if headers_template is None:
+        headers_template = compile_headers_template(response_config.get('headers', {}))
+    if body_template.static is None or body_template.echo or headers_template.static is None:
+        return None
+
+    status = response_config.get('code', 200)
+    headers = Headers()
+    if status == 204:
+        body = b''
+    else:
+        body = body_template.static
+        headers['Content-Type'] = 'application/json'
+    headers['Content-Length'] = str(len(body))
+    for header, value in headers_template.static.items():
+        headers[header] = value
+    return StaticResponse(status, headers, body)
@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from werkzeug.routing import RequestRedirect
+from .metrics import observe_reload
+from .router import Router
+
+logger = logging.getLogger(__name__)
+
+class Route:
+    """A compiled mock route: one URL template and the view serving all of its methods."""
+    __slots__ = ('path', 'signature', 'methods', 'responses', 'view_func')
+
+    def __init__(self, path: str, signature: str, methods: List[str], responses: Dict[str, Dict[str, Any]], view_func: Callable):
+        self.path = path
+        self.signature = signature
+        self.methods = methods
+        self.responses = responses
+        self.view_func = view_func
+
+class RouteTable:
+    """
+    An immutable snapshot of the mock routes.
+
+    Reloads build a new table and swap it in; requests already dispatched keep using the
+    table they matched against, so nothing is dropped or served half-updated.
+    """
+    __slots__ = ('version', 'routes_config', 'routes', 'router')
+
+    def __init__(self, version: int, routes_config: List[Dict[str, Any]], routes: Dict[str, Route]):
+        self.version = version
+        self.routes_config = routes_config
+        self.routes = routes
+        self.router: Router[Route] = Router()
+        for path, route in routes.items():
+            self.router.add(path, route)
+
+    def match(self, path: str, query_string: str = '') -> Optional[Tuple[Route, Dict[str, Any]]]:
+        """
+        Returns the route and path parameters for `path`, or None if no route matches.
+
+        Raises:
+            RequestRedirect: If only `path` with a trailing slash matches, like Werkzeug's strict slashes.
+        """
+        matched = self.router.match(path)
+        if matched is None and not path.endswith('/') and self.router.match(path + '/') is not None:
+            raise RequestRedirect(f"{path}/?{query_string}" if query_string else f"{path}/")
+        return matched
+
+    def diff(self, previous: "RouteTable") -> Dict[str, int]:
+        """Counts routes added, removed, changed and kept relative to `previous`."""
+        added = changed = unchanged = 0
+        for path, route in self.routes.items():
+            old = previous.routes.get(path)
+            if old is None:
+                added += 1
+            elif old.signature != route.signature:
+                changed += 1
+            else:
+                unchanged += 1
+        removed = sum(1 for path in previous.routes if path not in self.routes)
+        return {'added': added, 'removed': removed, 'changed': changed, 'unchanged': unchanged}
+
+class RouteRegistry:
+    """Owns the live route table and replaces it atomically on reload."""
+
+    def __init__(self, table: RouteTable, rebuild: Callable[[RouteTable], RouteTable]):
+        self.table = table
+        self._rebuild = rebuild
+        self._lock = threading.Lock()
+
+    def reload(self) -> bool:
+        """
+        Rebuilds the route table in the calling thread and swaps it in.
+
+        On failure the current table stays live and the error is logged.
+
+        Returns:
+            True if the new table was swapped in.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            previous = self.table
+            try:
+                table = self._rebuild(previous)
+            except Exception as e:
+                observe_reload('failure', time.perf_counter() - start)
+                logger.error(f"Config reload failed, keeping route table v{previous.version}: {e}")
+                return False
+            self.table = table
+            duration = time.perf_counter() - start
+            observe_reload('success', duration)
+            changes = table.diff(previous)
+            logger.info(
+                f"Route table v{table.version} loaded in {duration * 1000:.1f} ms: "
+                f"{changes['added']} added, {changes['removed']} removed, {changes['changed']} changed, "
+                f"{changes['unchanged']} unchanged."
+            )
+            return True
+
+    def reload_in_background(self) -> threading.Thread:
+        """Runs `reload` in a daemon thread so signal handlers and watchers return immediately."""
+        thread = threading.Thread(target=self.reload, name='route-table-reload', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,114 @@
+"""
+Dispatch index for mock routes.
+
+Parameter-free paths are matched with a single dict lookup. Templated paths go into a
+radix tree keyed by path segment: a static segment is an exact-match child, a whole
+`<name>` segment is a parameter child and a segment mixing text and parameters (such as
+`<name>.json`) is a regex child. Lookup cost depends on the depth of the path, not on
+the number of routes.
+"""
+import re
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+_PARAM = re.compile(r'<(\w+)>')
+
+class _Node:
+    __slots__ = ('static', 'params', 'patterns', 'value')
+
+    def __init__(self):
+        self.static: Dict[str, _Node] = {}
+        self.params: Dict[str, _Node] = {}
+        self.patterns: List[Tuple[str, Any, _Node]] = []
+        self.value = None
+
+class Router(Generic[T]):
+    """Maps URL templates such as `/users/<user_id>` to values and matches request paths against them."""
+
+    def __init__(self):
+        self._static: Dict[str, T] = {}
+        self._root = _Node()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, template: str, value: T) -> None:
+        """Registers `value` under `template`. Adding the same template again replaces it."""
+        self._size += 1
+        if not _PARAM.search(template):
+            if template in self._static:
+                self._size -= 1
+            self._static[template] = value
+            return
+
+        node = self._root
+        for segment in template[1:].split('/'):
+            whole = _PARAM.fullmatch(segment)
+            if whole:
+                node = node.params.setdefault(whole.group(1), _Node())
+            elif _PARAM.search(segment):
+                for source, _, child in node.patterns:
+                    if source == segment:
+                        node = child
+                        break
+                else:
+                    child = _Node()
+                    node.patterns.append((segment, _segment_regex(segment), child))
+                    node = child
+            else:
+                node = node.static.setdefault(segment, _Node())
+        if node.value is not None:
+            self._size -= 1
+        node.value = value
+
+    def match(self, path: str) -> Optional[Tuple[T, Dict[str, str]]]:
+        """Returns the value and path parameters for `path`, or None if nothing matches."""
+        value = self._static.get(path)
+        if value is not None:
+            return value, {}
+        if not path.startswith('/'):
+            return None
+        params: Dict[str, str] = {}
+        value = _match(self._root, path[1:].split('/'), 0, params)
+        if value is None:
+            return None
+        return value, params
+
+def _segment_regex(segment: str):
+    pattern = []
+    position = 0
+    for param in _PARAM.finditer(segment):
+        pattern.append(re.escape(segment[position:param.start()]))
+        pattern.append(f'(?P<{param.group(1)}>[^/]+?)')
+        position = param.end()
+    pattern.append(re.escape(segment[position:]))
+    return re.compile(''.join(pattern))
+
+def _match(node: _Node, segments: List[str], index: int, params: Dict[str, str]):
+    if index == len(segments):
+        return node.value
+    segment = segments[index]
+
+    # Static segments take precedence over parameters, as in Werkzeug.
+    child = node.static.get(segment)
+    if child is not None:
+        value = _match(child, segments, index + 1, params)
+        if value is not None:
+            return value
+    if not segment:
+        return None
+    for source, regex, child in node.patterns:
+        found = regex.fullmatch(segment)
+        if found:
+            value = _match(child, segments, index + 1, params)
+            if value is not None:
+                params.update(found.groupdict())
+                return value
+    for name, child in node.params.items():
+        value = _match(child, segments, index + 1, params)
+        if value is not None:
+            params[name] = segment
+            return value
+    return None
@@ -0,0 +1,78 @@
+"""
+On-disk snapshots of the validated, compiled route table.
+
+A snapshot is keyed by the SHA-256 of the raw config bytes, the package version and
+SNAPSHOT_FORMAT, so any edit to the config or upgrade of the server misses the cache
+and falls back to a full load. Snapshots are pickles: keep the snapshot directory
+private to the user running the server.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import Any, Optional
+
+from .. import __version__
+
+logger = logging.getLogger(__name__)
+
+# Bump when the structure of compiled routes changes in a way old snapshots cannot load.
+SNAPSHOT_FORMAT = 7
+
+def default_snapshot_dir() -> str:
+    """Returns `$XDG_CACHE_HOME/simple-mock-server`, falling back to `~/.cache`."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'simple-mock-server')
+
+def snapshot_key(content: bytes, base_dir: str = '') -> str:
+    """
+    Returns the cache key for a config with the given raw bytes.
+
+    `base_dir` is part of the key when the config refers to a `body_file`, a credentials
+    file or a resource `snapshot`, because those paths are resolved against the config's
+    directory when the routes are compiled.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{__version__}:{SNAPSHOT_FORMAT}:".encode('ascii'))
+    if b'_file' in content or b'snapshot' in content:
+        digest.update(os.fsencode(base_dir) + b'\0')
+    digest.update(content)
+    return digest.hexdigest()
+
+def _snapshot_path(snapshot_dir: str, key: str) -> str:
+    return os.path.join(snapshot_dir, f"{key}.snapshot")
+
+def load_snapshot(snapshot_dir: str, key: str) -> Optional[Any]:
+    """Returns the payload stored under `key`, or None if it is missing or unreadable."""
+    path = _snapshot_path(snapshot_dir, key)
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable config snapshot {path}: {e}")
+        return None
+
+def save_snapshot(snapshot_dir: str, key: str, payload: Any) -> bool:
+    """
+    Writes `payload` under `key` atomically, so concurrent starts never read a partial file.
+
+    Returns:
+        True if the snapshot was written; failures are logged and otherwise ignored.
+    """
+    try:
+        os.makedirs(snapshot_dir, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, _snapshot_path(snapshot_dir, key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except Exception as e:
+        logger.warning(f"Could not write config snapshot to {snapshot_dir}: {e}")
+        return False
+    return True
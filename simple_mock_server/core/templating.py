@@ -0,0 +1,207 @@
+"""
+Compiles response `data` and `headers` into template plans once, at config load.
+
+A plan keeps every placeholder-free subtree as pre-serialized JSON bytes and only
+fills the `{...}` slots per request, producing output byte-for-byte identical to
+`json.dumps(apply_templating(...))`.
+"""
+import json
+import re
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+PATH_PARAM = 'path'
+QUERY_PARAM = 'query_param'
+BODY_PARAM = 'body_param'
+
+_PLACEHOLDER_RE = re.compile(r'\{(?:(query_param|body_param):)?([^{}]+)\}')
+_PATH_PARAM_RE = re.compile(r'{(\w+)}')
+
+
+def path_params_of(path: str) -> List[str]:
+    """Returns the `{param}` names declared in a route path."""
+    return _PATH_PARAM_RE.findall(path)
+
+
+class Slot:
+    """A single placeholder, resolved from path, query or body values at render time."""
+    __slots__ = ('source', 'key', 'raw')
+
+    def __init__(self, source: str, key: str, raw: str):
+        self.source = source
+        self.key = key
+        self.raw = raw
+
+    def resolve(self, path_params: Dict[str, Any], query_args: Any, body_params: Any) -> str:
+        if self.source == PATH_PARAM:
+            values = path_params
+        elif self.source == QUERY_PARAM:
+            values = query_args
+        else:
+            values = body_params if isinstance(body_params, dict) else None
+        if values is not None and self.key in values:
+            return str(values[self.key])
+        # Unknown placeholders are left untouched, as apply_templating does.
+        return self.raw
+
+
+class TextTemplate:
+    """A string split into literal pieces and placeholder slots."""
+    __slots__ = ('parts', 'static')
+
+    def __init__(self, parts: List[Union[str, Slot]]):
+        self.parts = parts
+        self.static = parts[0] if len(parts) == 1 and isinstance(parts[0], str) else None
+
+    def render(self, path_params: Dict[str, Any], query_args: Any, body_params: Any) -> str:
+        if self.static is not None:
+            return self.static
+        return ''.join(
+            part if part.__class__ is str else part.resolve(path_params, query_args, body_params)
+            for part in self.parts
+        )
+
+
+class JsonTemplate:
+    """A JSON document split into pre-serialized byte chunks and templated strings."""
+    __slots__ = ('parts', 'static', 'echo')
+
+    def __init__(self, parts: List[Union[bytes, TextTemplate]], echo: bool = False):
+        self.parts = parts
+        self.static = parts[0] if len(parts) == 1 and isinstance(parts[0], bytes) else None
+        self.echo = echo
+
+    def render(self, path_params: Dict[str, Any], query_args: Any, body_params: Any) -> bytes:
+        if self.static is not None:
+            return self.static
+        return b''.join(
+            part if part.__class__ is bytes
+            else encode_basestring_ascii(part.render(path_params, query_args, body_params)).encode('ascii')
+            for part in self.parts
+        )
+
+
+class HeadersTemplate:
+    """Response headers whose values may contain placeholders."""
+    __slots__ = ('items', 'static')
+
+    def __init__(self, items: List[Tuple[str, TextTemplate]]):
+        self.items = items
+        if all(template.static is not None for _, template in items):
+            self.static = {name: template.static for name, template in items}
+        else:
+            self.static = None
+
+    def render(self, path_params: Dict[str, Any], query_args: Any, body_params: Any) -> Dict[str, str]:
+        if self.static is not None:
+            return dict(self.static)
+        return {name: template.render(path_params, query_args, body_params) for name, template in self.items}
+
+
+def _split(text: str, path_params: Optional[Iterable[str]]) -> List[Union[str, Slot]]:
+    parts: List[Union[str, Slot]] = []
+    position = 0
+    for match in _PLACEHOLDER_RE.finditer(text):
+        source, key = match.group(1), match.group(2)
+        if source is None:
+            if path_params is not None and key not in path_params:
+                continue
+            source = PATH_PARAM
+        if match.start() > position:
+            parts.append(text[position:match.start()])
+        parts.append(Slot(source, key, match.group(0)))
+        position = match.end()
+    if position < len(text) or not parts:
+        parts.append(text[position:])
+    return parts
+
+
+def compile_text_template(text: str, path_params: Optional[Iterable[str]] = None) -> TextTemplate:
+    """Compiles a string with `{param}`, `{query_param:...}` and `{body_param:...}` placeholders."""
+    if path_params is not None:
+        path_params = frozenset(path_params)
+    return TextTemplate(_split(text, path_params))
+
+
+def encode_key(key: Any) -> str:
+    """Encodes a dict key exactly as `json.dumps` writes it, quotes included."""
+    if isinstance(key, str):
+        return encode_basestring_ascii(key)
+    # Let json coerce int/float/bool/None keys exactly as json.dumps would.
+    return json.dumps({key: None})[1:-len(': null}')]
+
+
+def _compile_node(node: Any, path_params: Optional[frozenset], out: List[Union[str, TextTemplate]]) -> bool:
+    """Appends the serialized pieces of `node` to `out`; returns True if it contains slots."""
+    if isinstance(node, str):
+        template = TextTemplate(_split(node, path_params))
+        if template.static is not None:
+            out.append(encode_basestring_ascii(node))
+            return False
+        out.append(template)
+        return True
+
+    if isinstance(node, list):
+        templated = False
+        out.append('[')
+        for index, item in enumerate(node):
+            if index:
+                out.append(', ')
+            templated = _compile_node(item, path_params, out) or templated
+        out.append(']')
+        return templated
+
+    if isinstance(node, dict):
+        templated = False
+        out.append('{')
+        for index, (key, value) in enumerate(node.items()):
+            if index:
+                out.append(', ')
+            out.append(encode_key(key) + ': ')
+            templated = _compile_node(value, path_params, out) or templated
+        out.append('}')
+        return templated
+
+    out.append(json.dumps(node))
+    return False
+
+
+def compile_json_template(data: Any, path_params: Optional[Iterable[str]] = None) -> JsonTemplate:
+    """
+    Compiles response data into a JSON template plan.
+
+    Args:
+        data: The route's response `data`.
+        path_params: The route's path parameter names. When given, `{name}` is only
+            treated as a placeholder if `name` is one of them.
+
+    Returns:
+        A JsonTemplate whose `render()` output matches `json.dumps(apply_templating(...))`.
+    """
+    if path_params is not None:
+        path_params = frozenset(path_params)
+    pieces: List[Union[str, TextTemplate]] = []
+    _compile_node(data, path_params, pieces)
+
+    parts: List[Union[bytes, TextTemplate]] = []
+    buffer: List[str] = []
+    for piece in pieces:
+        if isinstance(piece, str):
+            buffer.append(piece)
+            continue
+        if buffer:
+            parts.append(''.join(buffer).encode('ascii'))
+            buffer = []
+        parts.append(piece)
+    if buffer or not parts:
+        parts.append(''.join(buffer).encode('ascii'))
+
+    echo = isinstance(data, dict) and bool(data.get('echo'))
+    return JsonTemplate(parts, echo=echo)
+
+
+def compile_headers_template(headers: Dict[str, str], path_params: Optional[Iterable[str]] = None) -> HeadersTemplate:
+    """Compiles a route's response headers into a HeadersTemplate."""
+    if path_params is not None:
+        path_params = frozenset(path_params)
+    return HeadersTemplate([(name, TextTemplate(_split(value, path_params))) for name, value in headers.items()])
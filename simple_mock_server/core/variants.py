@@ -0,0 +1,133 @@
+"""
+Conditional response variants (`response.variants`).
+
+Each variant has a `match` on path parameters, query parameters, headers or (dotted)
+JSON body fields and overrides parts of the route's response:
+
+    {"name": "missing", "match": {"path": {"user_id": "999"}}, "code": 404, "data": {"error": "Not Found"}}
+    {"match": {"headers": {"X-Tenant": {"pattern": "beta-.*"}}}, "data": {"beta": true}}
+
+The first matching variant in declaration order wins; the route's own response is the
+default. Variants whose conditions are all exact values are compiled into hash tables,
+one per combination of matched fields, so hundreds of them cost one lookup per table.
+Variants with a `pattern` (a regular expression that must match the whole value) are
+checked in order, and only those declared before the best exact hit.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import observe_variant
+
+SOURCES = ('path', 'query', 'headers', 'body')
+DEFAULT_VARIANT = 'default'
+
+Field = Tuple[str, str]
+
+def match_key(value: Any) -> Optional[str]:
+    """Maps a configured or request value to its comparison key: strings as-is, None as None, others as JSON."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+def _body_field(body: Any, dotted: str) -> Any:
+    for part in dotted.split('.'):
+        if not isinstance(body, dict):
+            return None
+        body = body.get(part)
+    return body
+
+def request_value(ctx: Any, field: Field) -> Optional[str]:
+    """Returns the comparison key of one request field, or None if the request lacks it."""
+    source, name = field
+    if source == 'path':
+        return match_key(ctx.path_params.get(name))
+    if source == 'query':
+        return ctx.query_args.get(name)
+    if source == 'headers':
+        return ctx.request.headers.get(name)
+    return match_key(_body_field(ctx.body_params(), name))
+
+class VariantIndex:
+    """The compiled variants of one route: exact-match hash tables plus ordered pattern fallbacks."""
+    __slots__ = ('entries', 'names', 'exact', 'patterns')
+
+    def __init__(self, entries: List[Dict[str, Any]], names: List[str],
+                 exact: List[Tuple[Tuple[Field, ...], Dict[Tuple[Optional[str], ...], int]]],
+                 patterns: List[Tuple[int, List[Tuple[Field, Any]]]]):
+        self.entries = entries
+        self.names = names
+        self.exact = exact
+        self.patterns = patterns
+
+    def position(self, ctx: Any) -> Optional[int]:
+        """Returns the position of the first variant matching the request, or None."""
+        values: Dict[Field, Optional[str]] = {}
+
+        def value(field: Field) -> Optional[str]:
+            if field not in values:
+                values[field] = request_value(ctx, field)
+            return values[field]
+
+        best = None
+        for fields, table in self.exact:
+            hit = table.get(tuple(value(field) for field in fields))
+            if hit is not None and (best is None or hit < best):
+                best = hit
+        for position, conditions in self.patterns:
+            if best is not None and position > best:
+                break
+            if all(_matches(value(field), expected) for field, expected in conditions):
+                return position
+        return best
+
+    def select(self, ctx: Any, default: Dict[str, Any], path: str, method: str) -> Dict[str, Any]:
+        """Returns the response entry of the matching variant (or `default`) and counts the hit."""
+        position = self.position(ctx)
+        if position is None:
+            observe_variant(path, method, DEFAULT_VARIANT)
+            return default
+        observe_variant(path, method, self.names[position])
+        return self.entries[position]
+
+def _matches(actual: Optional[str], expected: Any) -> bool:
+    if isinstance(expected, re.Pattern):
+        return actual is not None and expected.fullmatch(actual) is not None
+    return actual == expected
+
+def compile_variants(variants: List[Dict[str, Any]], entries: List[Dict[str, Any]]) -> VariantIndex:
+    """
+    Builds the dispatch index for `variants`, whose compiled response entries are `entries`.
+
+    Raises:
+        ValueError: If a match names an unknown source or has an invalid pattern.
+    """
+    names = []
+    tables: Dict[Tuple[Field, ...], Dict[Tuple[Optional[str], ...], int]] = {}
+    patterns = []
+    for position, variant in enumerate(variants):
+        names.append(variant.get('name') or f"#{position}")
+        conditions: List[Tuple[Field, Any]] = []
+        for source, fields in (variant.get('match') or {}).items():
+            if source not in SOURCES:
+                raise ValueError(f"Unknown match source {source!r}; expected one of {', '.join(SOURCES)}")
+            for name, expected in fields.items():
+                if source == 'headers':
+                    # Header names are case-insensitive; one spelling keeps them in one table.
+                    name = name.title()
+                if isinstance(expected, dict):
+                    try:
+                        expected = re.compile(expected['pattern'])
+                    except (KeyError, TypeError, re.error) as e:
+                        raise ValueError(f"Invalid pattern in variant {names[-1]}: {e}") from e
+                else:
+                    expected = match_key(expected)
+                conditions.append(((source, name), expected))
+        conditions.sort(key=lambda condition: condition[0])
+        if any(isinstance(expected, re.Pattern) for _, expected in conditions):
+            patterns.append((position, conditions))
+        else:
+            fields_key = tuple(field for field, _ in conditions)
+            # An earlier variant with the same values wins.
+            tables.setdefault(fields_key, {}).setdefault(tuple(expected for _, expected in conditions), position)
+    return VariantIndex(entries, names, list(tables.items()), patterns)
@@ -0,0 +1,154 @@
+"""
+Pre-fork multi-process serving.
+
+The supervisor binds one listening socket, forks N workers that inherit it and serve
+the already-built app, forwards SIGTERM to them on shutdown and restarts any worker
+that exits unexpectedly.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from werkzeug.serving import make_server
+
+from .async_server import LISTEN_BACKLOG, serve_async
+
+logger = logging.getLogger(__name__)
+
+# A worker that dies sooner than this after starting is considered crash-looping.
+MIN_WORKER_LIFETIME = 1.0
+
+
+def _bind_socket(host: str, port: int, backlog: int = LISTEN_BACKLOG) -> socket.socket:
+    family, _, _, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(address)
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkSupervisor:
+    """Runs an app in N forked worker processes sharing one listening socket."""
+
+    def __init__(self, app: Callable, host: str, port: int, workers: int, async_mode: bool = False,
+                 shutdown_timeout: float = 30, on_worker_start: Optional[Callable[[], None]] = None,
+                 on_worker_exit: Optional[Callable[[], None]] = None, max_body_size: Optional[int] = None):
+        if not hasattr(os, 'fork'):
+            raise RuntimeError("--workers requires a platform that supports os.fork().")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.async_mode = async_mode
+        self.shutdown_timeout = shutdown_timeout
+        self.on_worker_start = on_worker_start
+        self.on_worker_exit = on_worker_exit
+        self.max_body_size = max_body_size
+        self.sock: Optional[socket.socket] = None
+        self.children: Dict[int, int] = {}
+        self.stopping = False
+
+    def _spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                self._run_worker(index)
+                exit_code = 0
+            except BaseException:
+                logger.exception(f"Worker {index} failed")
+            finally:
+                # os._exit skips atexit handlers, so flush per-worker state explicitly.
+                if self.on_worker_exit:
+                    try:
+                        self.on_worker_exit()
+                    except Exception:
+                        logger.exception(f"Worker {index} exit hook failed")
+                os._exit(exit_code)
+        self.children[pid] = index
+        logger.info(f"Started worker {index} (pid {pid})")
+
+    def _run_worker(self, index: int) -> None:
+        # Ctrl-C reaches the whole process group; workers wait for the supervisor's SIGTERM.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        # Drop any SIGHUP handler inherited from the supervisor; on_worker_start may install one.
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        if self.on_worker_start:
+            self.on_worker_start()
+
+        if self.async_mode:
+            serve_async(self.app, sock=self.sock, graceful_sigterm=True, shutdown_timeout=self.shutdown_timeout,
+                        max_body_size=self.max_body_size)
+            return
+
+        server = make_server(self.host, self.port, self.app, threaded=True, fd=self.sock.fileno())
+        # Non-daemon request threads let server_close() wait for in-flight requests.
+        server.daemon_threads = False
+
+        def stop(sig, frame):
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        server.serve_forever()
+
+    def run(self) -> None:
+        """Binds the socket, starts the workers and supervises them until shutdown."""
+        self.sock = _bind_socket(self.host, self.port)
+        logger.info(f"Listening on {self.host}:{self.port} with {self.workers} workers")
+        for index in range(self.workers):
+            self._spawn(index)
+
+        started_at = {index: time.monotonic() for index in range(self.workers)}
+        while not self.stopping:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = self.children.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            if os.WIFSIGNALED(status):
+                logger.error(f"Worker {index} (pid {pid}) was killed by signal {os.WTERMSIG(status)}; restarting.")
+            else:
+                logger.error(f"Worker {index} (pid {pid}) exited with status {os.WEXITSTATUS(status)}; restarting.")
+            if time.monotonic() - started_at[index] < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            started_at[index] = time.monotonic()
+            self._spawn(index)
+
+    def signal_workers(self, sig: int) -> None:
+        """Sends `sig` to every live worker."""
+        for pid in list(self.children):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+    def shutdown(self, sig: int = signal.SIGTERM) -> None:
+        """Forwards `sig` to all workers and waits for them, killing stragglers after the timeout."""
+        self.stopping = True
+        self.signal_workers(sig)
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.children.pop(pid, None)
+            else:
+                time.sleep(0.05)
+        if self.children:
+            logger.warning(f"Killing {len(self.children)} workers that did not stop in time.")
+            self.signal_workers(signal.SIGKILL)
+        if self.sock is not None:
+            self.sock.close()
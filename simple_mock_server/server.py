@@ -2,7 +2,7 @@
 A simple, file-based API mocking server built with Flask.
 Designed to help developers quickly simulate API endpoints for testing and development.
 """
-from flask import Flask, jsonify, request, Response
+from flask import Flask, current_app, jsonify, request, Response
 from flask_cors import CORS # Import CORS
 import json
 import re
@@ -18,14 +18,33 @@ import sys
 import base64
 import threading
 import jsonschema # Import jsonschema
-from .config_parser import load_and_validate_config, ValidationError # Import config loader and ValidationError
-from .core.auth import check_authentication
-from .core.rate_limiter import handle_rate_limiting
-from .core.response import prepare_response, validate_request_body
-from .core.metrics import track_request, generate_metrics
+from werkzeug.exceptions import HTTPException
+from .config_parser import parse_and_validate_config, ValidationError # Import config loader and ValidationError
+from .core.access_log import AccessLog, DEFAULT_QUEUE_SIZE, close_access_log, log_access, set_access_log
+from .core.auth import check_authentication, compile_auth
+from .core.body_file import FileBody
+from .core.compression import DEFAULT_LEVEL, DEFAULT_MIN_SIZE, compress_response, compression_settings, precompress, route_compression
+from .core.generator import compile_generated_list
+from .core.latency import compile_delay, compile_fault
+from .core.resources import compile_resource, expand_resource_routes, save_resource_stores
+from .core.variants import compile_variants
+from .core.etag import conditional_response
+from .core.context import DEFAULT_MAX_BODY_SIZE, RequestContext, body_too_large
+from .core.rate_limiter import handle_rate_limiting, set_rate_limit_backend, SharedMemoryRateLimitBackend
+from .core.response import prepare_response, validate_request_body, build_static_response, compile_request_validator
+from .core.openapi import OpenAPICache
+from .core.route_table import Route, RouteRegistry, RouteTable
+from .core.stage_timing import StageTimer
+from .core.snapshot import default_snapshot_dir, load_snapshot, save_snapshot, snapshot_key
+from .core.metrics import track_request, observe_response, generate_metrics
+from .core.templating import compile_json_template, compile_headers_template, path_params_of
+from .async_server import DEFERRED_DELAY_ENVIRON_KEY, serve_async
+from .prefork import PreforkSupervisor
 
 # Global variable for the observer, initialized to None
 observer = None
+# Global variable for the pre-fork supervisor when running with --workers
+supervisor = None
 
 def signal_handler(sig, frame):
     """
@@ -36,6 +55,9 @@ def signal_handler(sig, frame):
     if observer and observer.is_alive():
         observer.stop()
         observer.join()
+    if supervisor:
+        # Workers ignore SIGINT, so always fan out SIGTERM to let them finish in-flight requests.
+        supervisor.shutdown(signal.SIGTERM)
     sys.exit(0)
 
 # Configure logging
@@ -57,15 +79,30 @@ def handle_404_error(e):
     logger.warning(f"Unknown route accessed: {request.path}")
     return jsonify({"error": "Not Found", "message": f"The requested URL {request.path} was not found on the server."}), 404
 
+def _payload_too_large(max_body_size):
+    logger.warning(f"Request body too large for {request.method} {request.path}")
+    return jsonify({"error": "Payload Too Large", "message": f"Request body exceeds the maximum size of {max_body_size} bytes."}), 413
+
+def handle_413_error(e):
+    """Returns a JSON 413 error response for bodies that exceed the limit while streaming."""
+    return _payload_too_large(current_app.config['MAX_CONTENT_LENGTH'])
+
 
 
 
 
 def _handle_delay(response_config):
-    """Handles response delay."""
-    delay = response_config.get('delay', 0)
+    """Handles response delay, drawn from the route's compiled delay distribution."""
+    latency = response_config.get('latency')
+    if latency is None:
+        return
+    delay = latency.sample()
     if delay > 0:
-        logger.info(f"Delaying response for {delay} seconds.")
+        logger.debug(f"Delaying response for {delay} seconds.")
+        if DEFERRED_DELAY_ENVIRON_KEY in request.environ:
+            # The async server awaits the delay on its event loop instead.
+            request.environ[DEFERRED_DELAY_ENVIRON_KEY] = delay
+            return
         time.sleep(delay)
 
 def generate_openapi_spec(routes_config, host, port):
@@ -100,9 +137,9 @@ def generate_openapi_spec(routes_config, host, port):
         }
     }
 
-    for route in routes_config:
+    for route in expand_resource_routes(routes_config):
         path = route['path']
-        path_item = {}
+        path_item = spec["paths"].get(path, {})
 
         # Add path parameters
         parameters = []
@@ -120,7 +157,7 @@ def generate_openapi_spec(routes_config, host, port):
             operation = {
                 "summary": route.get('description', 'No description'),
                 "tags": route.get('tags', []),
-                "parameters": parameters,
+                "parameters": list(parameters),
                 "responses": {}
             }
 
@@ -148,15 +185,20 @@ def generate_openapi_spec(routes_config, host, port):
                     }
                 }
             }
-
-            if route.get('request_body'):
+            for variant in response_config.get('variants', []):
+                operation["responses"].setdefault(str(variant.get('code', response_config.get('code', 200))), {
+                    "description": f"Mocked response (variant {variant.get('name', 'unnamed')})",
+                    "content": {"application/json": {"schema": {"type": "object", "example": variant.get('data', {})}}}
+                })
+
+            if route.get('request_body') or route.get('request_schema'):
+                schema = dict(route.get('request_schema') or {"type": "object"})
+                if route.get('request_body'):
+                    schema['example'] = route['request_body']
                 operation['requestBody'] = {
                     "content": {
                         "application/json": {
-                            "schema": {
-                                "type": "object",
-                                "example": route.get('request_body')
-                            }
+                            "schema": schema
                         }
                     }
                 }
@@ -164,11 +206,11 @@ def generate_openapi_spec(routes_config, host, port):
             # Add security schemes
             if 'auth' in route:
                 auth = route['auth']
-                if 'api_key' in auth:
+                if 'api_key' in auth or 'api_keys_file' in auth:
                     operation['security'] = [{"apiKey": []}]
                 elif 'basic_auth' in auth:
                     operation['security'] = [{"basicAuth": []}]
-                elif 'bearer_token' in auth:
+                elif 'bearer_token' in auth or 'bearer_tokens_file' in auth:
                     operation['security'] = [{"bearerAuth": []}]
 
             path_item[method_lower] = operation
@@ -177,155 +219,478 @@ def generate_openapi_spec(routes_config, host, port):
 
     return spec
 
-def make_endpoint_function(responses, allowed_methods, route_template_path):
-    """Factory function to create a unique endpoint function for each route."""
+def _options_response(allowed_methods):
+    """Answers an unconfigured OPTIONS request with the route's allowed methods, as Flask would."""
+    resp = Response(status=200)
+    resp.allow.update(allowed_methods)
+    resp.allow.add('OPTIONS')
+    if 'GET' in allowed_methods:
+        resp.allow.add('HEAD')
+    return resp
+
+def _status_code(rv):
+    """Returns the status code of a view return value (a Response or a (body, status) tuple)."""
+    if isinstance(rv, tuple):
+        return rv[1] if len(rv) > 1 and isinstance(rv[1], int) else rv[0].status_code
+    return rv.status_code
+
+def make_endpoint_function(responses, allowed_methods, route_template_path, max_body_size=DEFAULT_MAX_BODY_SIZE, compression=None,
+                           server_timing=False):
+    """
+    Factory function to create a unique endpoint function for each route.
+
+    With `server_timing`, each pipeline stage is timed and reported in a `Server-Timing`
+    header and on `/metrics`.
+    """
+    # Resolve per-method compression and precompress static bodies once, at load time.
+    compression_by_method = {method: route_compression(compression, config.get('compress'))
+                             for method, config in responses.items()}
+    static_variants = {method: precompress(config['static_response'].body, compression_by_method[method])
+                       for method, config in responses.items() if config.get('static_response') is not None}
+
     def endpoint(**kwargs):
-        if request.path != '/metrics':
-            track_request(request.path, request.method)
-        logger.info(f"Incoming request: {request.method} {request.path}")
+        started_at = time.time()
+        start = time.perf_counter()
+        track_request(route_template_path, request.method)
+        status = 500
+        timer = StageTimer() if server_timing else None
+        try:
+            rv = handle(kwargs, timer)
+            if timer is not None:
+                timer.finish(rv)
+            status = _status_code(rv)
+            return rv
+        except HTTPException as e:
+            status = e.code
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            observe_response(route_template_path, request.method, status, duration)
+            log_access(request, route_template_path, status, duration, started_at)
+
+    def handle(kwargs, timer):
+        # Per-request lines are debug-only; use --access-log for a structured, non-blocking record.
         if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Incoming request: {request.method} {request.path}")
             logger.debug(f"Request headers: {dict(request.headers)}")
-            if request.is_json:
-                logger.debug(f"Request body: {request.get_json(force=True, silent=True)}")
         
-        response_config = responses.get(request.method)
+        method = request.method
+        if method == 'HEAD' and 'HEAD' not in responses:
+            method = 'GET'  # HEAD is answered like GET; the server drops the body.
+        response_config = responses.get(method)
         if not response_config:
+            if method == 'OPTIONS':
+                return _options_response(allowed_methods)
             logger.warning(f"Method Not Allowed: {request.method} {request.path}")
             resp = jsonify({'error': 'Method Not Allowed', 'allowed_methods': allowed_methods})
             resp.status_code = 405
             resp.headers['Allow'] = ', '.join(allowed_methods)
             return resp
 
+        if body_too_large(request, max_body_size):
+            return _payload_too_large(max_body_size)
+
+        # Fully static routes skip the pipeline; JSON bodies still go through it so
+        # malformed payloads are rejected as before.
+        static_response = response_config.get('static_response')
+        if static_response is not None and not request.is_json:
+            if timer is not None:
+                timer.lap('dispatch')
+            _handle_delay(response_config)
+            if timer is not None:
+                timer.lap('delay')
+            fault = response_config.get('fault')
+            if fault is not None and fault.roll():
+                return fault.response()
+            resp = conditional_response(static_response.to_response(), request)
+            if timer is not None:
+                timer.lap('render')
+            resp = compress_response(resp, request, compression_by_method[method], static_variants[method])
+            if timer is not None:
+                timer.lap('compress')
+            return resp
+
+        ctx = RequestContext(request, kwargs, response_config.get('auth'))
+        if ctx.is_json and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Request body: {ctx.body_params()}")
+        if timer is not None:
+            timer.lap('dispatch')
+
         # Handle rate limiting
-        rate_limit_response, endpoint_key = handle_rate_limiting(response_config, request, route_template_path)
+        rate_limit_response, endpoint_key = handle_rate_limiting(response_config, ctx, route_template_path)
+        if timer is not None:
+            timer.lap('rate_limit')
         if rate_limit_response:
             return rate_limit_response
 
         # Handle authentication
-        auth_response = check_authentication(response_config, request, route_template_path)
+        auth_response = check_authentication(response_config, ctx, route_template_path)
+        if timer is not None:
+            timer.lap('auth')
         if auth_response:
             return auth_response
 
-        # Handle delay
-        _handle_delay(response_config)
+        # Pick the response variant; rate limits, auth and validation stay those of the route.
+        selected = response_config
+        variants = response_config.get('variants')
+        if variants is not None:
+            selected = variants.select(ctx, response_config, route_template_path, method)
+            if timer is not None:
+                timer.lap('variant')
 
-        # Validate request body and get parsed parameters
-        request_body_params, validation_error_response = validate_request_body(response_config, request)
+        # Handle delay
+        _handle_delay(selected)
+        if timer is not None:
+            timer.lap('delay')
+        # Injected faults answer after the delay, like a slow dependency that then fails.
+        fault = selected.get('fault')
+        if fault is not None and fault.roll():
+            return fault.response()
+
+        # Validate request body
+        _, validation_error_response = validate_request_body(response_config, ctx)
+        if timer is not None:
+            timer.lap('validate')
         if validation_error_response:
             return validation_error_response
-        # Prepare and return the response
-        return prepare_response(response_config, kwargs, request, endpoint_key, request_body_params)
+        # Prepare the response; a matching If-None-Match turns it into a 304 before compression.
+        resource = selected.get('resource')
+        if resource is not None:
+            resp = conditional_response(resource.respond(ctx), request)
+        elif selected is not response_config and selected['static_response'] is not None:
+            resp = conditional_response(selected['static_response'].to_response(), request)
+        else:
+            resp = conditional_response(prepare_response(selected, ctx, endpoint_key), request)
+        if timer is not None:
+            timer.lap('render')
+        resp = compress_response(resp, request, compression_by_method[method])
+        if timer is not None:
+            timer.lap('compress')
+        return resp
     return endpoint
 
-def create_mock_server(config_path='api.json', static_folder_path=None, host='127.0.0.1', port=5001):
-    """Loads API configuration and registers routes with the Flask app."""
+# Response keys that each define the whole body; a variant setting one drops the others.
+_BODY_SOURCES = frozenset(['data', 'body_file', 'generate'])
+
+def compile_routes(routes_config, max_body_size=DEFAULT_MAX_BODY_SIZE, previous=None, base_dir='.', compression=None,
+                   server_timing=False):
+    """
+    Compiles the configured routes into Route objects keyed by their URL template.
+
+    Paths whose definitions are unchanged from the `previous` route table reuse its
+    compiled view, so a reload only rebuilds the endpoints that were edited. Relative
+    `body_file` paths are resolved against `base_dir`, the config file's directory.
+    """
+    registered_routes = set()
+    routes_by_path = {}
+    for route in expand_resource_routes(routes_config):
+        path = route.get('path')
+        if not path:
+            logger.warning(f"Skipping route with missing path: {route}")
+            continue
+
+        # Convert {param} to <param> for Flask
+        flask_path = re.sub(r'{(\w+)}', r'<\1>', path)
+
+        methods = route.get('methods', ['GET'])
+        for method in methods:
+            if (flask_path, method) in registered_routes:
+                logger.error(f"Route conflict: {method} {flask_path} is already defined.")
+                raise Exception(f"Route conflict: {method} {flask_path} is already defined.")
+            registered_routes.add((flask_path, method))
+
+        routes_by_path.setdefault(flask_path, []).append(route)
+
+    routes = {}
+    for flask_path, definitions in routes_by_path.items():
+        signature = json.dumps(definitions, sort_keys=True, default=str)
+        old_route = previous.routes.get(flask_path) if previous is not None else None
+        if old_route is not None and old_route.signature == signature:
+            routes[flask_path] = old_route
+            continue
+
+        methods = []
+        responses = {}
+        for route in definitions:
+            path = route['path']
+            route_methods = route.get('methods', ['GET'])
+            methods.extend(route_methods)
+            method_response_config = route.get('response', {})
+            # Compile the response once per route; every method shares the same plan.
+            entry = _compile_response(path, route, method_response_config, base_dir)
+            if method_response_config.get('variants'):
+                base = {key: value for key, value in method_response_config.items() if key != 'variants'}
+                variant_entries = []
+                for variant in method_response_config['variants']:
+                    overrides = {key: value for key, value in variant.items() if key not in ('name', 'match')}
+                    inherited = base
+                    if overrides.keys() & _BODY_SOURCES:
+                        # A variant's own body replaces the route's, whichever kind it is.
+                        inherited = {key: value for key, value in base.items() if key not in _BODY_SOURCES}
+                    variant_entry = _compile_response(path, route, {**inherited, **overrides}, base_dir)
+                    variant_entry['static_response'] = build_static_response(variant_entry)
+                    variant_entries.append(variant_entry)
+                try:
+                    entry['variants'] = compile_variants(method_response_config['variants'], variant_entries)
+                except ValueError as e:
+                    logger.error(f"Invalid response variants for {path}: {e}")
+                    raise Exception(f"Invalid response variants for {path}: {e}") from e
+            request_validator = compile_request_validator(route.get('request_schema'))
+            try:
+                authenticator = compile_auth(route.get('auth'), base_dir)
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Credentials file for {path} could not be read: {e}")
+                raise Exception(f"Credentials file for {path} could not be read: {e}") from e
+            for method in route_methods:
+                responses[method] = {**entry, 'authenticator': authenticator, 'request_validator': request_validator}
+                responses[method]['static_response'] = build_static_response(responses[method])
+
+        routes[flask_path] = _make_route(flask_path, signature, list(dict.fromkeys(methods)), responses, max_body_size, compression,
+                                         server_timing)
+    return routes
+
+def _compile_response(path, route, response_config, base_dir):
+    """
+    Compiles one response (a route's, or one of its variants) into the entry the endpoint serves.
+
+    The route-level authenticator and request validator are added by the caller.
+    """
+    path_params = path_params_of(path)
+    try:
+        body_template = compile_json_template(response_config.get('data', {}), path_params)
+    except (TypeError, ValueError) as e:
+        logger.error(f"Response data for {path} is not JSON serializable: {e}")
+        raise Exception(f"Response data for {path} is not JSON serializable: {e}") from e
+    headers_template = compile_headers_template(response_config.get('headers', {}), path_params)
+    body_file = None
+    if response_config.get('body_file'):
+        body_file_path = os.path.join(base_dir, response_config['body_file'])
+        if not os.path.isfile(body_file_path):
+            logger.error(f"body_file for {path} not found: {body_file_path}")
+            raise Exception(f"body_file for {path} not found: {body_file_path}")
+        body_file = FileBody(body_file_path)
+        if response_config.get('compress') not in (None, False):
+            # File bodies are streamed as-is; reject the combination instead of ignoring `compress`.
+            logger.error(f"compress cannot be combined with body_file for {path}")
+            raise Exception(f"compress cannot be combined with body_file for {path}")
+    generate = None
+    if response_config.get('generate'):
+        try:
+            generate = compile_generated_list(response_config['generate'], path_params)
+        except ValueError as e:
+            logger.error(f"Invalid generate spec for {path}: {e}")
+            raise Exception(f"Invalid generate spec for {path}: {e}") from e
+    try:
+        latency = compile_delay(response_config.get('delay'))
+        fault = compile_fault(response_config.get('fault'))
+    except ValueError as e:
+        logger.error(f"Invalid delay or fault for {path}: {e}")
+        raise Exception(f"Invalid delay or fault for {path}: {e}") from e
+    resource = None
+    if response_config.get('resource'):
+        try:
+            resource = compile_resource(response_config['resource'], base_dir)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load the resource snapshot for {path}: {e}")
+            raise Exception(f"Could not load the resource snapshot for {path}: {e}") from e
+    return {
+        'data': response_config.get('data', {}),
+        'code': response_config.get('code', 200),
+        'delay': response_config.get('delay', 0),
+        'latency': latency,
+        'fault': fault,
+        'headers': response_config.get('headers', {}),
+        'auth': route.get('auth', {}),
+        'rate_limit': route.get('rate_limit', {}),
+        'request_schema': route.get('request_schema'),
+        'body_template': body_template,
+        'headers_template': headers_template,
+        'body_file': body_file,
+        'generate': generate,
+        'resource': resource,
+        'variants': None,
+        'compress': response_config.get('compress')
+    }
+
+def _make_route(path, signature, methods, responses, max_body_size, compression=None, server_timing=False):
+    logger.info(f"Registering route: {path} with methods {methods}")
+    view_func = make_endpoint_function(
+        responses,
+        methods,
+        route_template_path=path,
+        max_body_size=max_body_size,
+        compression=compression,
+        server_timing=server_timing
+    )
+    return Route(path, signature, methods, responses, view_func)
+
+def _snapshot_routes(routes):
+    """Returns the picklable part of compiled routes; validators and views are rebuilt on load."""
+    return {
+        path: (route.signature, route.methods,
+               {method: {**entry, 'request_validator': None} for method, entry in route.responses.items()})
+        for path, route in routes.items()
+    }
+
+def _routes_from_snapshot(snapshot_routes, max_body_size, previous=None, compression=None, server_timing=False):
+    routes = {}
+    for path, (signature, methods, responses) in snapshot_routes.items():
+        old_route = previous.routes.get(path) if previous is not None else None
+        if old_route is not None and old_route.signature == signature:
+            routes[path] = old_route
+            continue
+        validators = {}
+        for entry in responses.values():
+            schema = entry.get('request_schema')
+            if id(schema) not in validators:
+                validators[id(schema)] = compile_request_validator(schema)
+            entry['request_validator'] = validators[id(schema)]
+        routes[path] = _make_route(path, signature, methods, responses, max_body_size, compression, server_timing)
+    return routes
+
+def load_routes(config_path, max_body_size=DEFAULT_MAX_BODY_SIZE, previous=None, snapshot_dir=None, compression=None,
+                server_timing=False):
+    """
+    Loads, validates and compiles the configuration at `config_path`.
+
+    With `snapshot_dir`, a snapshot of a byte-identical config skips parsing, validation
+    and template compilation; otherwise the freshly compiled routes are written back as one.
+
+    Returns:
+        A (routes_config, routes) tuple.
+    """
+    with open(config_path, 'rb') as f:
+        content = f.read()
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    key = snapshot_key(content, base_dir) if snapshot_dir else None
+    if key:
+        payload = load_snapshot(snapshot_dir, key)
+        if payload is not None:
+            logger.info(f"Loaded compiled configuration from snapshot {key[:12]}.")
+            return payload['routes_config'], _routes_from_snapshot(payload['routes'], max_body_size, previous, compression, server_timing)
+
+    routes_config = parse_and_validate_config(content, config_path)
+    routes = compile_routes(routes_config, max_body_size, previous, base_dir, compression, server_timing)
+    if key:
+        save_snapshot(snapshot_dir, key, {'routes_config': routes_config, 'routes': _snapshot_routes(routes)})
+    return routes_config, routes
+
+def create_mock_server(config_path='api.json', static_folder_path=None, host='127.0.0.1', port=5001, max_body_size=DEFAULT_MAX_BODY_SIZE, snapshot_dir=None,
+                       compression=None, server_timing=False):
+    """
+    Loads API configuration and registers routes with the Flask app.
+
+    `max_body_size` caps request bodies in bytes (413 above it); 0 or None disables the limit.
+    `snapshot_dir` enables the compiled config snapshot cache (see `load_routes`).
+    `compression` (see `compression_settings`) compresses every route's responses;
+    routes can still opt in or out with `response.compress`.
+    `server_timing` adds per-stage `Server-Timing` headers and stage histograms.
+    The mock routes live in a RouteRegistry, available as `app.extensions['mock_routes']`,
+    whose `reload()` swaps in a freshly loaded configuration without restarting.
+    """
     app = Flask(__name__, static_folder=static_folder_path) # Initialize app here, use provided static folder path
     CORS(app) # Enable CORS for all routes
+    max_body_size = max_body_size or None
+    # Also enforced by Werkzeug while reading bodies without a Content-Length (chunked).
+    app.config['MAX_CONTENT_LENGTH'] = max_body_size
     
     # Register health check
     app.add_url_rule("/health", "health_check", health_check, methods=["GET"])
     
     # Register 404 error handler
     app.register_error_handler(404, handle_404_error)
+    app.register_error_handler(413, handle_413_error)
 
     logger.info(f"Loading API configuration from {config_path}")
     try:
-        routes_config = load_and_validate_config(config_path)
+        routes_config, routes = load_routes(config_path, max_body_size, snapshot_dir=snapshot_dir, compression=compression,
+                                             server_timing=server_timing)
         logger.info("API configuration validated successfully.")
     except ValidationError as e: # ValidationError is now from jsonschema directly
         logger.exception(f"Invalid api.json: {e.message}") # Use logger.exception
         raise Exception(f"Invalid api.json: {e.message}") from e
 
-    # Add OpenAPI spec endpoint
+    def rebuild(previous):
+        new_config, new_routes = load_routes(config_path, max_body_size, previous, snapshot_dir, compression, server_timing)
+        return RouteTable(previous.version + 1, new_config, new_routes)
+
+    registry = RouteRegistry(RouteTable(1, routes_config, routes), rebuild)
+    app.extensions['mock_routes'] = registry
+
+    @app.before_request
+    def dispatch_mock_route():
+        # Built-in endpoints matched by Flask (/health, /metrics, static files) take precedence.
+        if request.routing_exception is None:
+            return None
+        matched = registry.table.match(request.path, request.query_string.decode('latin-1'))
+        if matched is None:
+            return None
+        route, kwargs = matched
+        return route.view_func(**kwargs)
+
+    # Add OpenAPI spec endpoint; the spec is serialized once per loaded route table.
+    openapi_cache = OpenAPICache(lambda table: generate_openapi_spec(table.routes_config, host, port),
+                                 lambda: registry.table)
+
     @app.route('/openapi.json')
     def openapi_spec():
-        spec = generate_openapi_spec(routes_config, host, port)
-        return jsonify(spec)
+        return openapi_cache.get().to_response(request)
 
     @app.route('/metrics')
     def metrics():
         return Response(generate_metrics(), mimetype='text/plain')
 
-    registered_routes = set()
-    routes_by_path = {}
-    for route in routes_config:
-        path = route.get('path')
-        if not path:
-            logger.warning(f"Skipping route with missing path: {route}")
-            continue
-
-        # Convert {param} to <param> for Flask
-        flask_path = re.sub(r'{(\w+)}', r'<\1>', path)
-
-        methods = route.get('methods', ['GET'])
-        for method in methods:
-            if (flask_path, method) in registered_routes:
-                logger.error(f"Route conflict: {method} {flask_path} is already defined.")
-                raise Exception(f"Route conflict: {method} {flask_path} is already defined.")
-            registered_routes.add((flask_path, method))
-
-        if flask_path not in routes_by_path:
-            # Sanitize path for endpoint name
-            endpoint_name = re.sub(r'[^a-zA-Z0-9_]', '_', flask_path)
-            routes_by_path[flask_path] = {'methods': [], 'responses': {}, 'endpoint_name': endpoint_name}
-        
-        routes_by_path[flask_path]['methods'].extend(methods)
-        for method in methods:
-            method_response_config = route.get('response', {})
-            routes_by_path[flask_path]['responses'][method] = {
-                'data': method_response_config.get('data', {}),
-                'code': method_response_config.get('code', 200),
-                'delay': method_response_config.get('delay', 0),
-                'headers': method_response_config.get('headers', {}),
-                'auth': route.get('auth', {}),
-                'rate_limit': route.get('rate_limit', {})
-            }
-    for path, route_data in routes_by_path.items():
-        allowed_methods_list = list(set(route_data['methods']))
-        logger.info(f"Registering route: {path} with methods {allowed_methods_list}")
-
-        view_func = make_endpoint_function(
-            route_data['responses'], 
-            allowed_methods_list, 
-            route_template_path=path
-        )
-
-        app.add_url_rule(
-            path,
-            endpoint=route_data['endpoint_name'],
-            view_func=view_func,
-            methods=allowed_methods_list
-        )
-
     return app
 
 class ConfigChangeHandler(FileSystemEventHandler):
-    """Handles changes to the configuration file to trigger server reload."""
-    def __init__(self, config_path, main_script_path, debounce_delay=0.5):
+    """Calls `on_change` when the configuration file is modified, created or replaced."""
+    def __init__(self, config_path, on_change, debounce_delay=0.5):
         super().__init__()
         self.config_path = config_path
-        self.main_script_path = main_script_path
+        self.on_change = on_change
         self.debounce_delay = debounce_delay
-        self.last_modified = 0
+        self._timer = None
+        self._lock = threading.Lock()
 
     def _trigger_reload(self, event_path):
-        current_time = time.time()
-        if (current_time - self.last_modified) > self.debounce_delay:
-            logger.info(f"Configuration file {event_path} modified or created. Restarting server...")
-            # Touch the main script file to trigger Flask's reloader
-            os.utime(self.main_script_path, None)
-            self.last_modified = current_time
+        logger.info(f"Configuration file {event_path} modified or created. Reloading routes...")
+        # Editors often save in several writes; reload once they have settled.
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce_delay, self.on_change)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _is_config(self, path):
+        return os.path.abspath(path) == os.path.abspath(self.config_path)
 
     def on_modified(self, event):
-        if os.path.abspath(event.src_path) == os.path.abspath(self.config_path):
+        if self._is_config(event.src_path):
             self._trigger_reload(event.src_path)
 
     def on_created(self, event):
-        if os.path.abspath(event.src_path) == os.path.abspath(self.config_path):
+        if self._is_config(event.src_path):
             self._trigger_reload(event.src_path)
 
+    def on_moved(self, event):
+        # Atomic saves write a temporary file and rename it over the config.
+        if self._is_config(event.dest_path):
+            self._trigger_reload(event.dest_path)
+
+def _start_config_watcher(config_path, on_change):
+    """Starts a watchdog observer that calls `on_change` when `config_path` changes."""
+    config_path = os.path.abspath(config_path)
+    watcher = Observer()
+    watcher.schedule(ConfigChangeHandler(config_path, on_change), os.path.dirname(config_path), recursive=False)
+    watcher.start()
+    return watcher
+
 def main():
     """Main function to parse arguments and run the mock server."""
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        from .bench import main as bench_main
+        sys.exit(bench_main(sys.argv[2:]))
     parser = argparse.ArgumentParser(description="Run a simple API mock server.")
     parser.add_argument(
         "--config",
@@ -360,32 +725,143 @@ def main():
         type=str,
         help="Path to a static folder to serve files from (e.g., for UI assets)."
     )
+    parser.add_argument(
+        "--async",
+        dest="async_mode",
+        action="store_true",
+        help="Serve on an asyncio event loop; response delays do not hold a thread."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of pre-forked worker processes sharing the listening socket (POSIX only)."
+    )
+    parser.add_argument(
+        "--rate-limit-slots",
+        type=int,
+        default=65536,
+        help="Number of client slots in the shared-memory rate limiter used with --workers."
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Reload the configuration in place when the file changes (implied by --debug)."
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        type=str,
+        default=default_snapshot_dir(),
+        help="Directory for compiled config snapshots that skip parsing and validation on restart."
+    )
+    parser.add_argument(
+        "--no-snapshot",
+        action="store_true",
+        help="Always parse and validate the configuration; do not read or write snapshots."
+    )
+    parser.add_argument(
+        "--max-body-size",
+        type=int,
+        default=DEFAULT_MAX_BODY_SIZE,
+        help="Maximum request body size in bytes; larger bodies get 413. 0 disables the limit."
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Compress responses with gzip or deflate when the client accepts it."
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        choices=range(1, 10),
+        metavar="1-9",
+        default=DEFAULT_LEVEL,
+        help="zlib compression level for --compress and routes with response.compress."
+    )
+    parser.add_argument(
+        "--compression-min-size",
+        type=int,
+        default=DEFAULT_MIN_SIZE,
+        help="Smallest response body, in bytes, that is compressed."
+    )
+    parser.add_argument(
+        "--access-log",
+        type=str,
+        help="Append one JSON line per mock request to this file, written by a background thread."
+    )
+    parser.add_argument(
+        "--access-log-sample",
+        type=float,
+        default=1.0,
+        help="Fraction of requests to record in the access log (0 to 1)."
+    )
+    parser.add_argument(
+        "--access-log-queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="Records buffered for the access log writer; records beyond this are dropped and counted."
+    )
+    parser.add_argument(
+        "--server-timing",
+        action="store_true",
+        help="Time each pipeline stage; report it in a Server-Timing header and on /metrics."
+    )
     args = parser.parse_args()
 
     if args.verbose:
         logger.setLevel(logging.DEBUG)
 
-    # Set up file watcher for hot reloading
-    if args.debug: # Only set up hot reloading if debug mode is enabled
-        config_dir = os.path.dirname(os.path.abspath(args.config))
-        event_handler = ConfigChangeHandler(os.path.abspath(args.config), os.path.abspath(__file__))
-        global observer # Declare observer as global
-        observer = Observer()
-        observer.schedule(event_handler, config_dir, recursive=False)
-        observer.start()
-    else:
-        logger.info("Hot reloading is disabled. Run with --debug to enable.")
-
     # Register signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
     try:
         logger.info("Starting mock server...")
-        app = create_mock_server(config_path=args.config, static_folder_path=args.static_folder, host=args.host, port=args.port)
+        snapshot_dir = None if args.no_snapshot else args.snapshot_dir
+        compression = compression_settings(args.compression_level, args.compression_min_size, enabled=args.compress)
+        app = create_mock_server(config_path=args.config, static_folder_path=args.static_folder, host=args.host, port=args.port,
+                                 max_body_size=args.max_body_size, snapshot_dir=snapshot_dir, compression=compression,
+                                 server_timing=args.server_timing)
+        registry = app.extensions['mock_routes']
+        if args.access_log:
+            set_access_log(AccessLog(args.access_log, sample_rate=args.access_log_sample, queue_size=args.access_log_queue_size))
+            logger.info(f"Writing the access log to {args.access_log}")
         if args.static_folder:
             logger.info(f"Serving static files from '{args.static_folder}' at /static/<filename>")
-        app.run(debug=args.debug, port=args.port, host=args.host)
+
+        if args.workers > 1:
+            global supervisor
+            # Each worker holds its own route table; the supervisor fans SIGHUP out to them.
+            def on_worker_start():
+                signal.signal(signal.SIGHUP, lambda sig, frame: registry.reload_in_background())
+            reload_routes = lambda: supervisor.signal_workers(signal.SIGHUP)
+        else:
+            on_worker_start = None
+            reload_routes = registry.reload
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda sig, frame: threading.Thread(target=reload_routes, daemon=True).start())
+
+        # Set up file watcher for hot reloading
+        if args.watch or args.debug:
+            global observer # Declare observer as global
+            observer = _start_config_watcher(args.config, reload_routes)
+            logger.info(f"Watching {args.config} for changes; routes are reloaded in place.")
+        else:
+            logger.info("Hot reloading is disabled. Run with --watch to enable, or send SIGHUP to reload.")
+
+        if args.workers > 1:
+            # Workers must share rate-limit state, otherwise each one enforces the limit on its own.
+            set_rate_limit_backend(SharedMemoryRateLimitBackend(slots=args.rate_limit_slots))
+            supervisor = PreforkSupervisor(app, args.host, args.port, args.workers, async_mode=args.async_mode,
+                                           on_worker_start=on_worker_start, on_worker_exit=close_access_log,
+                                           max_body_size=app.config['MAX_CONTENT_LENGTH'])
+            supervisor.run()
+        elif args.async_mode:
+            if args.debug:
+                logger.warning("Flask debug mode and its reloader are not available with --async.")
+            serve_async(app, host=args.host, port=args.port, max_body_size=app.config['MAX_CONTENT_LENGTH'])
+        else:
+            app.run(debug=args.debug, port=args.port, host=args.host)
     except KeyboardInterrupt:
         logger.info("Server stopped by user (KeyboardInterrupt).")
     except OSError as e:
@@ -400,6 +876,10 @@ def main():
             observer.stop()
         if observer: # Only join if observer was created
             observer.join()
+        close_access_log()
+        # Prefork workers each hold their own resource stores; the supervisor's copies are stale.
+        if args.workers <= 1:
+            save_resource_stores()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from simple_mock_server.core import metrics
+from simple_mock_server.core.access_log import AccessLog, set_access_log
+from simple_mock_server.server import create_mock_server
+
+
+@pytest.fixture
+def app(tmp_path):
+    config_path = tmp_path / "api.json"
+    config_path.write_text(json.dumps([
+        {"path": "/users/{user_id}", "methods": ["GET"], "response": {"data": {"id": "{user_id}"}}},
+        {"path": "/private", "methods": ["GET"], "response": {"data": {}}, "auth": {"api_key": "secret"}},
+    ]))
+    metrics.reset_metrics()
+    yield create_mock_server(config_path=str(config_path))
+    set_access_log(None)
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_requests_are_written_as_jsonl(app, tmp_path):
+    log_path = tmp_path / "access.jsonl"
+    access_log = AccessLog(str(log_path))
+    set_access_log(access_log)
+    client = app.test_client()
+    client.get("/users/7?verbose=1")
+    client.get("/private")
+    client.get("/health")
+    access_log.close()
+
+    records = _records(log_path)
+    assert [(r["method"], r["path"], r["query"], r["route"], r["status"]) for r in records] == [
+        ("GET", "/users/7", "verbose=1", "/users/<user_id>", 200),
+        ("GET", "/private", "", "/private", 401),
+    ]
+    assert all(r["duration_ms"] >= 0 and r["ts"] > 0 for r in records)
+    assert metrics.access_log_records_total["written"] == 2
+
+
+def test_sampling(app, tmp_path):
+    log_path = tmp_path / "access.jsonl"
+    access_log = AccessLog(str(log_path), sample_rate=0)
+    set_access_log(access_log)
+    for _ in range(5):
+        app.test_client().get("/users/1")
+    access_log.close()
+    assert not log_path.exists()
+    assert metrics.access_log_records_total["sampled_out"] == 5
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path, monkeypatch):
+    metrics.reset_metrics()
+    # A writer that never drains the queue.
+    monkeypatch.setattr(AccessLog, "_run", lambda self, records: None)
+    access_log = AccessLog(str(tmp_path / "access.jsonl"), queue_size=2)
+    for index in range(5):
+        access_log.log({"index": index})
+    assert metrics.access_log_records_total["dropped"] == 3
+    assert "access_log_records_total{outcome=\"dropped\"} 3" in metrics.generate_metrics()
@@ -0,0 +1,195 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from simple_mock_server.server import create_mock_server
+from simple_mock_server.async_server import TimerWheel, start_async_server
+
+FIXTURE = bytes(range(256)) * 8192  # 2 MiB
+
+
+@pytest.fixture
+def async_server(tmp_path):
+    config_content = [
+        {
+            "path": "/fast",
+            "methods": ["GET"],
+            "response": {"data": {"message": "fast"}, "code": 200}
+        },
+        {
+            "path": "/slow",
+            "methods": ["GET"],
+            "response": {"data": {"message": "slow"}, "delay": 0.5, "code": 200}
+        },
+        {
+            "path": "/users/{user_id}",
+            "methods": ["GET"],
+            "response": {"data": {"id": "{user_id}"}, "code": 200}
+        },
+        {
+            "path": "/echo",
+            "methods": ["POST"],
+            "response": {"data": {"echo": True}, "code": 200}
+        },
+        {
+            "path": "/download",
+            "methods": ["GET"],
+            "response": {"body_file": "fixture.bin"}
+        }
+    ]
+    (tmp_path / "fixture.bin").write_bytes(FIXTURE)
+    config_path = tmp_path / "api.json"
+    config_path.write_text(json.dumps(config_content))
+    app = create_mock_server(config_path=str(config_path))
+
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_async_server(app, '127.0.0.1', 0, max_body_size=app.config['MAX_CONTENT_LENGTH']))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server.sockets[0].getsockname()[1]
+
+    async def shutdown():
+        server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await server.wait_closed()
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+def _get(port, path, method="GET", body=None, headers=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_templated_response(async_server):
+    status, headers, body = _get(async_server, "/users/7")
+    assert status == 200, f"Expected 200 OK, got {status}"
+    assert json.loads(body) == {"id": "7"}
+    assert headers['Content-Type'] == 'application/json'
+
+
+def test_echo_post(async_server):
+    payload = json.dumps({"key": "value"})
+    status, _, body = _get(async_server, "/echo", "POST", payload, {"Content-Type": "application/json"})
+    assert status == 200, f"Expected 200 OK, got {status}"
+    assert json.loads(body) == {"key": "value"}
+
+
+def test_unknown_route(async_server):
+    status, _, body = _get(async_server, "/missing")
+    assert status == 404, f"Expected 404 Not Found, got {status}"
+    assert json.loads(body)["error"] == "Not Found"
+
+
+def _raw(port, request):
+    with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+        sock.sendall(request)
+        response = b''
+        while chunk := sock.recv(65536):
+            response += chunk
+    return response
+
+
+def test_oversized_bodies_are_rejected_before_reading(async_server):
+    """The 413 is sent without waiting for a body that is over the limit."""
+    declared = _raw(async_server, b'POST /echo HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n'
+                                  b'Content-Length: 2000000\r\n\r\n')
+    assert declared.startswith(b'HTTP/1.1 413 ')
+    assert json.loads(declared.split(b'\r\n\r\n', 1)[1])["error"] == "Payload Too Large"
+
+    chunked = _raw(async_server, b'POST /echo HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n'
+                                 b'4\r\n{}  \r\n' + b'%x\r\n' % (1024 * 1024))
+    assert chunked.startswith(b'HTTP/1.1 413 ')
+
+
+def test_keep_alive_connection(async_server):
+    conn = http.client.HTTPConnection('127.0.0.1', async_server, timeout=10)
+    try:
+        for _ in range(3):
+            conn.request("GET", "/fast")
+            response = conn.getresponse()
+            assert response.status == 200
+            assert json.loads(response.read()) == {"message": "fast"}
+    finally:
+        conn.close()
+
+
+def test_body_file_is_sent_with_sendfile(async_server, monkeypatch):
+    """body_file routes are handed to the server's file wrapper and keep the connection usable."""
+    sent = []
+    original = asyncio.BaseEventLoop.sendfile
+
+    async def sendfile(loop, transport, file, offset=0, count=None, **kwargs):
+        sent.append(count)
+        return await original(loop, transport, file, offset, count, **kwargs)
+    monkeypatch.setattr(asyncio.BaseEventLoop, "sendfile", sendfile)
+
+    conn = http.client.HTTPConnection('127.0.0.1', async_server, timeout=10)
+    try:
+        conn.request("GET", "/download")
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.getheader("Content-Type") == "application/octet-stream"
+        assert int(response.getheader("Content-Length")) == len(FIXTURE)
+        assert response.read() == FIXTURE
+        conn.request("GET", "/fast")
+        assert conn.getresponse().status == 200
+    finally:
+        conn.close()
+    assert sent == [len(FIXTURE)]
+
+
+def test_delays_do_not_block_other_requests(async_server):
+    """Concurrent delayed requests overlap, and fast routes are served while they are pending."""
+    concurrency = 50
+    with ThreadPoolExecutor(max_workers=concurrency + 1) as pool:
+        start = time.monotonic()
+        slow = [pool.submit(_get, async_server, "/slow") for _ in range(concurrency)]
+        time.sleep(0.1)
+        fast_status, _, _ = pool.submit(_get, async_server, "/fast").result()
+        fast_elapsed = time.monotonic() - start
+        results = [future.result() for future in slow]
+        total_elapsed = time.monotonic() - start
+
+    assert fast_status == 200
+    assert fast_elapsed < 0.5, f"Fast route waited behind delayed ones ({fast_elapsed:.2f}s)"
+    assert all(status == 200 for status, _, _ in results)
+    assert total_elapsed < 2.0, f"Delays were serialized ({total_elapsed:.2f}s for {concurrency} requests)"
+
+
+def test_timer_wheel_fires_in_order_and_never_early():
+    async def run():
+        wheel = TimerWheel(tick=0.005, slots=8)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        fired = []
+
+        async def wait(delay):
+            await wheel.sleep(delay)
+            fired.append((delay, loop.time() - start))
+
+        # 0.1 s is more than two revolutions of an 8-slot, 5 ms wheel.
+        await asyncio.gather(*(wait(delay) for delay in (0.1, 0.0, 0.012, 0.045, 0.03)))
+        return wheel, fired
+
+    wheel, fired = asyncio.run(run())
+    assert [delay for delay, _ in fired] == [0.0, 0.012, 0.03, 0.045, 0.1]
+    assert all(elapsed >= delay for delay, elapsed in fired)
+    assert wheel.pending == 0 and wheel._handle is None
@@ -0,0 +1,70 @@
+import json
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from simple_mock_server.bench import load_journal, main, percentile, run_bench, synthesize_requests
+from simple_mock_server.server import create_mock_server
+
+ROUTES = [
+    {"path": "/users/{user_id}", "methods": ["GET"], "response": {"data": {"id": "{user_id}"}}},
+    {"path": "/orders", "methods": ["POST"], "response": {"data": {"ok": True}, "code": 201}},
+    {"path": "/private", "methods": ["GET"], "response": {"data": {}}, "auth": {"bearer_token": "t0ken"}},
+    {"path": "/broken", "methods": ["GET"], "response": {"data": {}, "code": 503}},
+]
+
+
+@pytest.fixture
+def server_url(tmp_path):
+    config_path = tmp_path / "api.json"
+    config_path.write_text(json.dumps(ROUTES))
+    server = make_server("127.0.0.1", 0, create_mock_server(config_path=str(config_path)), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_percentile():
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 99) == 0.99
+    assert percentile([], 50) == 0.0
+
+
+def test_replay_journal(server_url, tmp_path):
+    journal = tmp_path / "access.jsonl"
+    journal.write_text("\n".join(json.dumps(entry) for entry in [
+        {"method": "GET", "path": "/users/1", "query": "a=1", "route": "/users/<user_id>"},
+        {"method": "GET", "path": "/users/2", "route": "/users/<user_id>"},
+        {"method": "POST", "path": "/orders", "body": {"item": 1}},
+        {"method": "GET", "path": "/broken"},
+    ]) + "\n")
+    report = run_bench(server_url, load_journal(str(journal)), concurrency=4, total=40)
+    assert report["summary"]["requests"] == 40
+    assert report["summary"]["errors"] == 10
+    assert report["routes"]["GET /users/<user_id>"]["status"] == {200: 20}
+    assert report["routes"]["POST /orders"]["status"] == {201: 10}
+    latency = report["summary"]["latency_ms"]
+    assert 0 < latency["p50"] <= latency["p90"] <= latency["p99"] <= latency["max"]
+    json.dumps(report)
+
+
+def test_synthesized_requests_carry_credentials(server_url):
+    report = run_bench(server_url, synthesize_requests(ROUTES), concurrency=2, rate=200, total=20)
+    assert set(report["routes"]) == {"GET /users/{user_id}", "POST /orders", "GET /private", "GET /broken"}
+    assert report["routes"]["GET /private"]["status"] == {200: 5}
+
+
+def test_connection_errors_are_counted():
+    report = run_bench("http://127.0.0.1:1", synthesize_requests(ROUTES[:1]), concurrency=1, total=3, timeout=0.5)
+    assert report["summary"]["errors"] == 3
+    assert report["summary"]["status"] == {}
+
+
+def test_invalid_config_exits_with_message(tmp_path, capsys):
+    config_path = tmp_path / "api.json"
+    config_path.write_text(json.dumps([{"path": "/x", "methods": ["GET"]}]))
+    assert main(["--config", str(config_path)]) == 1
+    assert capsys.readouterr().err.startswith("bench: invalid configuration: ")
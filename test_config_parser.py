@@ -42,4 +42,27 @@ def test_valid_yaml_config(tmp_path):
 
     result = load_and_validate_config(str(file))
     assert isinstance(result, list)
-    assert result[0]["path"] == "/hello"
\ No newline at end of file
+    assert result[0]["path"] == "/hello"
+
+
+def test_missing_response_is_named(tmp_path):
+    file = tmp_path / "api.json"
+    file.write_text(json.dumps([{"path": "/hello", "methods": ["GET"]}]))
+
+    with pytest.raises(Exception, match="'response' is a required property"):
+        load_and_validate_config(str(file))
+
+
+def test_resource_route_needs_no_response(tmp_path):
+    file = tmp_path / "api.json"
+    file.write_text(json.dumps([{"path": "/users", "resource": {}}]))
+
+    assert load_and_validate_config(str(file))[0]["resource"] == {}
+
+
+def test_missing_data_is_named(tmp_path):
+    file = tmp_path / "api.json"
+    file.write_text(json.dumps([{"path": "/hello", "methods": ["GET"], "response": {"code": 200}}]))
+
+    with pytest.raises(Exception, match="'data' is a required property"):
+        load_and_validate_config(str(file))
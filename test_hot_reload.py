@@ -0,0 +1,79 @@
+import json
+import time
+
+import pytest
+
+from simple_mock_server.server import create_mock_server, ConfigChangeHandler
+from simple_mock_server.core.metrics import reset_metrics, generate_metrics
+
+
+def _write(path, routes):
+    path.write_text(json.dumps(routes))
+
+
+@pytest.fixture
+def reloadable(tmp_path):
+    config_path = tmp_path / "api.json"
+    _write(config_path, [
+        {"path": "/a", "methods": ["GET"], "response": {"data": {"v": 1}}},
+        {"path": "/b/{id}", "methods": ["GET", "POST"], "response": {"data": {"id": "{id}"}}},
+        {"path": "/gone", "methods": ["GET"], "response": {"data": {}}},
+    ])
+    reset_metrics()
+    app = create_mock_server(config_path=str(config_path))
+    with app.test_client() as client:
+        yield config_path, app.extensions['mock_routes'], client
+
+
+def test_reload_swaps_changed_routes(reloadable):
+    config_path, registry, client = reloadable
+    assert client.get("/a").json == {"v": 1}
+    kept = registry.table.routes["/b/<id>"]
+
+    _write(config_path, [
+        {"path": "/a", "methods": ["GET"], "response": {"data": {"v": 2}}},
+        {"path": "/b/{id}", "methods": ["GET", "POST"], "response": {"data": {"id": "{id}"}}},
+        {"path": "/new", "methods": ["GET"], "response": {"data": {"new": True}}},
+    ])
+    assert registry.reload()
+
+    assert registry.table.version == 2
+    assert registry.table.routes["/b/<id>"] is kept, "Unchanged routes should reuse their compiled view"
+    assert client.get("/a").json == {"v": 2}
+    assert client.get("/b/7").json == {"id": "7"}
+    assert client.get("/new").json == {"new": True}
+    assert client.get("/gone").status_code == 404
+    assert client.get("/openapi.json").json["paths"].keys() == {"/a", "/b/{id}", "/new"}
+
+
+def test_failed_reload_keeps_live_table(reloadable):
+    config_path, registry, client = reloadable
+    config_path.write_text("[{not json")
+    assert not registry.reload()
+    assert registry.table.version == 1
+    assert client.get("/a").json == {"v": 1}
+
+    metrics = generate_metrics()
+    assert 'config_reloads_total{outcome="failure"} 1' in metrics
+    assert 'config_reload_duration_seconds_count 1' in metrics
+
+
+def test_head_and_options_are_answered(reloadable):
+    _, _, client = reloadable
+    head = client.head("/a")
+    assert head.status_code == 200
+    assert head.data == b''
+    options = client.options("/b/1")
+    assert options.status_code == 200
+    assert set(options.headers["Allow"].split(", ")) == {"GET", "POST", "HEAD", "OPTIONS"}
+    assert client.delete("/a").status_code == 405
+
+
+def test_change_handler_debounces_writes(tmp_path):
+    config_path = tmp_path / "api.json"
+    calls = []
+    handler = ConfigChangeHandler(str(config_path), lambda: calls.append(1), debounce_delay=0.05)
+    for _ in range(5):
+        handler._trigger_reload(str(config_path))
+    time.sleep(0.3)
+    assert calls == [1]
@@ -1,8 +1,15 @@
+import gzip
 import pytest
 import json
+import zlib
 from unittest.mock import mock_open, patch
 from simple_mock_server.server import create_mock_server
+from simple_mock_server.core.compression import compression_settings
+from simple_mock_server.core.latency import compile_delay
 from simple_mock_server.core.metrics import reset_metrics
+from simple_mock_server.core.rate_limiter import reset_rate_limits
+from simple_mock_server.core.response import apply_templating
+from simple_mock_server.core.templating import compile_json_template, compile_headers_template
 from jsonschema import ValidationError
 
 
@@ -75,6 +82,12 @@ def client(tmp_path):
             "methods": ["GET"],
             "response": {"data": {"id": "{user_id}", "name": "User {user_id}"}, "headers": {"X-User-Id": "{user_id}"}, "code": 200}
         },
+        {
+            "path": "/register",
+            "methods": ["POST"],
+            "response": {"data": {"registered": "{body_param:name}"}, "code": 201},
+            "request_schema": {"type": "object", "properties": {"name": {"type": "string"}}, "required": ["name"]}
+        },
         {
             "path": "/echo",
             "methods": ["POST"],
@@ -129,6 +142,7 @@ def client(tmp_path):
     config_path.write_text(json.dumps(config_content))
     
     reset_metrics()
+    reset_rate_limits()
     app = create_mock_server(config_path=str(config_path), host='localhost', port=5000)
     with app.test_client() as client:
         yield client
@@ -136,9 +150,8 @@ def client(tmp_path):
 class TestConfigLoading:
     def test_create_mock_server_valid_config(self, mock_config_file):
         app = create_mock_server(config_path='dummy.json')
-        # Flask's url_map contains all registered routes
-        # We need to filter out Flask's internal routes like /static and /health
-        registered_paths = [rule.rule for rule in app.url_map.iter_rules() if rule.endpoint not in ['static', 'health_check', 'openapi_spec', 'metrics']]
+        # Mock routes live in the swappable route table, separate from Flask's built-in routes
+        registered_paths = list(app.extensions['mock_routes'].table.routes)
         assert len(registered_paths) == 2
         assert "/test" in registered_paths
         assert "/another" in registered_paths
@@ -178,6 +191,30 @@ class TestBasicEndpoints:
         assert response.json['openapi'] == "3.0.0"
         assert "/protected" in response.json['paths']
 
+    def test_openapi_spec_conditional_and_gzip(self, client):
+        """The spec is served with an ETag, answers If-None-Match with 304 and has a gzip variant."""
+        response = client.get("/openapi.json")
+        etag = response.headers['ETag']
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        not_modified = client.get("/openapi.json", headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304, f"Expected 304 Not Modified, got {not_modified.status_code}"
+        assert not_modified.data == b''
+        compressed = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert compressed.headers['ETag'] != etag
+        assert json.loads(gzip.decompress(compressed.data)) == response.json
+        assert client.get("/openapi.json", headers={"If-None-Match": compressed.headers['ETag']}).status_code == 304
+
+    def test_openapi_cache_rebuilds_on_version_change(self):
+        from simple_mock_server.core.openapi import OpenAPICache
+        builds = []
+        version = [object()]
+        cache = OpenAPICache(lambda v: builds.append(v) or {"paths": {}, "n": len(builds)}, lambda: version[0])
+        assert cache.get() is cache.get()
+        assert builds == version
+        version[0] = object()
+        assert b'"n":2' in cache.get().body
+
 class TestAuthEndpoints:
     @pytest.mark.parametrize("auth_header,status_code", [
         ({"Authorization": "Basic dXNlcjpwYXNz"}, 200),
@@ -212,6 +249,46 @@ class TestAuthEndpoints:
         assert response.status_code == 200, f"Expected 200 OK, got {response.status_code}"
         assert response.json == {"message": "Access granted!"}
 
+    def test_basic_auth_rejections(self, client):
+        assert client.get("/basic-auth", headers={"Authorization": "Basic !!!"}).json["message"] == \
+            "Invalid Basic authentication header format"
+        assert client.get("/basic-auth", headers={"Authorization": "basic d3Jvbmc6d3Jvbmc="}).json["message"] == \
+            "Invalid Basic authentication credentials"
+        assert client.get("/basic-auth", headers={"Authorization": "basic dXNlcjpwYXNz"}).status_code == 200
+
+    def test_credential_files_are_shared_and_reloaded(self, tmp_path, monkeypatch):
+        (tmp_path / "keys.txt").write_text("# keys\n" + "\n".join(f"key-{i}" for i in range(1000)) + "\n")
+        (tmp_path / "tokens.txt").write_text("token-a\n\ntoken-b\n")
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([
+            {"path": "/a", "methods": ["GET"], "response": {"data": {}}, "auth": {"api_keys_file": "keys.txt"}},
+            {"path": "/b", "methods": ["GET"], "response": {"data": {}}, "auth": {"api_key": "single", "api_keys_file": "keys.txt"}},
+            {"path": "/c", "methods": ["GET"], "response": {"data": {}}, "auth": {"bearer_tokens_file": "tokens.txt"}},
+        ]))
+        reset_rate_limits()
+        app = create_mock_server(config_path=str(config_path))
+        routes = app.extensions['mock_routes'].table.routes
+        assert routes["/a"].responses["GET"]["authenticator"].credentials is routes["/b"].responses["GET"]["authenticator"].credentials
+        client = app.test_client()
+        assert client.get("/a", headers={"X-API-Key": "key-999"}).status_code == 200
+        assert client.get("/a", headers={"X-API-Key": "# keys"}).status_code == 401
+        assert client.get("/b?api_key=single").status_code == 200
+        assert client.get("/c", headers={"Authorization": "Bearer token-b"}).status_code == 200
+        assert client.get("/c", headers={"Authorization": "Bearer token-c"}).status_code == 401
+
+        monkeypatch.setattr("simple_mock_server.core.auth.CREDENTIAL_RECHECK_INTERVAL", 0)
+        (tmp_path / "tokens.txt").write_text("token-c\n")
+        assert client.get("/c", headers={"Authorization": "Bearer token-c"}).status_code == 200
+        assert client.get("/c", headers={"Authorization": "Bearer token-a"}).status_code == 401
+
+    def test_missing_credential_file(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([
+            {"path": "/a", "methods": ["GET"], "response": {"data": {}}, "auth": {"bearer_tokens_file": "missing.txt"}},
+        ]))
+        with pytest.raises(Exception, match="Credentials file for /a could not be read"):
+            create_mock_server(config_path=str(config_path))
+
 class TestRateLimiting:
     def test_rate_limiting(self, client):
         """Test rate limiting behavior and X-RateLimit headers."""
@@ -260,6 +337,343 @@ class TestSpecialResponses:
         assert response.data == b'', "Response body should be empty for 204 response"
         assert 'Content-Type' not in response.headers, "Content-Type header should not be present for 204 response"
 
+    def test_static_response_headers(self, client):
+        """Static routes are served from a prebuilt response with a precomputed Content-Length."""
+        response = client.get("/custom-header")
+        assert response.headers['Content-Type'] == 'application/json'
+        assert response.headers['Content-Length'] == str(len(response.data))
+        assert response.headers['X-Test-Header'] == "TestValue"
+
+    def test_static_route_rejects_malformed_json(self, client):
+        """JSON request bodies bypass the static fast path so they are still validated."""
+        response = client.get("/", data="{not json", content_type="application/json")
+        assert response.status_code == 400, f"Expected 400 Bad Request, got {response.status_code}"
+
+class TestBodyFile:
+    @pytest.fixture
+    def body_file_app(self, tmp_path):
+        (tmp_path / "fixtures").mkdir()
+        (tmp_path / "fixtures" / "users.json").write_text('[{"id": 1}]')
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([
+            {"path": "/users", "methods": ["GET"],
+             "response": {"body_file": "fixtures/users.json", "headers": {"X-Source": "file"}}}
+        ]))
+        return tmp_path, create_mock_server(config_path=str(config_path))
+
+    def test_body_file_served_from_mapping(self, body_file_app):
+        _, app = body_file_app
+        response = app.test_client().get("/users")
+        assert response.status_code == 200
+        assert response.json == [{"id": 1}]
+        assert response.headers["Content-Type"] == "application/json"
+        assert response.headers["Content-Length"] == str(len(response.data))
+        assert response.headers["X-Source"] == "file"
+
+    def test_body_file_changes_are_picked_up(self, body_file_app):
+        tmp_path, app = body_file_app
+        client = app.test_client()
+        assert client.get("/users").json == [{"id": 1}]
+        replacement = tmp_path / "fixtures" / "users.json.tmp"
+        replacement.write_text('[{"id": 1}, {"id": 2}]')
+        replacement.replace(tmp_path / "fixtures" / "users.json")
+        assert client.get("/users").json == [{"id": 1}, {"id": 2}]
+
+    def test_missing_body_file_fails_at_load(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([{"path": "/x", "methods": ["GET"], "response": {"body_file": "missing.json"}}]))
+        with pytest.raises(Exception, match="body_file for /x not found"):
+            create_mock_server(config_path=str(config_path))
+
+    def test_compressed_body_file_fails_at_load(self, tmp_path):
+        (tmp_path / "users.json").write_text("[]")
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([{"path": "/x", "methods": ["GET"], "response": {"body_file": "users.json", "compress": True}}]))
+        with pytest.raises(Exception, match="compress cannot be combined with body_file for /x"):
+            create_mock_server(config_path=str(config_path))
+
+class TestGeneratedList:
+    @pytest.fixture
+    def generated_client(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([
+            {"path": "/orgs/{org}/users", "methods": ["GET"],
+             "response": {"generate": {"count": 25000, "seed": 7, "item": {
+                 "id": "{index}", "org": "{org}", "name": "user-{index}", "age": "{random_int:18:90}",
+                 "active": "{random_bool}", "role": "{random_choice:admin|member}", "uid": "{uuid}"}}}}
+        ]))
+        return create_mock_server(config_path=str(config_path)).test_client()
+
+    def test_full_list_is_streamed(self, generated_client):
+        response = generated_client.get("/orgs/acme/users")
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert "Content-Length" not in response.headers
+        assert response.headers["X-Total-Count"] == "25000"
+        items = response.json
+        assert len(items) == 25000
+        assert items[42]["id"] == 42 and items[42]["name"] == "user-42" and items[42]["org"] == "acme"
+        assert all(18 <= item["age"] <= 90 and isinstance(item["active"], bool) for item in items)
+        assert {item["role"] for item in items} == {"admin", "member"}
+        assert len({item["uid"] for item in items}) == 25000
+
+    def test_pages_match_the_full_list(self, generated_client):
+        items = generated_client.get("/orgs/acme/users").json
+        page = generated_client.get("/orgs/acme/users?page=3&limit=50").json
+        assert page == items[100:150]
+        assert generated_client.get("/orgs/acme/users?page=251").json == items[25000:]
+        assert len(generated_client.get("/orgs/acme/users?page=2").json) == 100
+
+    def test_invalid_pagination(self, generated_client):
+        assert generated_client.get("/orgs/acme/users?page=0").status_code == 400
+        assert generated_client.get("/orgs/acme/users?limit=abc").status_code == 400
+
+    def test_invalid_generate_spec_fails_at_load(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([{"path": "/x", "methods": ["GET"],
+                                            "response": {"generate": {"count": 1, "item": "{random_int:9:1}"}}}]))
+        with pytest.raises(Exception, match="Invalid generate spec for /x"):
+            create_mock_server(config_path=str(config_path))
+
+class TestCompression:
+    @pytest.fixture
+    def compressed_client(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([
+            {"path": "/static", "methods": ["GET"], "response": {"data": {"items": ["x" * 20] * 200}}},
+            {"path": "/users/{user_id}", "methods": ["GET"], "response": {"data": {"id": "{user_id}", "items": ["y" * 20] * 200}}},
+            {"path": "/small", "methods": ["GET"], "response": {"data": {"ok": True}}},
+            {"path": "/plain", "methods": ["GET"], "response": {"data": {"items": ["z" * 20] * 200}, "compress": False}},
+            {"path": "/list", "methods": ["GET"], "response": {"generate": {"count": 5000, "item": {"id": "{index}"}}}},
+        ]))
+        reset_metrics()
+        app = create_mock_server(config_path=str(config_path), compression=compression_settings())
+        return app.test_client()
+
+    @pytest.mark.parametrize("path", ["/static", "/users/7"])
+    def test_gzip_negotiated(self, compressed_client, path):
+        response = compressed_client.get(path, headers={"Accept-Encoding": "gzip, deflate"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert int(response.headers["Content-Length"]) == len(response.data)
+        assert json.loads(gzip.decompress(response.data))["items"][0].startswith(("x", "y"))
+
+    def test_deflate_and_identity(self, compressed_client):
+        deflated = compressed_client.get("/static", headers={"Accept-Encoding": "gzip;q=0.5, deflate"})
+        assert deflated.headers["Content-Encoding"] == "deflate"
+        assert json.loads(zlib.decompress(deflated.data)) == compressed_client.get("/static").json
+        assert "Content-Encoding" not in compressed_client.get("/static").headers
+
+    def test_small_and_opted_out_bodies_are_not_compressed(self, compressed_client):
+        for path in ("/small", "/plain"):
+            assert "Content-Encoding" not in compressed_client.get(path, headers={"Accept-Encoding": "gzip"}).headers
+
+    def test_streamed_list_is_compressed(self, compressed_client):
+        response = compressed_client.get("/list", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert len(json.loads(gzip.decompress(response.data))) == 5000
+
+    def test_bytes_saved_metric(self, compressed_client):
+        compressed_client.get("/static", headers={"Accept-Encoding": "gzip"})
+        metrics = compressed_client.get("/metrics").get_data(as_text=True)
+        assert 'http_responses_compressed_total{encoding="gzip"} 1' in metrics
+        saved = [line for line in metrics.splitlines() if line.startswith('http_compression_bytes_saved_total{encoding="gzip"}')]
+        assert int(saved[0].split()[-1]) > 0
+
+    def test_route_opt_in_without_global_compression(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([
+            {"path": "/a", "methods": ["GET"], "response": {"data": {"items": ["x"] * 400}, "compress": {"min_size": 10}}},
+            {"path": "/b", "methods": ["GET"], "response": {"data": {"items": ["x"] * 400}}},
+        ]))
+        client = create_mock_server(config_path=str(config_path)).test_client()
+        assert client.get("/a", headers={"Accept-Encoding": "gzip"}).headers["Content-Encoding"] == "gzip"
+        assert "Content-Encoding" not in client.get("/b", headers={"Accept-Encoding": "gzip"}).headers
+
+class TestConditionalRequests:
+    @pytest.mark.parametrize("path", ["/", "/users/7"])
+    def test_if_none_match_returns_304(self, client, path):
+        response = client.get(path)
+        etag = response.headers["ETag"]
+        not_modified = client.get(path, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.data == b""
+        assert not_modified.headers["ETag"] == etag
+        assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+    def test_templated_etag_depends_on_rendered_body(self, client):
+        assert client.get("/users/1").headers["ETag"] != client.get("/users/2").headers["ETag"]
+        assert client.get("/users/1", headers={"If-None-Match": client.get("/users/2").headers["ETag"]}).status_code == 200
+
+    def test_no_etag_on_errors_or_unsafe_methods(self, client):
+        assert "ETag" not in client.get("/error").headers
+        etag = client.post("/echo", json={"a": 1}).headers["ETag"]
+        assert client.post("/echo", json={"a": 1}, headers={"If-None-Match": etag}).status_code == 200
+
+    def test_static_304_skips_rendering(self, client, monkeypatch):
+        etag = client.get("/").headers["ETag"]
+        monkeypatch.setattr("simple_mock_server.server.prepare_response", lambda *args: pytest.fail("body rendered"))
+        assert client.get("/", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_compressed_variant_has_its_own_etag(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([{"path": "/big", "methods": ["GET"], "response": {"data": {"items": ["x" * 20] * 200}}}]))
+        client = create_mock_server(config_path=str(config_path), compression=compression_settings()).test_client()
+        identity = client.get("/big").headers["ETag"]
+        compressed = client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert compressed.headers["ETag"] == identity[:-1] + '-gzip"'
+        not_modified = client.get("/big", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]})
+        assert not_modified.status_code == 304
+        assert "Content-Encoding" not in not_modified.headers
+
+    def test_body_file_and_generated_pages(self, tmp_path):
+        (tmp_path / "users.json").write_text('[{"id": 1}]')
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([
+            {"path": "/file", "methods": ["GET"], "response": {"body_file": "users.json"}},
+            {"path": "/list", "methods": ["GET"], "response": {"generate": {"count": 50, "item": {"id": "{index}"}}}},
+        ]))
+        client = create_mock_server(config_path=str(config_path)).test_client()
+        for path in ("/file", "/list?page=2&limit=10"):
+            etag = client.get(path).headers["ETag"]
+            assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/list?page=3&limit=10", headers={"If-None-Match": etag}).status_code == 200
+
+class TestLatencyAndFaults:
+    def test_distributions_are_seeded_and_clamped(self):
+        specs = [
+            {"distribution": "uniform", "min": 0.01, "max": 0.02, "seed": 1},
+            {"distribution": "normal", "mean": 0.05, "stddev": 0.1, "max": 0.2, "seed": 1},
+            {"distribution": "lognormal", "median": 0.05, "sigma": 2, "max": 0.5, "seed": 1},
+            {"distribution": "percentiles", "p50": 0.02, "p99": 0.3, "seed": 1},
+        ]
+        for spec in specs:
+            assert compile_delay(spec).sample() == compile_delay(spec).sample(), spec["distribution"]
+            distribution = compile_delay(spec)
+            values = [distribution.sample() for _ in range(2000)]
+            assert min(values) >= spec.get("min", 0)
+            assert max(values) <= spec.get("max", 0.3)
+        percentiles = compile_delay(specs[3])
+        values = sorted(percentiles.sample() for _ in range(5000))
+        assert 0.015 < values[2500] < 0.025
+        assert compile_delay(0) is None and compile_delay(0.25).sample() == 0.25
+
+    @pytest.mark.parametrize("spec", [
+        {"distribution": "uniform", "min": 0.5},
+        {"distribution": "normal", "mean": 0.1},
+        {"distribution": "percentiles", "seed": 1},
+        {"distribution": "percentiles", "p50": 0.5, "p90": 0.1},
+    ])
+    def test_invalid_delays_are_rejected(self, tmp_path, spec):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([{"path": "/x", "methods": ["GET"], "response": {"data": {}, "delay": spec}}]))
+        with pytest.raises(Exception, match="Invalid delay or fault for /x"):
+            create_mock_server(config_path=str(config_path))
+
+    def test_fault_injection(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([
+            {"path": "/flaky", "methods": ["GET"], "response": {
+                "data": {"ok": True}, "delay": {"distribution": "uniform", "max": 0.001},
+                "fault": {"probability": 0.3, "code": 502, "data": {"error": "upstream"}, "seed": 42}}},
+            {"path": "/down", "methods": ["GET"], "response": {"data": {"ok": True}, "fault": {"probability": 1}}},
+        ]))
+        client = create_mock_server(config_path=str(config_path)).test_client()
+        statuses = [client.get("/flaky").status_code for _ in range(200)]
+        assert set(statuses) == {200, 502}
+        assert 30 < statuses.count(502) < 90
+        again = create_mock_server(config_path=str(config_path)).test_client()
+        assert [again.get("/flaky").status_code for _ in range(200)] == statuses
+        down = client.get("/down")
+        assert down.status_code == 503
+        assert down.json == {"error": "Injected fault", "code": 503}
+
+class TestResponseVariants:
+    @pytest.fixture
+    def variant_client(self, tmp_path):
+        variants = [{"name": "missing", "match": {"path": {"user_id": "999"}}, "code": 404, "data": {"error": "Not Found"}},
+                    {"name": "beta", "match": {"headers": {"x-tenant": {"pattern": "beta-.*"}}}, "data": {"id": "{user_id}", "beta": True}},
+                    {"name": "admin", "match": {"query": {"role": "admin"}, "headers": {"X-Tenant": "acme"}}, "data": {"admin": True}},
+                    {"name": "vip", "match": {"body": {"customer.tier": "vip"}}, "headers": {"X-Vip": "yes"}}]
+        # Hundreds of exact variants share one hash table.
+        variants += [{"match": {"path": {"user_id": str(1000 + i)}}, "code": 200, "data": {"n": i}} for i in range(500)]
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([{"path": "/users/{user_id}", "methods": ["GET", "POST"],
+                                            "response": {"data": {"id": "{user_id}"}, "variants": variants}}]))
+        reset_metrics()
+        reset_rate_limits()
+        return create_mock_server(config_path=str(config_path)).test_client()
+
+    def test_variants_are_selected(self, variant_client):
+        assert variant_client.get("/users/1").json == {"id": "1"}
+        missing = variant_client.get("/users/999")
+        assert missing.status_code == 404 and missing.json == {"error": "Not Found"}
+        assert variant_client.get("/users/1", headers={"X-Tenant": "beta-7"}).json == {"id": "1", "beta": True}
+        assert variant_client.get("/users/1?role=admin", headers={"X-Tenant": "acme"}).json == {"admin": True}
+        assert variant_client.get("/users/1?role=admin").json == {"id": "1"}
+        vip = variant_client.post("/users/2", json={"customer": {"tier": "vip"}})
+        assert vip.headers["X-Vip"] == "yes" and vip.json == {"id": "2"}
+        assert variant_client.get("/users/1499").json == {"n": 499}
+
+    def test_declaration_order_wins(self, variant_client):
+        # "missing" is declared before "beta", so it wins even though both match.
+        assert variant_client.get("/users/999", headers={"X-Tenant": "beta-1"}).status_code == 404
+        # "beta" (a pattern) is declared before the exact /users/1000 variant.
+        assert variant_client.get("/users/1000", headers={"X-Tenant": "beta-1"}).json == {"id": "1000", "beta": True}
+
+    def test_variant_hits_on_metrics(self, variant_client):
+        variant_client.get("/users/999")
+        variant_client.get("/users/999")
+        variant_client.get("/users/1")
+        metrics = variant_client.get("/metrics").data
+        assert b'http_response_variant_hits_total{path="/users/<user_id>",method="GET",variant="missing"} 2' in metrics
+        assert b'http_response_variant_hits_total{path="/users/<user_id>",method="GET",variant="default"} 1' in metrics
+
+class TestRequestValidation:
+    def test_valid_request_body(self, client):
+        response = client.post("/register", json={"name": "ada"})
+        assert response.status_code == 201, f"Expected 201 Created, got {response.status_code}"
+        assert response.json == {"registered": "ada"}
+
+    def test_invalid_request_body(self, client):
+        response = client.post("/register", json={"name": 42})
+        assert response.status_code == 400, f"Expected 400 Bad Request, got {response.status_code}"
+        assert response.json["message"] == "Request body validation failed: 42 is not of type 'string'"
+
+    def test_request_body_example_is_not_enforced(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([{"path": "/books", "methods": ["POST"], "request_body": {"name": "string", "type": "string"},
+                                            "response": {"data": {"ok": True}, "code": 201}}]))
+        client = create_mock_server(config_path=str(config_path)).test_client()
+        assert client.post("/books", json={"name": "x", "type": "book"}).status_code == 201
+
+    def test_validator_is_compiled_once(self, client, monkeypatch):
+        """Requests reuse the validator built at registration instead of re-checking the schema."""
+        import jsonschema
+        from simple_mock_server.core import response as response_module
+        def fail(*args, **kwargs):
+            raise AssertionError("schema compiled per request")
+        monkeypatch.setattr(response_module, "compile_request_validator", fail)
+        monkeypatch.setattr(jsonschema, "validate", fail)
+        assert client.post("/register", json={}).status_code == 400
+        assert client.post("/register", json={"name": "ada"}).status_code == 201
+
+    def test_body_parsed_once(self, client, monkeypatch):
+        """Validation and templating share one decoded body through the request context."""
+        from simple_mock_server.core import context
+        calls = []
+        original = context.json.loads
+        monkeypatch.setattr(context.json, "loads", lambda data: calls.append(data) or original(data))
+        response = client.post("/register", json={"name": "ada"})
+        assert len(calls) == 1
+        assert response.json == {"registered": "ada"}
+
+    def test_body_too_large(self, client):
+        from simple_mock_server.core.context import DEFAULT_MAX_BODY_SIZE
+        response = client.post("/register", data=b"x" * (DEFAULT_MAX_BODY_SIZE + 1), content_type="application/json")
+        assert response.status_code == 413, f"Expected 413 Payload Too Large, got {response.status_code}"
+        assert response.json["error"] == "Payload Too Large"
+
 class TestTemplating:
     def test_get_user_with_id(self, client):
         response = client.get("/users/123")
@@ -272,6 +686,29 @@ class TestTemplating:
         assert response.status_code == 200, f"Expected 200 OK, got {response.status_code}"
         assert response.headers['X-User-Id'] == "456"
 
+    @pytest.mark.parametrize("data", [
+        {"id": "{user_id}", "items": [{"n": 1, "label": "Item {query_param:q}"}, None, True, 1.5]},
+        ["{body_param:name} \u00e9\"quoted\"", {"nested": {"deep": ["{unknown}", "{query_param:missing}"]}}],
+        {1: "int key", "static": {"a": [1, 2, 3]}},
+        "{user_id}",
+        {},
+    ])
+    def test_compiled_template_matches_apply_templating(self, data):
+        """Compiled templates render the same bytes as apply_templating plus json.dumps."""
+        kwargs = {"user_id": "42"}
+        args = {"q": "x<y>"}
+        body = {"name": "Zoë"}
+        expected = json.dumps(apply_templating(data, kwargs, args, body)).encode('ascii')
+        assert compile_json_template(data).render(kwargs, args, body) == expected
+        assert compile_json_template(data, ["user_id"]).render(kwargs, args, body) == expected
+
+    def test_compiled_template_static_detection(self):
+        """Placeholder-free data and unknown `{name}` text are pre-serialized once."""
+        assert compile_json_template({"message": "Hi {there}"}, []).static == b'{"message": "Hi {there}"}'
+        assert compile_json_template({"id": "{user_id}"}, ["user_id"]).static is None
+        assert compile_headers_template({"X-Static": "v"}).static == {"X-Static": "v"}
+        assert compile_headers_template({"X-Q": "{query_param:q}"}).render({}, {"q": "1"}, {}) == {"X-Q": "1"}
+
 class TestMetrics:
     def test_metrics_endpoint(self, client):
         """Test the metrics endpoint."""
@@ -281,5 +718,47 @@ class TestMetrics:
         assert response.status_code == 200, f"Expected 200 OK, got {response.status_code}"
         assert b'http_requests_total 2' in response.data
         assert b'http_requests_by_path_total{path="/"} 1' in response.data
-        assert b'http_requests_by_path_total{path="/users/123"} 1' in response.data
-        assert b'http_requests_by_method_total{method="GET"} 2' in response.data
\ No newline at end of file
+        assert b'http_requests_by_path_total{path="/users/<user_id>"} 1' in response.data
+        assert b'http_requests_by_method_total{method="GET"} 2' in response.data
+    def test_metrics_status_codes_and_durations(self, client):
+        """Responses are counted by status code and timed per route template."""
+        client.get("/users/1")
+        client.get("/users/2")
+        client.get("/protected")
+        response = client.get("/metrics")
+        assert b'http_requests_by_path_total{path="/users/<user_id>"} 2' in response.data
+        assert b'http_responses_by_status_total{method="GET",code="200"} 2' in response.data
+        assert b'http_responses_by_status_total{method="GET",code="401"} 1' in response.data
+        assert b'http_request_duration_seconds_bucket{path="/users/<user_id>",method="GET",le="+Inf"} 2' in response.data
+        assert b'http_request_duration_seconds_count{path="/users/<user_id>",method="GET"} 2' in response.data
+
+class TestServerTiming:
+    @pytest.fixture
+    def timed_client(self, tmp_path):
+        config_path = tmp_path / "api.json"
+        config_path.write_text(json.dumps([
+            {"path": "/static", "methods": ["GET"], "response": {"data": {"ok": True}}},
+            {"path": "/users/{user_id}", "methods": ["GET"], "response": {"data": {"id": "{user_id}"}},
+             "auth": {"api_key": "secret"}},
+        ]))
+        reset_metrics()
+        app = create_mock_server(config_path=str(config_path), server_timing=True)
+        return app.test_client()
+
+    def test_server_timing_header(self, timed_client):
+        stages = lambda response: [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+        response = timed_client.get("/users/7", headers={"X-API-Key": "secret"})
+        assert stages(response) == ["dispatch", "rate_limit", "auth", "delay", "validate", "render", "compress", "total"]
+        assert stages(timed_client.get("/users/7")) == ["dispatch", "rate_limit", "auth", "total"]
+        assert stages(timed_client.get("/static")) == ["dispatch", "delay", "render", "compress", "total"]
+
+    def test_stage_histograms(self, timed_client):
+        timed_client.get("/static")
+        timed_client.get("/users/7", headers={"X-API-Key": "secret"})
+        metrics = timed_client.get("/metrics").data
+        assert b'http_request_stage_duration_seconds_count{stage="render"} 2' in metrics
+        assert b'http_request_stage_duration_seconds_count{stage="auth"} 1' in metrics
+
+    def test_disabled_by_default(self, client):
+        assert "Server-Timing" not in client.get("/users/7").headers
+        assert b"http_request_stage_duration_seconds" not in client.get("/metrics").data
@@ -0,0 +1,129 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="pre-fork serving requires os.fork()")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid):
+    path = f"/proc/{pid}/task/{pid}/children"
+    if not os.path.exists(path):
+        pytest.skip("/proc child listing is not available")
+    with open(path) as f:
+        return {int(child) for child in f.read().split()}
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.1)
+    raise AssertionError("Timed out waiting for condition")
+
+
+def _workers(pid, exclude=()):
+    """Waits until the supervisor has two live workers, none of them in `exclude`."""
+    def ready():
+        children = _children(pid)
+        return children if len(children) == 2 and not children & set(exclude) else None
+    return _wait_for(ready)
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def _try_get(port, path):
+    try:
+        return _get(port, path)
+    except OSError:
+        return None
+
+
+@pytest.fixture(params=[False, True], ids=["threaded", "async"])
+def prefork_server(request, tmp_path):
+    config_path = tmp_path / "api.json"
+    config_path.write_text(json.dumps([
+        {"path": "/hello", "methods": ["GET"], "response": {"data": {"message": "hi"}, "code": 200}}
+    ]))
+    port = _free_port()
+    command = [sys.executable, "-c", "from simple_mock_server.server import main; main()",
+               "--config", str(config_path), "--port", str(port), "--workers", "2"]
+    if request.param:
+        command.append("--async")
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_for(lambda: _try_get(port, "/hello"))
+        yield process, port
+    finally:
+        if process.poll() is None:
+            # SIGTERM lets the supervisor stop its workers; SIGKILL alone would orphan them.
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def test_workers_serve_requests(prefork_server):
+    process, port = prefork_server
+    assert len(_workers(process.pid)) == 2
+    for _ in range(10):
+        status, body = _get(port, "/hello")
+        assert status == 200
+        assert json.loads(body) == {"message": "hi"}
+
+
+def test_crashed_worker_is_restarted(prefork_server):
+    process, port = prefork_server
+    victim = sorted(_workers(process.pid))[0]
+    os.kill(victim, signal.SIGKILL)
+    assert victim not in _workers(process.pid, exclude=[victim])
+    assert _get(port, "/hello")[0] == 200
+
+
+def test_sigterm_stops_all_workers(prefork_server):
+    process, _ = prefork_server
+    workers = _workers(process.pid)
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=15) == 0
+    for pid in workers:
+        assert not os.path.exists(f"/proc/{pid}"), f"Worker {pid} outlived the supervisor"
+
+
+def test_sighup_reloads_routes_in_every_worker(prefork_server, tmp_path):
+    process, port = prefork_server
+    workers = _workers(process.pid)
+    (tmp_path / "api.json").write_text(json.dumps([
+        {"path": "/hello", "methods": ["GET"], "response": {"data": {"message": "reloaded"}, "code": 200}}
+    ]))
+    process.send_signal(signal.SIGHUP)
+
+    def all_reloaded():
+        # Fresh connections are spread across workers, so several in a row must agree.
+        return all(_try_get(port, "/hello") == (200, b'{"message": "reloaded"}') for _ in range(10))
+    _wait_for(all_reloaded)
+    assert _children(process.pid) == workers, "Reloading must not restart workers"
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from simple_mock_server.core.rate_limiter import LocalRateLimitBackend, SharedMemoryRateLimitBackend
+
+BACKENDS = [
+    pytest.param(LocalRateLimitBackend, "sliding_log", id="local-sliding_log"),
+    pytest.param(LocalRateLimitBackend, "sliding_window", id="local-sliding_window"),
+    pytest.param(LocalRateLimitBackend, "token_bucket", id="local-token_bucket"),
+    pytest.param(lambda: SharedMemoryRateLimitBackend(slots=256, stripes=4), "sliding_window", id="shared-sliding_window"),
+    pytest.param(lambda: SharedMemoryRateLimitBackend(slots=256, stripes=4), "token_bucket", id="shared-token_bucket"),
+]
+
+
+@pytest.mark.parametrize("backend_factory,algorithm", BACKENDS)
+def test_limit_and_remaining(backend_factory, algorithm):
+    backend = backend_factory()
+    now = 1000.0
+    assert backend.remaining("GET_/x_client", 2, 60, algorithm) is None
+    assert backend.hit("GET_/x_client", 2, 60, now, algorithm)[:2] == (True, 1)
+    assert backend.hit("GET_/x_client", 2, 60, now + 0.1, algorithm)[:2] == (True, 0)
+    allowed, remaining, retry_after = backend.hit("GET_/x_client", 2, 60, now + 0.2, algorithm)
+    assert (allowed, remaining) == (False, 0)
+    assert 0 < retry_after <= 120
+    assert backend.hit("GET_/x_other", 2, 60, now + 0.2, algorithm)[0], "Keys must be limited independently"
+
+
+@pytest.mark.parametrize("algorithm", ["sliding_window", "token_bucket"])
+def test_fixed_state_algorithms_recover(algorithm):
+    backend = LocalRateLimitBackend()
+    now = 1000.0
+    assert backend.hit("key", 1, 10, now, algorithm)[0]
+    assert not backend.hit("key", 1, 10, now + 1, algorithm)[0]
+    assert backend.hit("key", 1, 10, now + 25, algorithm)[0]
+
+
+def test_token_bucket_refills_gradually():
+    backend = LocalRateLimitBackend()
+    for offset in range(10):
+        assert backend.hit("key", 10, 10, 1000.0, "token_bucket")[0]
+    assert not backend.hit("key", 10, 10, 1000.0, "token_bucket")[0]
+    # One token per second comes back.
+    assert backend.hit("key", 10, 10, 1001.0, "token_bucket")[0]
+    assert not backend.hit("key", 10, 10, 1001.0, "token_bucket")[0]
+
+
+@pytest.mark.parametrize("algorithm", ["sliding_log", "sliding_window", "token_bucket"])
+def test_idle_keys_are_evicted(algorithm):
+    backend = LocalRateLimitBackend(eviction_interval=0)
+    for client in range(100):
+        backend.hit(f"GET_/x_{client}", 5, 10, 1000.0, algorithm)
+    assert len(backend) == 100
+    assert backend.evict_idle(1005.0) == 0
+    assert backend.evict_idle(1100.0) == 100
+    assert len(backend) == 0
+
+
+def test_shared_backend_reuses_least_recently_seen_slot():
+    backend = SharedMemoryRateLimitBackend(slots=4, stripes=1)
+    for index in range(4):
+        backend.hit(f"key{index}", 1, 60, 1000.0 + index, "sliding_window")
+    # The table is full; a new key evicts key0, which therefore starts over.
+    assert backend.hit("key4", 1, 60, 1010.0, "sliding_window")[0]
+    assert backend.hit("key0", 1, 60, 1011.0, "sliding_window")[0]
+
+
+def _hammer(backend, now, results):
+    allowed = sum(backend.hit("GET_/shared_client", 50, 60, now, "sliding_window")[0] for _ in range(40))
+    results.put(allowed)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="shared-memory backend is inherited through fork")
+def test_shared_backend_enforces_one_limit_across_processes():
+    backend = SharedMemoryRateLimitBackend(slots=256, stripes=4)
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    # Stay clear of a window boundary so remaining() below sees the same window.
+    now = time.time()
+    if now % 60 > 50:
+        now -= 15
+    processes = [context.Process(target=_hammer, args=(backend, now, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+    total_allowed = sum(results.get(timeout=5) for _ in processes)
+    assert total_allowed == 50, f"Expected the limit to be shared, {total_allowed} requests were allowed"
+    assert backend.remaining("GET_/shared_client", 50, 60, "sliding_window") == 0
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from simple_mock_server.core import metrics
+from simple_mock_server.core.resources import reset_resource_stores, save_resource_stores
+from simple_mock_server.server import create_mock_server
+
+
+def _app(tmp_path, resource, **route):
+    config_path = tmp_path / "api.json"
+    config_path.write_text(json.dumps([{"path": "/api/users", "resource": resource, **route}]))
+    return create_mock_server(config_path=str(config_path))
+
+
+@pytest.fixture(autouse=True)
+def fresh_stores():
+    reset_resource_stores()
+    metrics.reset_metrics()
+    yield
+    reset_resource_stores()
+
+
+def test_crud_roundtrip(tmp_path):
+    schema = {"type": "object", "required": ["name"]}
+    client = _app(tmp_path, {"id_param": "user_id"}, request_schema=schema).test_client()
+
+    created = client.post("/api/users", json={"name": "Ada"})
+    assert created.status_code == 201
+    assert created.json == {"name": "Ada", "id": 1}
+    assert created.headers["Location"] == "/api/users/1"
+    assert client.post("/api/users", json={"id": "bob", "name": "Bob"}).status_code == 201
+    assert client.post("/api/users", json={"id": "bob", "name": "Bob"}).status_code == 409
+    assert client.post("/api/users", json={"nickname": "x"}).status_code == 400
+
+    assert client.get("/api/users/1").json == {"name": "Ada", "id": 1}
+    assert client.patch("/api/users/1", json={"role": "admin", "id": 99}).json == {"name": "Ada", "id": 1, "role": "admin"}
+    assert client.put("/api/users/1", json={"name": "Ada L."}).json == {"name": "Ada L.", "id": 1}
+    assert client.put("/api/users/7", json={"name": "Grace"}).status_code == 201
+    assert client.post("/api/users", json={"name": "Linus"}).json["id"] == 8
+    assert [user["name"] for user in client.get("/api/users").json] == ["Ada L.", "Bob", "Grace", "Linus"]
+
+    assert client.delete("/api/users/bob").status_code == 204
+    assert client.get("/api/users/bob").status_code == 404
+    assert client.delete("/api/users/bob").status_code == 404
+
+
+def test_put_with_leading_zeros_replaces_the_same_record(tmp_path):
+    client = _app(tmp_path, {}).test_client()
+    client.put("/api/users/7", json={"name": "Grace"})
+
+    assert client.put("/api/users/007", json={"name": "Ada"}).status_code == 200
+    assert client.get("/api/users").json == [{"name": "Ada", "id": 7}]
+    assert client.get("/api/users/007").json == {"name": "Ada", "id": 7}
+
+
+def test_indexed_filters_and_pagination(tmp_path):
+    users = [{"name": f"user{i}", "role": "admin" if i % 3 == 0 else "user", "active": i % 2 == 0} for i in range(30)]
+    client = _app(tmp_path, {"indexes": ["role", "active"], "data": users}).test_client()
+
+    admins = client.get("/api/users?role=admin")
+    assert admins.headers["X-Total-Count"] == "10"
+    assert [user["name"] for user in admins.json][:3] == ["user0", "user3", "user6"]
+    assert len(client.get("/api/users?role=admin&active=true").json) == 5
+    assert client.get("/api/users?role=nobody").json == []
+    page = client.get("/api/users?page=2&limit=4")
+    assert [user["id"] for user in page.json] == [5, 6, 7, 8]
+    assert page.headers["X-Total-Count"] == "30"
+
+    client.patch("/api/users/1", json={"role": "user"})
+    assert len(client.get("/api/users?role=admin").json) == 9
+
+
+def test_lru_eviction(tmp_path):
+    client = _app(tmp_path, {"max_records": 3}).test_client()
+    for name in ("a", "b", "c"):
+        client.post("/api/users", json={"name": name})
+    client.get("/api/users/1")
+    client.post("/api/users", json={"name": "d"})
+    assert [user["name"] for user in client.get("/api/users").json] == ["a", "c", "d"]
+    assert metrics.resource_evictions_total["/api/users"] == 1
+
+
+def test_snapshot_is_saved_and_restored(tmp_path):
+    client = _app(tmp_path, {"snapshot": "users.json", "data": [{"name": "seed"}]}).test_client()
+    client.post("/api/users", json={"name": "Ada"})
+    save_resource_stores()
+    assert json.loads((tmp_path / "users.json").read_text())["next_id"] == 3
+
+    reset_resource_stores()
+    client = _app(tmp_path, {"snapshot": "users.json", "data": [{"name": "seed"}]}).test_client()
+    assert [user["name"] for user in client.get("/api/users").json] == ["seed", "Ada"]
+    assert client.post("/api/users", json={"name": "Grace"}).json["id"] == 3
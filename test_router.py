@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from werkzeug.exceptions import NotFound
+from werkzeug.routing import Map, Rule, RequestRedirect
+
+from simple_mock_server.core.router import Router
+from simple_mock_server.server import create_mock_server
+
+TEMPLATES = [
+    "/",
+    "/users",
+    "/users/",
+    "/users/me",
+    "/users/<user_id>",
+    "/users/<user_id>/posts/<post_id>",
+    "/users/<user_id>/settings",
+    "/files/<name>.json",
+    "/files/<name>",
+    "/v<version>/status",
+    "/orgs/<org>/members/me",
+    "/orgs/<org_id>/members/<member>",
+]
+
+PATHS = [
+    "/", "/users", "/users/", "/users/me", "/users/42", "/users/42/posts/7", "/users/me/settings",
+    "/users/42/settings", "/users/42/posts", "/users//posts/7", "/files/a.json", "/files/a", "/files/a.b.json",
+    "/v2/status", "/v/status", "/orgs/acme/members/me", "/orgs/acme/members/bob", "/orgs/acme/members",
+    "/nope", "/users/42/posts/7/extra",
+]
+
+
+def _router():
+    router = Router()
+    for template in TEMPLATES:
+        router.add(template, template)
+    return router
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_router_agrees_with_werkzeug(path):
+    """The router must pick the same route and parameters as the Werkzeug rules it replaces."""
+    adapter = Map([Rule(t, endpoint=t) for t in TEMPLATES], strict_slashes=False).bind("localhost")
+    try:
+        expected = adapter.match(path)
+    except (NotFound, RequestRedirect):
+        expected = None
+    assert _router().match(path) == expected
+
+
+def test_router_replaces_duplicate_templates():
+    router = Router()
+    router.add("/a/<x>", 1)
+    router.add("/a/<x>", 2)
+    router.add("/b", 1)
+    router.add("/b", 2)
+    assert len(router) == 2
+    assert router.match("/a/1") == (2, {"x": "1"})
+    assert router.match("/b") == (2, {})
+
+
+def test_trailing_slash_redirect(tmp_path):
+    config_path = tmp_path / "api.json"
+    config_path.write_text(json.dumps([
+        {"path": "/items/", "methods": ["GET"], "response": {"data": {"ok": True}}},
+        {"path": "/items/{item_id}", "methods": ["GET"], "response": {"data": {"id": "{item_id}"}}},
+    ]))
+    client = create_mock_server(config_path=str(config_path)).test_client()
+    redirect = client.get("/items?page=2")
+    assert redirect.status_code == 308
+    assert redirect.headers["Location"].endswith("/items/?page=2")
+    assert client.get("/items/").json == {"ok": True}
+    assert client.get("/items/9").json == {"id": "9"}
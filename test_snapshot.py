@@ -0,0 +1,64 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from simple_mock_server import server
+from simple_mock_server.server import create_mock_server
+
+ROUTES = [
+    {"path": "/users/{user_id}", "methods": ["GET"], "response": {"data": {"id": "{user_id}"}}},
+    {"path": "/static", "methods": ["GET"], "response": {"data": {"ok": True}, "headers": {"X-A": "b"}}},
+    {"path": "/register", "methods": ["POST", "PUT"], "response": {"data": {"name": "{body_param:name}"}, "code": 201},
+     "request_schema": {"type": "object", "required": ["name"]}},
+]
+
+
+@pytest.fixture
+def config(tmp_path):
+    config_path = tmp_path / "api.json"
+    config_path.write_text(json.dumps(ROUTES))
+    return config_path
+
+
+def _exercise(app):
+    client = app.test_client()
+    assert client.get("/users/7").json == {"id": "7"}
+    assert client.get("/static").headers["X-A"] == "b"
+    assert client.post("/register", json={"name": "ada"}).json == {"name": "ada"}
+    assert client.put("/register", json={}).status_code == 400
+
+
+def test_unchanged_config_skips_parsing(config, tmp_path):
+    snapshot_dir = tmp_path / "snapshots"
+    _exercise(create_mock_server(config_path=str(config), snapshot_dir=str(snapshot_dir)))
+    assert len(list(snapshot_dir.glob("*.snapshot"))) == 1
+
+    with patch.object(server, "parse_and_validate_config", side_effect=AssertionError("config was parsed")), \
+         patch.object(server, "compile_json_template", side_effect=AssertionError("templates were compiled")):
+        app = create_mock_server(config_path=str(config), snapshot_dir=str(snapshot_dir))
+    _exercise(app)
+    assert "/users/{user_id}" in app.test_client().get("/openapi.json").json["paths"]
+
+
+def test_changed_config_misses_snapshot(config, tmp_path):
+    snapshot_dir = tmp_path / "snapshots"
+    create_mock_server(config_path=str(config), snapshot_dir=str(snapshot_dir))
+    config.write_text(json.dumps(ROUTES + [{"path": "/new", "methods": ["GET"], "response": {"data": {"n": 1}}}]))
+    app = create_mock_server(config_path=str(config), snapshot_dir=str(snapshot_dir))
+    assert app.test_client().get("/new").json == {"n": 1}
+    assert len(list(snapshot_dir.glob("*.snapshot"))) == 2
+
+
+def test_corrupt_snapshot_falls_back_to_parsing(config, tmp_path):
+    snapshot_dir = tmp_path / "snapshots"
+    create_mock_server(config_path=str(config), snapshot_dir=str(snapshot_dir))
+    for path in snapshot_dir.glob("*.snapshot"):
+        path.write_bytes(b"not a pickle")
+    _exercise(create_mock_server(config_path=str(config), snapshot_dir=str(snapshot_dir)))
+
+
+def test_snapshots_are_off_by_default(config, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    create_mock_server(config_path=str(config))
+    assert not (tmp_path / "cache").exists()